@@ -0,0 +1,562 @@
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import random
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Lock
+from urllib.parse import urlsplit, parse_qs
+
+from tqdm import tqdm
+
+import dump
+
+# -------------------------------------------------------------------------
+# Benchmarks de dump.py (aucun accès au site réel)
+#   python bench.py write --size-mb 100
+#   python bench.py site --pages 5 --links-per-page 20 --latency 0.05
+#   python bench.py startup --entries 1000000
+# Les sorties console sont envoyées vers /dev/null : sur un vrai terminal,
+# le coût des print() de l'ancienne boucle est encore plus élevé.
+# -------------------------------------------------------------------------
+
+# -------------------------------------------------------------------------
+# FONCTIONS UTILITAIRES
+# -------------------------------------------------------------------------
+def fake_chunks(data: bytes, chunk_size: int):
+    """Simule iter_content() : découpe `data` en blocs de `chunk_size` octets."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+@contextlib.contextmanager
+def silenced():
+    """Redirige stdout/stderr vers /dev/null (progression et prints inclus)."""
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull), \
+            contextlib.redirect_stderr(devnull):
+        try:
+            yield
+        finally:
+            # Les messages encore en file seraient affichés après la redirection
+            dump.flush_logs()
+
+def measure(func, *args) -> tuple:
+    """Exécute func(*args) et retourne (secondes écoulées, secondes CPU)."""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    func(*args)
+    return time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus courant (Mo)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return maxrss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+def print_result(label: str, size: int, wall: float, cpu: float) -> None:
+    mb = size / (1024 * 1024)
+    print(f"  {label:<28} {mb / wall:9.1f} MB/s   CPU {cpu:6.3f}s   ({cpu / mb * 100:.3f} s CPU / 100 Mo)")
+
+# -------------------------------------------------------------------------
+# BENCHMARK DU CHEMIN D'ÉCRITURE
+# -------------------------------------------------------------------------
+def legacy_write(data: bytes, path: str) -> None:
+    """Ancienne boucle : blocs de 1 Ko, tqdm + time.time() + print à chaque bloc."""
+    total = len(data)
+    with tqdm(total=total, unit='B', unit_scale=True, desc="legacy") as pbar:
+        downloaded_size = 0
+        start_time = time.time()
+        with open(path, 'wb') as f:
+            for chunk in fake_chunks(data, 1024):
+                f.write(chunk)
+                downloaded_size += len(chunk)
+                pbar.update(len(chunk))
+                elapsed = time.time() - start_time
+                speed = downloaded_size / elapsed if elapsed > 0 else 0
+                print(f"\r[{dump.get_current_time()}] Vitesse : {speed/1024:.2f} KB/s", end='')
+
+def tuned_write(data: bytes, path: str) -> None:
+    """Chemin actuel : dump.stream_to_file avec blocs de dump.CHUNK_SIZE."""
+    _, error = dump.stream_to_file(fake_chunks(data, dump.CHUNK_SIZE), path, 0, len(data),
+                                   desc="tuned")
+    if error is not None:
+        raise error
+
+def bench_write(size_mb: int) -> None:
+    data = os.urandom(size_mb * 1024 * 1024)
+    print(f"Chemin d'écriture : {size_mb} Mo, blocs de {dump.CHUNK_SIZE} octets, "
+          f"préallocation={'oui' if dump.PREALLOCATE else 'non'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.mp4.part")
+        for label, func in (("ancien (1 Ko + print)", legacy_write),
+                            ("actuel (stream_to_file)", tuned_write)):
+            with silenced():
+                wall, cpu = measure(func, data, path)
+            print_result(label, len(data), wall, cpu)
+            os.remove(path)
+
+# -------------------------------------------------------------------------
+# FAUX SITE LOCAL (recherche, pages vidéo, MP4 synthétiques)
+# -------------------------------------------------------------------------
+FILLER = bytes(1024 * 1024)
+
+def mp4_header(size: int) -> bytes:
+    """Boîtes ftyp + moov minimales, suivies de l'en-tête d'une boîte mdat couvrant le reste."""
+    ftyp = struct.pack(">I4s4sI8s", 24, b"ftyp", b"isom", 0x200, b"isomiso2")
+    moov = struct.pack(">I4s", 8 + 100, b"moov") + bytes(100)
+    mdat = struct.pack(">I4s", size - len(ftyp) - len(moov), b"mdat")
+    return ftyp + moov + mdat
+
+def media_chunks(size: int, start: int = 0, corrupt: bool = False):
+    """
+    Génère les octets [start:size] d'un MP4 synthétique de `size` octets
+    (`corrupt` : en-tête remplacé par du HTML, comme une page d'erreur).
+    """
+    header = mp4_header(size)
+    if corrupt:
+        header = b"<!DOCTYPE html><html>".ljust(len(header), b" ")
+    if start < len(header):
+        yield header[start:]
+        start = len(header)
+    while start < size:
+        block = min(len(FILLER), size - start)
+        yield FILLER[:block]
+        start += block
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    """
+    /search?q=..&page=N : liens /v/ et /a/ (pages 1..pages)
+    /v/<id>, /a/<id>    : page avec <p class="mt-10"> et <video><source>
+                          (album_size vidéos pour une page /a/)
+    Les pages HTML ont un ETag (304 sur If-None-Match identique).
+    /media/<id>.mp4     : corps MP4 (HEAD, Range, ETag)
+    Latence, 429, corps tronqués, MP4 invalides et vidéos republiées
+    (doublons) injectés selon la configuration du serveur.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request(head=True)
+
+    def do_GET(self):
+        self.handle_request(head=False)
+
+    def send_body(self, status: int, body: bytes, content_type: str = "text/html") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_page(self, body: bytes) -> None:
+        """Page HTML avec ETag : 304 sans corps si le client a déjà cette version."""
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, head: bool) -> None:
+        config = self.server.config
+        rng = self.server.rng
+        if config["latency"]:
+            time.sleep(config["latency"])
+
+        path = urlsplit(self.path).path
+        if config["rate_429"] and rng.random() < config["rate_429"] and not path.startswith("/search"):
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if path == "/search":
+            self.handle_search()
+        elif path.startswith(("/v/", "/a/")):
+            self.handle_video_page(path[3:])
+        elif path.startswith("/media/"):
+            self.handle_media(path[7:], head)
+        else:
+            self.send_body(404, b"")
+
+    def handle_search(self) -> None:
+        config = self.server.config
+        query = parse_qs(urlsplit(self.path).query)
+        page = int(query.get("page", ["1"])[0])
+        tag = query.get("q", [""])[0]  # Liens propres à chaque tag (ordonnanceur multi-tags)
+        links = []
+        if page <= config["pages"]:
+            for i in range(config["links_per_page"]):
+                kind = "a" if i % 2 else "v"
+                links.append(f'<div class="video"><a href="/{kind}/{tag}p{page}n{i}">Vidéo {i}</a></div>')
+        body = f"<html><body>{''.join(links)}</body></html>".encode()
+        self.send_page(body)
+
+    def handle_video_page(self, video_id: str) -> None:
+        config = self.server.config
+        host = f"http://{self.headers.get('Host')}"
+        count = config["album_size"] if self.path.startswith("/a/") else 1
+        videos = []
+        for k in range(count):
+            media_id = f"{video_id}-{k}" if k else video_id
+            if config["dup_rate"] and zlib.crc32(media_id.encode()) % 1000 < config["dup_rate"] * 1000:
+                # Même vidéo republiée sur une autre page
+                media_id = f"shared{zlib.crc32(media_id.encode()) % 3}"
+            videos.append(f'<video><source src="{host}/media/{media_id}.mp4" type="video/mp4"></video>')
+        body = (
+            '<html><body><h1>Vidéo</h1>'
+            '<p class="mt-10"><a href="/search?q=bench">#bench tag</a> <a href="/search?q=fake">#fake</a></p>'
+            f'{"".join(videos)}'
+            '</body></html>'
+        ).encode()
+        self.send_page(body)
+
+    def handle_media(self, media_name: str, head: bool) -> None:
+        config = self.server.config
+        size = config["video_size"]
+        if config["large_rate"] and \
+                zlib.crc32(b"large:" + media_name.encode()) % 1000 < config["large_rate"] * 1000:
+            size = config["large_size"]
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-")[0])
+            if start >= size:
+                self.send_body(416, b"")
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("ETag", f'"{media_name}-{size}"')
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if head:
+            return
+
+        corrupt = bool(config["corrupt_rate"]) and \
+            zlib.crc32(media_name.encode()) % 1000 < config["corrupt_rate"] * 1000
+        truncate = config["truncate_rate"] and self.server.rng.random() < config["truncate_rate"]
+        limit = (size - start) // 2 if truncate else size - start
+        sent = 0
+        bucket = self.server.bandwidth
+        try:
+            for chunk in media_chunks(size, start, corrupt):
+                chunk = chunk[:limit - sent]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if bucket is not None:
+                    time.sleep(bucket.reserve(len(chunk)))
+                if sent >= limit:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        if truncate:
+            self.close_connection = True
+
+def serve_fake_site(config: dict, conn) -> None:
+    """Point d'entrée du processus serveur : envoie le port puis sert indéfiniment."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSiteHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.rng = random.Random(config["seed"])
+    # Lien partagé par toutes les connexions (goulot d'étranglement simulé)
+    server.bandwidth = dump.TokenBucket(config["site_bandwidth"], dump.CHUNK_SIZE) \
+        if config["site_bandwidth"] else None
+    # Connexions fermées par le client (rejet ou doublon avant le corps) : pas de trace
+    server.handle_error = lambda request, client_address: None
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+def start_fake_site(config: dict) -> tuple:
+    """Lance le faux site dans un processus séparé (CPU/RSS non comptés). Retourne (process, url)."""
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve_fake_site, args=(config, child_conn), daemon=True)
+    process.start()
+    port = parent_conn.recv()
+    return process, f"http://127.0.0.1:{port}"
+
+# -------------------------------------------------------------------------
+# BENCHMARK DE BOUT EN BOUT (search_videos + download_video)
+# -------------------------------------------------------------------------
+def configure_dump(base_url: str, args) -> None:
+    """Pointe dump.py vers le faux site et applique les réglages du benchmark."""
+    dump.BASE_URL = base_url
+    dump.SEARCH_DELAY = args.search_delay
+    dump.ENGINE = args.engine
+    dump.THREADS = args.threads
+    dump.ASYNC_CONCURRENCY = args.threads
+    dump.POOL_MAXSIZE = args.threads
+    dump.MIN_SIZE_BYTES = min(dump.MIN_SIZE_BYTES, args.video_size)
+    dump.MAX_SIZE_BYTES = max(dump.MAX_SIZE_BYTES, args.video_size, args.large_size)
+    dump.THROTTLE_BACKOFF = 1
+    dump.HOST_LIMITER = dump.AdaptiveLimiter()
+    dump.TRANSFER_GATE = dump.TransferGate(args.policy, args.transfer_slots, args.byte_budget)
+    dump.BANDWIDTH = dump.TokenBucket(args.bandwidth, dump.BANDWIDTH_BURST) if args.bandwidth else None
+    dump.STATS = dump.Stats()
+    dump.PAGE_CACHE = dump.PageCache("page_cache.sqlite") if args.page_cache else None
+    dump.close_sessions()
+
+def run_downloads(links: list, index: "dump.DownloadIndex", threads: int,
+                  deadline: "dump.Deadline" = None) -> dict:
+    """Télécharge `links` avec le pool de threads ; retourne le nombre de résultats par type."""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results, _, _ = dump.download_tasks(executor, links, "downloads", set(), index, Lock(),
+                                            None, deadline)
+    return results
+
+def bench_site(args) -> None:
+    config = {
+        "pages": args.pages,
+        "links_per_page": args.links_per_page,
+        "video_size": args.video_size,
+        "latency": args.latency,
+        "rate_429": args.rate_429,
+        "truncate_rate": args.truncate_rate,
+        "dup_rate": args.dup_rate,
+        "album_size": args.album_size,
+        "corrupt_rate": args.corrupt_rate,
+        "large_rate": args.large_rate,
+        "large_size": args.large_size,
+        "site_bandwidth": args.site_bandwidth,
+        "seed": args.seed,
+    }
+    process, base_url = start_fake_site(config)
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            os.makedirs("downloads")
+            configure_dump(base_url, args)
+            index = dump.DownloadIndex(os.path.join(tmp, "index.sqlite"))
+
+            with silenced():
+                cpu_start = time.process_time()
+                search_wall = download_wall = 0.0
+                results = {}
+                # Tours suivants : nouvelle recherche, puis reprise des liens non terminés
+                for _ in range(args.rounds):
+                    search_start = time.perf_counter()
+                    links = dump.search_videos("bench", index, None, num_links=dump.MAX_LINKS,
+                                               max_pages=args.pages + 1)
+                    search_wall += time.perf_counter() - search_start
+
+                    download_start = time.perf_counter()
+                    deadline = dump.Deadline(args.deadline)
+                    pending = index.pending_links("bench")
+                    if args.engine == "asyncio":
+                        round_results = asyncio.run(dump.async_download_links(
+                            pending, "downloads", index, concurrency=args.threads, deadline=deadline))
+                    else:
+                        round_results = run_downloads(pending, index, args.threads, deadline)
+                    download_wall += time.perf_counter() - download_start
+                    for result, count in round_results.items():
+                        results[result] = results.get(result, 0) + count
+                cpu = time.process_time() - cpu_start
+
+            # Vidéos enregistrées : une page d'album compte pour toutes ses vidéos
+            videos = [entry for entry in os.scandir("downloads") if entry.name.endswith(".mp4")]
+            total_bytes = sum(entry.stat().st_size for entry in videos)
+            index.close()
+            if dump.PAGE_CACHE is not None:
+                dump.PAGE_CACHE.close()
+            dump.close_sessions()
+    finally:
+        os.chdir(cwd)
+        process.terminate()
+
+    done = len(videos)
+    print(f"Faux site : {args.pages} pages x {args.links_per_page} liens, vidéos de {args.video_size} octets, "
+          f"albums de {args.album_size}, latence {args.latency}s, 429 {args.rate_429:.0%}, "
+          f"tronqués {args.truncate_rate:.0%}, doublons {args.dup_rate:.0%}, moteur {args.engine} x {args.threads}")
+    print(f"  Transferts    : politique {args.policy} ({args.transfer_slots} créneaux), "
+          f"{args.large_rate:.0%} de {args.large_size} octets, lien du site "
+          f"{args.site_bandwidth or 0:.0f} o/s, limite client {args.bandwidth or 0:.0f} o/s")
+    print(f"  Pages         : {args.rounds} tour(s), cache {'activé' if args.page_cache else 'désactivé'}")
+    print(f"  Recherche     : {len(links)} liens en {search_wall:.2f}s ({len(links) / search_wall:.1f} liens/s)")
+    print(f"  Téléchargement: {done} vidéos en {download_wall:.2f}s ({done / download_wall:.2f} vidéos/s, "
+          f"{total_bytes / download_wall / (1024 * 1024):.1f} MB/s)")
+    print(f"  Résultats     : {dict(sorted(results.items()))}")
+    if args.deadline is not None:
+        print(f"  Échéance      : {args.deadline:.2f}s, dépassement {download_wall - args.deadline:+.2f}s, "
+              f"{results.get(dump.RESULT_DEFERRED, 0)} tâche(s) reportée(s)")
+    print(f"  CPU           : {cpu:.2f}s   Pic RSS : {peak_rss_mb():.1f} Mo")
+    snap = dump.STATS.snapshot()
+    for stage, hist in sorted(snap["stages"].items()):
+        print(f"  {stage:<14}: {hist['count']:>5} x {hist['mean_seconds'] * 1000:8.2f} ms "
+              f"(max {hist['max_seconds'] * 1000:.1f} ms, total {hist['total_seconds']:.2f}s)")
+    for name, values in sorted(snap["counters"].items()):
+        print(f"  {name:<14}: {dict(sorted(values.items()))}")
+
+# -------------------------------------------------------------------------
+# BENCHMARK DU DÉMARRAGE (HISTORIQUE DE N LIENS)
+# -------------------------------------------------------------------------
+# Chaque mesure tourne dans un nouveau processus (argv : dossier, racine du dépôt,
+# URL connue, URL inconnue) et affiche "secondes pic_rss_ko" pour l'opération seule.
+PROBE_PRELUDE = """
+import os, resource, sys, time
+os.chdir(sys.argv[1]); sys.path.insert(0, sys.argv[2])
+known, unknown = sys.argv[3], sys.argv[4]
+start = time.perf_counter()
+"""
+PROBE_EPILOGUE = """
+assert seen is None or (known in seen and unknown not in seen)
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+STARTUP_PROBES = (
+    ("set du .txt (ancien)",
+     "seen = {line.strip() for line in open('downloaded_videos.txt', encoding='utf-8')}"),
+    ("set des liens SQLite (ancien)",
+     "import sqlite3\n"
+     "seen = {row[0] for row in sqlite3.connect('downloads_index.sqlite')"
+     ".execute('SELECT url FROM links WHERE tag = ?', ('bench',))}"),
+    ("import dump + filtre mmap",
+     "import dump\n"
+     "seen = dump.DownloadIndex(dump.INDEX_FILE).seen_links('bench')"),
+    ("dump.py --status",
+     "import contextlib, dump\n"
+     "with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):\n"
+     "    dump.main(['--status'])\n"
+     "heavy = [name for name in ('bs4', 'tqdm', 'aiohttp', 'lxml') if name in sys.modules]\n"
+     "assert not heavy, heavy\n"
+     "seen = None"),
+)
+
+def build_history(entries: int) -> None:
+    """Crée dans le dossier courant un historique de `entries` liens (ancien .txt et index SQLite)."""
+    urls = (f"{dump.BASE_URL}/v/{i:08x}" for i in range(entries))
+    with open(dump.LEGACY_DOWNLOADED_FILE, "w", encoding="utf-8") as f:
+        f.writelines(f"{url}\n" for url in urls)
+    index = dump.DownloadIndex(dump.INDEX_FILE)
+    batch = 100_000
+    for start in range(0, entries, batch):
+        index.add_links("bench", [f"{dump.BASE_URL}/v/{i:08x}"
+                                  for i in range(start, min(start + batch, entries))])
+    index.import_legacy(dump.LEGACY_DOWNLOADED_FILE)
+    index.close()
+
+def bench_startup(entries: int) -> None:
+    known = f"{dump.BASE_URL}/v/{entries - 1:08x}"
+    unknown = f"{dump.BASE_URL}/v/inconnu"
+    repo = os.path.dirname(os.path.abspath(__file__))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            build_start = time.perf_counter()
+            build_history(entries)
+            build_wall = time.perf_counter() - build_start
+            # Première ouverture : construction du filtre depuis la table links
+            index = dump.DownloadIndex(dump.INDEX_FILE)
+            filter_wall, filter_cpu = measure(index.seen_links, "bench")
+            seen = index.seen_links("bench")
+            probes = [f"{dump.BASE_URL}/v/{i:08x}" for i in range(0, entries, max(1, entries // 1000))]
+            probes += [f"{dump.BASE_URL}/v/absent{i}" for i in range(len(probes))]
+            lookup_start = time.perf_counter()
+            hits = sum(url in seen for url in probes)
+            lookup_wall = time.perf_counter() - lookup_start
+            index.close()
+
+            print(f"Démarrage avec un historique de {entries} liens "
+                  f"(créé en {build_wall:.1f}s, filtre {dump.SEEN_FILTER_BITS // 8 // (1024 * 1024)} Mo "
+                  f"construit en {filter_wall:.1f}s, une seule fois)")
+            print(f"  Recherche dans le filtre : {lookup_wall / len(probes) * 1e6:.1f} µs par lien "
+                  f"({hits} connus sur {len(probes)})")
+            for label, body in STARTUP_PROBES:
+                code = PROBE_PRELUDE + body + PROBE_EPILOGUE
+                process_start = time.perf_counter()
+                out = subprocess.run([sys.executable, "-c", code, tmp, repo, known, unknown],
+                                     capture_output=True, text=True, check=True).stdout.split()
+                process_wall = time.perf_counter() - process_start
+                seconds, maxrss = float(out[0]), int(out[1])
+                rss_mb = maxrss / 1024 / (1024 if sys.platform == "darwin" else 1)
+                print(f"  {label:<30} {seconds * 1000:8.1f} ms   processus {process_wall * 1000:7.1f} ms"
+                      f"   pic RSS {rss_mb:7.1f} Mo")
+        finally:
+            os.chdir(cwd)
+
+# -------------------------------------------------------------------------
+# POINT D'ENTRÉE
+# -------------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks locaux de dump.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    write_parser = commands.add_parser("write", help="microbenchmark du chemin d'écriture")
+    write_parser.add_argument("--size-mb", type=int, default=100)
+
+    site_parser = commands.add_parser("site", help="recherche + téléchargements contre un faux site local")
+    site_parser.add_argument("--pages", type=int, default=5)
+    site_parser.add_argument("--links-per-page", type=int, default=20)
+    site_parser.add_argument("--video-size", type=int, default=2 * 1024 * 1024,
+                             help="taille des MP4 (octets)")
+    site_parser.add_argument("--latency", type=float, default=0.0,
+                             help="latence injectée par requête (secondes)")
+    site_parser.add_argument("--rate-429", type=float, default=0.0,
+                             help="proportion de réponses 429 (pages et médias)")
+    site_parser.add_argument("--truncate-rate", type=float, default=0.0,
+                             help="proportion de corps MP4 tronqués")
+    site_parser.add_argument("--dup-rate", type=float, default=0.0,
+                             help="proportion de pages pointant vers une vidéo déjà publiée")
+    site_parser.add_argument("--corrupt-rate", type=float, default=0.0,
+                             help="proportion de MP4 invalides (HTML servi comme vidéo)")
+    site_parser.add_argument("--large-rate", type=float, default=0.0,
+                             help="proportion de vidéos de --large-size octets")
+    site_parser.add_argument("--large-size", type=int, default=50 * 1024 * 1024)
+    site_parser.add_argument("--site-bandwidth", type=float, default=None,
+                             help="débit total du faux site (octets/s), partagé par les connexions")
+    site_parser.add_argument("--policy", choices=dump.TransferGate.POLICIES,
+                             default=dump.SCHEDULING_POLICY)
+    site_parser.add_argument("--transfer-slots", type=int, default=dump.TRANSFER_SLOTS)
+    site_parser.add_argument("--byte-budget", type=int, default=dump.TRANSFER_BYTE_BUDGET)
+    site_parser.add_argument("--bandwidth", type=float, default=None,
+                             help="BANDWIDTH_LIMIT côté client (octets/s)")
+    site_parser.add_argument("--album-size", type=int, default=1,
+                             help="nombre de vidéos des pages /a/ (albums)")
+    site_parser.add_argument("--threads", type=int, default=dump.THREADS,
+                             help="threads (ou coroutines avec --engine asyncio)")
+    site_parser.add_argument("--engine", choices=("threads", "asyncio"), default="threads")
+    site_parser.add_argument("--search-delay", type=float, default=0.0)
+    site_parser.add_argument("--deadline", type=float, default=None,
+                             help="échéance des téléchargements (secondes), comme SESSION_DURATION")
+    site_parser.add_argument("--rounds", type=int, default=1,
+                             help="tours recherche + téléchargements (reprise des liens non terminés)")
+    site_parser.add_argument("--page-cache", action="store_true",
+                             help="cache disque des pages (ETag, TTL) entre les requêtes et les tours")
+    site_parser.add_argument("--seed", type=int, default=0)
+
+    startup_parser = commands.add_parser("startup", help="temps de démarrage et mémoire selon l'historique")
+    startup_parser.add_argument("--entries", type=int, default=1_000_000)
+
+    args = parser.parse_args(argv)
+    if args.command == "write":
+        bench_write(args.size_mb)
+    elif args.command == "startup":
+        bench_startup(args.entries)
+    elif args.command == "site":
+        bench_site(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
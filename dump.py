@@ -1,11 +1,61 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import os
+import sys
+import atexit
+import json
 import time
-from datetime import datetime
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+import queue
+import sqlite3
+import hashlib
+import struct
+import zlib
+import asyncio
+import functools
+import argparse
+import socket
+import mmap
+import importlib
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+from threading import Lock, Condition, Timer
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from dataclasses import dataclass, field, asdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class LazyModule:
+    """
+    Module importé au premier accès à l'un de ses attributs : les commandes
+    qui n'analysent ni ne téléchargent rien (--status, --dry-run) démarrent
+    sans charger bs4, tqdm ou aiohttp.
+    """
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)  # Accès suivants : attribut ordinaire
+        return value
+
+def lazy_import(name: str, optional: bool = False):
+    """
+    LazyModule de `name`. Module optionnel non installé : None (présence
+    vérifiée par importlib.util.find_spec, sans l'importer).
+    """
+    if optional and importlib.util.find_spec(name.partition(".")[0]) is None:
+        return None
+    return LazyModule(name)
+
+bs4 = lazy_import("bs4")
+tqdm = lazy_import("tqdm")
+lxml_html = lazy_import("lxml.html", optional=True)  # optionnel : analyse HTML plus rapide
+aiohttp = lazy_import("aiohttp", optional=True)  # optionnel : moteur de téléchargement asyncio (ENGINE = "asyncio")
+aiohttp_socks = lazy_import("aiohttp_socks", optional=True)  # optionnel : proxy SOCKS5 avec aiohttp
 
 # -------------------------------------------------------------------------
 # Author : XKC_yourgoth.com
@@ -13,6 +63,7 @@ from threading import Lock
 # -------------------------------------------------------------------------
 # PARAMÈTRES GLOBAUX
 # -------------------------------------------------------------------------
+BASE_URL = "https://www.erome.com"    # Racine du site (recherche et liens relatifs)
 MIN_SIZE_BYTES = 1 * 1024 * 1024      # 1 Mo
 MAX_SIZE_BYTES = 100 * 1024 * 1024    # 100 Mo
 MAX_LINKS = 1000                     # Nombre maximum de liens à récupérer
@@ -20,7 +71,69 @@ MAX_PAGES = 20                       # Nombre maximum de pages à parcourir
 THREADS = 20                         # Nombre de threads pour le téléchargement
 SLEEP_BETWEEN_SEARCH = 10           # Pause (secondes) entre deux recherches
 SEARCH_DELAY = 2                    # Pause (secondes) entre chaque page (anti-spam)
+TAG_IDLE_MAX_SLEEP = 30 * 60        # Pause max (s) d'un tag dont la recherche ne trouve rien de nouveau
 TIMEOUT = 10                        # Timeout (secondes) pour les requêtes réseau
+POOL_CONNECTIONS = 4                # Nombre d'hôtes gardés en pool (site + CDN vidéo)
+POOL_MAXSIZE = THREADS              # Connexions keep-alive conservées par hôte
+STRICT_HEAD_CHECK = False           # True : HEAD de validation avant le GET (un aller-retour de plus)
+CHUNK_SIZE = 1024 * 1024            # Taille des blocs lus/écrits pendant le téléchargement
+PROGRESS_INTERVAL = 1.0             # Intervalle (secondes) de mise à jour progression/vitesse
+PREALLOCATE = True                  # Préallouer le .part à la taille annoncée
+PARSER_BACKEND = "auto"             # "auto", "lxml", "strainer" ou "html.parser"
+
+CONCURRENCY_INITIAL = 4             # Requêtes simultanées par hôte au départ (ajusté ensuite)
+CONCURRENCY_MIN = 1                 # Plancher du limiteur adaptatif
+THROTTLE_STATUSES = (429, 503)      # Codes qui réduisent la concurrence
+THROTTLE_BACKOFF = 30               # Pause (secondes) si 429/503 sans Retry-After
+MAX_RETRY_AFTER = 5 * 60            # Pause max (secondes) acceptée d'un Retry-After
+DECREASE_COOLDOWN = 2               # Délai min. (secondes) entre deux réductions pour un hôte
+MAX_THROTTLE_RETRIES = 3            # Remises en file d'un élément bloqué (429/503)
+
+SCHEDULING_POLICY = "fifo"          # Ordre des transferts : "fifo", "shortest", "largest" ou "budget"
+TRANSFER_SLOTS = 8                  # Transferts simultanés au plus (hors "fifo") ; < THREADS pour avoir le choix
+TRANSFER_BYTE_BUDGET = 300 * 1024 * 1024  # Politique "budget" : octets restant à lire en vol, au plus
+TRANSFER_MAX_WAIT = 5               # Attente max (s) d'admission, puis report (réponse non lue) ; < TIMEOUT
+BANDWIDTH_LIMIT = None              # Débit global max (octets/s) de tous les transferts, None = illimité
+BANDWIDTH_BURST = 4 * 1024 * 1024   # Rafale permise au-delà de BANDWIDTH_LIMIT (octets)
+
+NODE_ID = f"{socket.gethostname()}-{os.getpid()}"  # Identité de ce nœud dans le magasin de tâches
+TASK_LEASE = 5 * 60                 # Durée (s) d'un bail sur une tâche, renouvelé tant qu'elle tourne
+TASK_POLL_INTERVAL = 2              # Pause (s) d'un tag quand le magasin n'a aucune tâche libre pour lui
+TASK_REFILL_INTERVAL = 0.1          # Contrôle (s) des sous-files locales à compléter depuis le magasin
+TASK_MAX_ATTEMPTS = 5               # Prises sans succès avant de classer une tâche "failed"
+TASK_RECHECK_DELAY = 30             # Pause (s) d'une tâche rendue sans échec (source en cours ailleurs)
+TASK_STORE_BUSY_TIMEOUT = 30        # Attente max (s) du verrou SQLite du magasin partagé
+
+ENGINE = "threads"                  # "threads" (pool de THREADS) ou "asyncio" (nécessite aiohttp)
+ASYNC_CONCURRENCY = 200             # Téléchargements simultanés max. du moteur asyncio
+ASYNC_FILE_WORKERS = 4              # Threads dédiés aux écritures disque (moteur asyncio)
+
+PIPELINE_MODE = True                # True : recherche et téléchargements en parallèle (file bornée)
+QUEUE_MAXSIZE = 200                 # Taille max de la file de liens en mode pipeline
+INCREMENTAL_SEARCH = True           # True : ne renvoie que les nouveaux liens, pagination écourtée
+STALE_PAGES_LIMIT = 1               # Pages consécutives sans nouveau lien avant arrêt
+
+INDEX_FILE = "downloads_index.sqlite"             # Index SQLite des téléchargements
+LEGACY_DOWNLOADED_FILE = "downloaded_videos.txt"  # Ancien format, importé au démarrage
+PAGE_MAX_FAILURES = 5               # Échecs consécutifs (403, 404, réseau) avant d'abandonner une page
+PAGE_RETRY_DELAY = 10 * 60          # Pause (s) avant de retenter une page en échec, doublée à chaque échec
+SEEN_FILTER_SUFFIX = ".seen"        # Filtre des liens vus, à côté de l'index (INDEX_FILE + suffixe)
+SEEN_FILTER_BITS = 1 << 26          # Taille du filtre (8 Mo) : ~1 % de faux positifs vers 7 millions de liens
+SEEN_FILTER_HASHES = 7              # Bits positionnés par lien
+CONTENT_HASH = None                 # Empreinte calculée pendant le transfert (ex: "sha256"), None = aucune
+VERIFY_DOWNLOADS = True             # CRC32 + contrôles calculés pendant le transfert (sans relecture)
+VERIFY_MP4 = True                   # Vérifie la structure MP4 (ftyp, moov, boîtes complètes)
+QUARANTINE_FOLDER = "quarantine"    # Sous-dossier (de downloads) des fichiers invalides
+
+PAGE_CACHE_FILE = "page_cache.sqlite"     # Cache disque des pages analysées, None = désactivé
+PAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024   # Taille max des entrées du cache (LRU au-delà)
+PAGE_CACHE_TTL = 6 * 60 * 60        # Âge (s) d'une page vidéo servie sans requête, revalidée ensuite
+SEARCH_CACHE_TTL = 60               # Idem pour les pages de recherche (listes qui changent vite)
+
+STATS_FILE = "dump_stats.json"      # Instantané JSON des latences et compteurs
+STATS_INTERVAL = 30                 # Écriture de STATS_FILE toutes les N secondes
+STATS_PORT = None                   # Port local de l'endpoint Prometheus (ex: 9109), None = désactivé
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # Bornes (s)
 
 # Durée maximale (en secondes) pour un cycle de recherche / téléchargement (20 minutes)
 SESSION_DURATION = 20 * 60
@@ -33,7 +146,25 @@ HEADERS = {
     )
 }
 
-LOG_FILE = "erome_log.txt"  # Nom du fichier de log pour les mini-logs
+LOG_FILE = "erome_log.txt"  # Nom du fichier de log pour les mini-logs (JSON lines)
+LOG_MAX_BYTES = 5 * 1024 * 1024     # Rotation du log au-delà de cette taille
+LOG_BACKUPS = 3                     # Nombre d'anciens logs conservés (.1, .2, ...)
+LOG_BATCH_SIZE = 1000               # Messages écrits au plus par lot
+
+# Résultats possibles de download_video
+RESULT_DONE = "done"            # Vidéo enregistrée
+RESULT_SKIPPED = "skipped"      # Déjà téléchargée ou en cours
+RESULT_REJECTED = "rejected"    # Pas de source, non-MP4, type ou taille refusés
+RESULT_PARTIAL = "partial"      # Interrompue, .part conservé pour reprise
+RESULT_FAILED = "failed"        # Erreur réseau ou HTTP
+RESULT_THROTTLED = "throttled"  # 429/503 : à remettre en file plus tard
+RESULT_DUPLICATE = "duplicate"  # Même vidéo déjà téléchargée depuis une autre page
+RESULT_QUARANTINED = "quarantined"  # Contenu invalide, déplacé en quarantaine
+RESULT_DEFERRED = "deferred"    # Échéance du cycle (ou TRANSFER_MAX_WAIT) atteinte : reportée
+RESULT_ALBUM = "album"          # Album pas encore complet : ses vidéos sont suivies une à une
+RESULT_BUSY = "busy"            # Même source déjà en cours sous une autre page : à reprendre
+PART_SUFFIX = ".part"            # Suffixe des téléchargements en cours
+PART_META_SUFFIX = ".part.json"  # Sidecar : URL, ETag, taille attendue
 
 # -------------------------------------------------------------------------
 # FONCTIONS UTILITAIRES
@@ -42,19 +173,60 @@ def get_current_time() -> str:
     """Retourne la date et l'heure courante au format YYYY-MM-DD HH:MM:SS."""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def log_event(message: str, log_file: str = LOG_FILE) -> None:
-    """
-    Écrit un message horodaté dans le fichier de log spécifié.
-    Exemple de log_file : 'erome_log.txt'.
-    """
-    timestamp = get_current_time()
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {message}\n")
-
 def is_mp4_link(link_url: str) -> bool:
     """Vérifie si le lien se termine par .mp4 (contrôle simple)."""
     return link_url.lower().endswith(".mp4")
 
+def media_key(video_src: str) -> str:
+    """
+    Clé d'une source vidéo : hôte et chemin, sans les paramètres (jetons
+    de requête variables). Deux sources de même clé sont probablement le
+    même fichier, ce que confirment la taille et l'ETag du GET
+    (DownloadIndex.find_duplicate).
+    """
+    parts = urlsplit(video_src)
+    return parts.netloc + parts.path
+
+class DeadlineExceeded(Exception):
+    """
+    Échéance du cycle atteinte pendant un transfert (.part conservé), ou
+    avant qu'un créneau du limiteur d'hôte soit libre (AdaptiveLimiter.slot).
+    """
+
+class Deadline:
+    """
+    Échéance d'un cycle (horloge monotone), partagée par la recherche, les
+    workers et les boucles de transfert : passé ce délai, plus aucune tâche
+    ne démarre et les transferts en cours s'arrêtent au bloc suivant.
+    `Deadline(None)` n'expire jamais, sauf appel à cancel() (Ctrl-C).
+    """
+    def __init__(self, seconds: float = None):
+        self.at = None if seconds is None else time.monotonic() + seconds
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        """Secondes restantes (jamais négatif, infini sans échéance)."""
+        if self._cancelled.is_set():
+            return 0.0
+        if self.at is None:
+            return float("inf")
+        return max(0.0, self.at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def cancel(self) -> None:
+        """Échéance immédiate : réveille aussi les pauses en cours."""
+        self._cancelled.set()
+
+    def sleep(self, seconds: float) -> bool:
+        """
+        Dort `seconds` sans dépasser l'échéance (réveillé par cancel()).
+        Retourne False si l'échéance est atteinte (inutile de continuer).
+        """
+        self._cancelled.wait(min(seconds, self.remaining()))
+        return not self.expired()
+
 def clean_tag(tag_text: str) -> str:
     """
     Nettoie un tag en supprimant les caractères indésirables (#, espaces, etc.)
@@ -66,6 +238,1314 @@ def clean_tag(tag_text: str) -> str:
                 .replace(" ", "_")
     )
 
+# -------------------------------------------------------------------------
+# JOURNALISATION (FILE D'ATTENTE + THREAD D'ÉCRITURE)
+# -------------------------------------------------------------------------
+class LogWriter:
+    """
+    Journal asynchrone : les workers déposent leurs messages dans une file
+    (sans verrou de fichier ni appel système), et un thread unique les
+    écrit par lots :
+      - enregistrements JSON lines dans le(s) fichier(s) de log, gardés
+        ouverts, avec rotation par taille (LOG_MAX_BYTES, LOG_BACKUPS),
+      - messages console sur stdout.
+    Le thread démarre au premier message ; la file est vidée à la sortie.
+    """
+    _STOP = object()
+
+    def __init__(self, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+                 batch_size: int = LOG_BATCH_SIZE):
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._files = {}  # chemin absolu -> fichier ouvert
+        self._thread = None
+        self._start_lock = Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    thread.start()
+                    self._thread = thread
+
+    def write(self, path: str, record: dict) -> None:
+        """Met en file un enregistrement pour le fichier `path`."""
+        self._ensure_started()
+        self._queue.put((path, record))
+
+    def console(self, text: str) -> None:
+        """Met en file un texte (déjà formaté) pour la console."""
+        self._ensure_started()
+        self._queue.put((None, text))
+
+    def flush(self, timeout: float = 5) -> None:
+        """Attend que tout ce qui a été mis en file avant l'appel soit écrit."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put((done, None))
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """Vide la file, arrête le thread et ferme les fichiers."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put((self._STOP, None))
+            self._thread.join(5)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            events = []
+            console_lines = []
+            file_lines = {}
+            for target, payload in batch:
+                if target is None:
+                    console_lines.append(payload)
+                elif target is self._STOP:
+                    stop = True
+                elif isinstance(target, threading.Event):
+                    events.append(target)
+                else:
+                    file_lines.setdefault(target, []).append(
+                        json.dumps(payload, ensure_ascii=False) + "\n")
+
+            for path, lines in file_lines.items():
+                try:
+                    self._write_file(path, "".join(lines))
+                except OSError:
+                    pass
+            if console_lines:
+                try:
+                    sys.stdout.write("".join(console_lines))
+                    sys.stdout.flush()
+                except (OSError, ValueError):
+                    pass
+            for event in events:
+                event.set()
+
+            if stop:
+                for f in self._files.values():
+                    f.close()
+                self._files.clear()
+                return
+
+    def _write_file(self, path: str, data: str) -> None:
+        f = self._files.get(path)
+        if f is None:
+            f = open(path, "a", encoding="utf-8")
+            self._files[path] = f
+        f.write(data)
+        f.flush()
+        if self.max_bytes and f.tell() >= self.max_bytes:
+            f.close()
+            del self._files[path]
+            self._rotate(path)
+
+    def _rotate(self, path: str) -> None:
+        """erome_log.txt -> erome_log.txt.1 -> ... -> erome_log.txt.<backups>."""
+        if self.backups <= 0:
+            os.remove(path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+LOG_WRITER = LogWriter()
+atexit.register(LOG_WRITER.close)
+
+def log_event(message: str, log_file: str = LOG_FILE, **fields) -> None:
+    """
+    Ajoute au fichier de log (ex: 'erome_log.txt') un enregistrement JSON
+    horodaté : {"ts", "thread", "msg", ...champs supplémentaires}.
+    L'écriture est faite par le thread de journalisation.
+    """
+    record = {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "thread": threading.current_thread().name,
+        "msg": message,
+    }
+    record.update(fields)
+    LOG_WRITER.write(os.path.abspath(log_file), record)
+
+def console(message: str, newline: bool = False) -> None:
+    """
+    Affiche `[date heure] message` via le thread de journalisation
+    (`newline` : saut de ligne avant, pour ne pas coller à une barre tqdm).
+    """
+    prefix = "\n" if newline else ""
+    LOG_WRITER.console(f"{prefix}[{get_current_time()}] {message}\n")
+
+def flush_logs() -> None:
+    """Attend l'écriture des messages en file (avant un input() par exemple)."""
+    LOG_WRITER.flush()
+
+# -------------------------------------------------------------------------
+# STATISTIQUES (LATENCES PAR ÉTAPE, COMPTEURS, EXPORT)
+# -------------------------------------------------------------------------
+class Stats:
+    """
+    Mesures du chemin critique, partagées par tous les workers (protégées
+    par un verrou) :
+      - histogrammes de latence par étape : search_get et parse_links
+        (pages de recherche), page_get et parse_page (une seule analyse
+        par page : tags, sources et liens), head, media_get (en-têtes
+        média), gate_wait, transfer,
+      - compteurs étiquetés (réponses HTTP par code, rejets par raison,
+        résultats de téléchargement, octets reçus).
+    """
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._lock = Lock()
+        self._stages = {}    # étape -> {"buckets": [...], "count", "sum", "max"}
+        self._counters = {}  # compteur -> {étiquette: valeur}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Ajoute une durée à l'histogramme de `stage`."""
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0, "max": 0.0}
+                self._stages[stage] = hist
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist["buckets"][i] += 1
+                    break
+            hist["count"] += 1
+            hist["sum"] += seconds
+            hist["max"] = max(hist["max"], seconds)
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Mesure la durée du bloc (y compris en cas d'exception)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def incr(self, counter: str, label: str = "", value: int = 1) -> None:
+        """Incrémente `counter` pour l'étiquette `label` (code HTTP, raison...)."""
+        with self._lock:
+            values = self._counters.setdefault(counter, {})
+            values[label] = values.get(label, 0) + value
+
+    def snapshot(self) -> dict:
+        """Copie des mesures, sérialisable en JSON."""
+        with self._lock:
+            stages = {}
+            for stage, hist in self._stages.items():
+                cumulative = 0
+                buckets = {}
+                for bound, n in zip(self.buckets, hist["buckets"]):
+                    cumulative += n
+                    buckets[str(bound)] = cumulative
+                buckets["+Inf"] = hist["count"]
+                stages[stage] = {
+                    "count": hist["count"],
+                    "total_seconds": round(hist["sum"], 6),
+                    "mean_seconds": round(hist["sum"] / hist["count"], 6),
+                    "max_seconds": round(hist["max"], 6),
+                    "buckets": buckets,
+                }
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        return {
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "updated": datetime.now(timezone.utc).isoformat(),
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def to_prometheus(self) -> str:
+        """Mesures au format texte Prometheus."""
+        snap = self.snapshot()
+        lines = ["# TYPE dump_stage_seconds histogram"]
+        for stage, hist in sorted(snap["stages"].items()):
+            for bound, n in hist["buckets"].items():
+                lines.append(f'dump_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {n}')
+            lines.append(f'dump_stage_seconds_sum{{stage="{stage}"}} {hist["total_seconds"]}')
+            lines.append(f'dump_stage_seconds_count{{stage="{stage}"}} {hist["count"]}')
+        for name, values in sorted(snap["counters"].items()):
+            label_key = STATS_LABELS.get(name)
+            lines.append(f"# TYPE dump_{name}_total counter")
+            for label, value in sorted(values.items()):
+                if label_key:
+                    lines.append(f'dump_{name}_total{{{label_key}="{label}"}} {value}')
+                else:
+                    lines.append(f"dump_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+# Clé d'étiquette Prometheus de chaque compteur (None : compteur sans étiquette)
+STATS_LABELS = {
+    "http_responses": "code",
+    "rejections": "reason",
+    "downloads": "result",
+    "bytes_downloaded": None,
+    "duplicates": "match",
+    "album_media": None,
+    "quarantined": None,
+    "page_cache": "outcome",
+}
+
+STATS = Stats()
+
+def write_stats_file(path: str = None) -> None:
+    """Écrit l'instantané JSON des statistiques (remplacement atomique)."""
+    path = path or STATS_FILE
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(STATS.snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Sert /metrics (texte Prometheus) et /stats.json."""
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = STATS.to_prometheus().encode("utf-8")
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/stats.json":
+            body = json.dumps(STATS.snapshot()).encode("utf-8")
+            ctype = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stats_exporter(path: str = None, interval: float = None, port: int = None):
+    """
+    Écrit les statistiques dans `path` (STATS_FILE) toutes les `interval`
+    secondes (STATS_INTERVAL) et, si `port` (STATS_PORT) est défini, les
+    sert sur http://127.0.0.1:<port>/metrics.
+    Retourne une fonction d'arrêt qui écrit un dernier instantané.
+    """
+    path = path or STATS_FILE
+    interval = interval or STATS_INTERVAL
+    port = port if port is not None else STATS_PORT
+    stop_event = threading.Event()
+
+    def writer() -> None:
+        while not stop_event.wait(interval):
+            try:
+                write_stats_file(path)
+            except OSError as e:
+                log_event(f"Écriture des statistiques impossible ({path}) : {e}")
+
+    threading.Thread(target=writer, name="stats-writer", daemon=True).start()
+
+    server = None
+    if port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        except OSError as e:
+            log_event(f"Endpoint de statistiques indisponible (port {port}) : {e}")
+            console(f"Endpoint de statistiques indisponible (port {port}) : {e}")
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="stats-http", daemon=True).start()
+            console(f"Statistiques : http://127.0.0.1:{port}/metrics")
+
+    def stop() -> None:
+        stop_event.set()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        try:
+            write_stats_file(path)
+        except OSError as e:
+            log_event(f"Écriture des statistiques impossible ({path}) : {e}")
+
+    return stop
+
+# -------------------------------------------------------------------------
+# INDEX DES TÉLÉCHARGEMENTS (SQLITE)
+# -------------------------------------------------------------------------
+class SeenFilter:
+    """
+    Filtre de Bloom persistant des liens vus par tag (clés seen_key), dans
+    un fichier de taille fixe projeté en mémoire (mmap) : ouverture
+    immédiate et mémoire bornée, quelle que soit la longueur de
+    l'historique. Une clé absente du filtre n'a jamais été vue ; une clé
+    présente peut être un faux positif, à confirmer dans l'index (SeenLinks).
+    L'en-tête garde le dernier rowid de la table links intégré au filtre.
+    Les écritures se font sous le verrou de l'index.
+    """
+    HEADER = struct.Struct(">8sQIQ")  # Signature, bits, hachages, rowid intégré
+    MAGIC = b"DUMPSEE2"               # 2 : clés tag + lien (filtre d'URL seules reconstruit)
+
+    def __init__(self, path: str, bits: int = SEEN_FILTER_BITS, hashes: int = SEEN_FILTER_HASHES):
+        self.path = path
+        self.bits = bits
+        self.hashes = hashes
+        size = self.HEADER.size + bits // 8
+        fresh = not os.path.exists(path) or os.path.getsize(path) != size
+        with open(path, "w+b" if fresh else "r+b") as f:
+            if fresh:
+                f.truncate(size)  # Fichier creux : rien n'est écrit tant qu'aucun bit n'est levé
+            self._map = mmap.mmap(f.fileno(), size)
+        magic, file_bits, file_hashes, self.synced_rowid = self.HEADER.unpack_from(self._map)
+        if fresh:
+            self.set_synced(0)
+        elif (magic, file_bits, file_hashes) != (self.MAGIC, bits, hashes):
+            self.clear()
+
+    def clear(self) -> None:
+        """Vide le filtre (réglages changés, index remplacé) : à reconstruire depuis l'index."""
+        self._map[self.HEADER.size:] = bytes(self.bits // 8)
+        self.set_synced(0)
+
+    def set_synced(self, rowid: int) -> None:
+        self.synced_rowid = rowid
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.bits, self.hashes, rowid)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % self.bits
+            yield self.HEADER.size + (position >> 3), 1 << (position & 7)
+
+    def add(self, key: str) -> None:
+        for offset, mask in self._positions(key):
+            self._map[offset] |= mask
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._map[offset] & mask for offset, mask in self._positions(key))
+
+    def close(self) -> None:
+        self._map.flush()
+        self._map.close()
+
+def seen_key(tag: str, url: str) -> str:
+    """Clé d'un lien vu pour `tag` dans le SeenFilter."""
+    return f"{tag}\0{url}"
+
+class SeenLinks:
+    """
+    Liens déjà vus pour un tag (table links de l'index), avec l'interface
+    d'un ensemble pour search_videos : `url in seen` interroge le
+    SeenFilter et ne confirme dans l'index que les réponses positives
+    (faux positifs). Un lien trouvé d'abord sous un autre tag reste
+    nouveau pour celui-ci : l'arrêt sur pages sans nouveau lien
+    (`stale_pages`) est décidé tag par tag. Les liens sont enregistrés
+    par DownloadIndex.add_links.
+    """
+    def __init__(self, index: "DownloadIndex", seen_filter: SeenFilter, tag: str):
+        self._index = index
+        self._filter = seen_filter
+        self.tag = tag
+
+    def __contains__(self, url: str) -> bool:
+        return seen_key(self.tag, url) in self._filter and self._index.has_link(url, self.tag)
+
+    def add(self, url: str) -> None:
+        self._index.mark_seen(url, self.tag)
+
+# Condition SQL (paramètres : PAGE_MAX_FAILURES, maintenant) : entrée de
+# videos ni abandonnée après trop d'échecs, ni en attente de son prochain
+# essai. Vraie aussi pour une page absente de videos (LEFT JOIN).
+RETRY_DUE_SQL = "(COALESCE(failures, 0) < ? AND (retry_at IS NULL OR retry_at <= ?))"
+
+class DownloadIndex:
+    """
+    Index SQLite (mode WAL) des pages traitées, indexé par URL de page :
+    source vidéo, taille, ETag, tags, statut ("done", "rejected", "partial",
+    "duplicate", "album", "queued", "quarantined", "failed"), échecs
+    consécutifs et date du prochain essai, somme de contrôle
+    (CRC32 calculé pendant le transfert) et horodatages. Chaque vidéo d'un album
+    a sa propre entrée (<page>#<fichier>, parent_url = page de l'album). Chaque résultat est inséré dès qu'il est
+    connu, sans réécriture globale. Garde aussi les liens trouvés, une
+    fois par tag qui les a trouvés.
+    Les vidéos sont aussi retrouvées par contenu (find_duplicate) : clé de
+    la source (media_key), taille + ETag, ou empreinte du fichier.
+    Une seule connexion partagée, protégée par un verrou interne.
+    Les liens vus sont aussi résumés dans un SeenFilter (<index>.seen),
+    ouvert au premier appel de seen_links().
+    """
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self._lock = Lock()
+        self._seen = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " page_url TEXT PRIMARY KEY,"
+            " video_src TEXT,"
+            " size INTEGER,"
+            " etag TEXT,"
+            " tags TEXT,"
+            " status TEXT NOT NULL,"
+            " path TEXT,"
+            " created_at TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL)"
+        )
+        # Colonnes ajoutées après coup : migration des index existants
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(videos)")}
+        for column in ("media_key", "content_hash", "duplicate_of", "parent_url", "checksum",
+                       "retry_at"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE videos ADD COLUMN {column} TEXT")
+        if "failures" not in columns:
+            self._conn.execute("ALTER TABLE videos ADD COLUMN failures INTEGER")
+        if "media_key" not in columns:
+            rows = self._conn.execute(
+                "SELECT page_url, video_src FROM videos WHERE video_src IS NOT NULL"
+            ).fetchall()
+            self._executemany(
+                "UPDATE videos SET media_key = ? WHERE page_url = ?",
+                [(media_key(video_src), page_url) for page_url, video_src in rows]
+            )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS videos_media_key ON videos (media_key)")
+        # Anciennes clés sans l'hôte (chemin seul : entre "/" et "0", plage indexée)
+        rows = self._conn.execute(
+            "SELECT page_url, video_src FROM videos"
+            " WHERE media_key >= '/' AND media_key < '0' AND video_src IS NOT NULL"
+        ).fetchall()
+        if rows:
+            self._executemany(
+                "UPDATE videos SET media_key = ? WHERE page_url = ?",
+                [(media_key(video_src), page_url) for page_url, video_src in rows]
+            )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS videos_size_etag ON videos (size, etag)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS videos_content_hash ON videos (content_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS videos_parent_url ON videos (parent_url)")
+        # Un lien peut être trouvé par plusieurs tags : une ligne par couple (lien, tag)
+        links_key = {row[1]: row[5] for row in self._conn.execute("PRAGMA table_info(links)")}
+        migrate_links = bool(links_key) and not links_key.get("tag")
+        if migrate_links:
+            # Ancienne table indexée par lien seul (tag de la première découverte)
+            self._conn.execute("BEGIN")
+            self._conn.execute("ALTER TABLE links RENAME TO links_by_url")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            " url TEXT NOT NULL,"
+            " tag TEXT NOT NULL,"
+            " first_seen TEXT NOT NULL,"
+            " last_seen TEXT NOT NULL,"
+            " PRIMARY KEY (url, tag))"
+        )
+        if migrate_links:
+            self._conn.execute(
+                "INSERT INTO links (url, tag, first_seen, last_seen)"
+                " SELECT url, COALESCE(tag, ''), first_seen, last_seen FROM links_by_url ORDER BY rowid"
+            )
+            self._conn.execute("DROP TABLE links_by_url")
+            self._conn.execute("COMMIT")
+
+    def _executemany(self, sql: str, rows: list) -> None:
+        """Exécute `sql` pour toutes les lignes dans une seule transaction (verrou déjà pris)."""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(sql, rows)
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def is_downloaded(self, page_url: str) -> bool:
+        """True si la page a déjà été téléchargée avec succès (ou en double)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM videos WHERE page_url = ? AND status IN ('done', 'duplicate')",
+                (page_url,)
+            ).fetchone()
+        return row is not None
+
+    def get_entry(self, page_url: str) -> tuple:
+        """(statut, source vidéo, liste de tags) de `page_url`, ou None si inconnue."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, video_src, tags FROM videos WHERE page_url = ?", (page_url,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, video_src, tags = row
+        return status, video_src, tags.split(",") if tags else []
+
+    def record(self, page_url: str, status: str,
+               video_src: str = None, size: int = None, etag: str = None,
+               tags: list = None, path: str = None,
+               content_hash: str = None, duplicate_of: str = None,
+               checksum: str = None) -> None:
+        """Insère ou met à jour l'entrée de `page_url`."""
+        now = get_current_time()
+        tags_string = ",".join(tags) if tags else None
+        key = media_key(video_src) if video_src else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO videos (page_url, video_src, media_key, size, etag, tags, status, path,"
+                " content_hash, duplicate_of, checksum, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(page_url) DO UPDATE SET"
+                " video_src = COALESCE(excluded.video_src, video_src),"
+                " media_key = COALESCE(excluded.media_key, media_key),"
+                " size = COALESCE(excluded.size, size),"
+                " etag = COALESCE(excluded.etag, etag),"
+                " tags = COALESCE(excluded.tags, tags),"
+                " status = excluded.status,"
+                " path = COALESCE(excluded.path, path),"
+                " content_hash = COALESCE(excluded.content_hash, content_hash),"
+                " duplicate_of = COALESCE(excluded.duplicate_of, duplicate_of),"
+                " checksum = COALESCE(excluded.checksum, checksum),"
+                " failures = NULL, retry_at = NULL,"
+                " updated_at = excluded.updated_at",
+                (page_url, video_src, key, size, etag, tags_string, status, path,
+                 content_hash, duplicate_of, checksum, now, now)
+            )
+
+    def record_failure(self, page_url: str) -> int:
+        """
+        Compte un échec (erreur HTTP ou réseau, rien d'enregistré) de
+        `page_url` et repousse son prochain essai de PAGE_RETRY_DELAY,
+        doublé à chaque échec. Une entrée déjà connue garde son statut
+        ("partial"...), une nouvelle est créée en "failed". Au-delà de
+        PAGE_MAX_FAILURES échecs consécutifs, l'élément n'est plus retenté
+        (voir is_due). Tout autre résultat (record) remet le compte à zéro.
+        Retourne le nombre d'échecs consécutifs.
+        """
+        now = datetime.now()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT failures FROM videos WHERE page_url = ?", (page_url,)
+            ).fetchone()
+            failures = (row[0] or 0) + 1 if row else 1
+            retry_at = now + timedelta(seconds=PAGE_RETRY_DELAY * 2 ** (failures - 1))
+            self._conn.execute(
+                "INSERT INTO videos (page_url, status, failures, retry_at, created_at, updated_at)"
+                " VALUES (?, 'failed', ?, ?, ?, ?)"
+                " ON CONFLICT(page_url) DO UPDATE SET failures = excluded.failures,"
+                " retry_at = excluded.retry_at, updated_at = excluded.updated_at",
+                (page_url, failures, retry_at.strftime("%Y-%m-%d %H:%M:%S"),
+                 get_current_time(), get_current_time())
+            )
+        return failures
+
+    def is_due(self, page_url: str) -> bool:
+        """
+        True si `page_url` est à (re)tenter : ni téléchargée, ni abandonnée
+        après PAGE_MAX_FAILURES échecs, ni en attente de son prochain essai.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM videos WHERE page_url = ? AND (status IN ('done', 'duplicate')"
+                f" OR NOT {RETRY_DUE_SQL})",
+                (page_url, PAGE_MAX_FAILURES, get_current_time())
+            ).fetchone()
+        return row is None
+
+    def find_duplicate(self, page_url: str, source: str = None,
+                       size: int = None, etag: str = None,
+                       content_hash: str = None) -> tuple:
+        """
+        Cherche une vidéo déjà téléchargée (statut "done", autre page que
+        `page_url`) ayant la même source (media_key de `source`) et la même
+        taille, avec le même ETag s'il est connu des deux côtés ; sans
+        `source`, la même taille et le même ETag ; ou la même empreinte.
+        Seuls les critères fournis sont utilisés. Retourne (page d'origine,
+        chemin) ou None.
+        """
+        conditions = []
+        params = []
+        if source and size:
+            conditions.append("(media_key = ? AND size = ? AND (? IS NULL OR etag IS NULL OR etag = ?))")
+            params.extend((media_key(source), size, etag, etag))
+        elif size and etag:
+            conditions.append("(size = ? AND etag = ?)")
+            params.extend((size, etag))
+        if content_hash:
+            conditions.append("content_hash = ?")
+            params.append(content_hash)
+        if not conditions:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_url, path FROM videos WHERE status = 'done' AND page_url != ?"
+                f" AND ({' OR '.join(conditions)}) LIMIT 1",
+                (page_url, *params)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def add_album(self, page_url: str, items: list, tags: list = None) -> None:
+        """
+        Enregistre `page_url` comme album ("album" tant que toutes ses
+        vidéos ne sont pas terminées) et ses vidéos `items` [(clé, source)]
+        en "queued" (une vidéo déjà connue garde son statut).
+        """
+        now = get_current_time()
+        tags_string = ",".join(tags) if tags else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO videos (page_url, tags, status, created_at, updated_at)"
+                " VALUES (?, ?, 'album', ?, ?)"
+                " ON CONFLICT(page_url) DO UPDATE SET status = 'album',"
+                " tags = COALESCE(excluded.tags, tags), updated_at = excluded.updated_at",
+                (page_url, tags_string, now, now)
+            )
+            self._executemany(
+                "INSERT INTO videos (page_url, video_src, media_key, tags, status, parent_url,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)"
+                " ON CONFLICT(page_url) DO NOTHING",
+                [(item_url, video_src, media_key(video_src), tags_string, page_url, now, now)
+                 for item_url, video_src in items]
+            )
+
+    def complete_album(self, page_url: str) -> bool:
+        """
+        Passe l'album `page_url` en "done" si toutes ses vidéos sont
+        terminées (téléchargées, doublons, rejetées, en quarantaine ou
+        abandonnées après PAGE_MAX_FAILURES échecs). Retourne True si
+        c'est le cas.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE videos SET status = 'done', updated_at = ?"
+                " WHERE page_url = ? AND status = 'album' AND NOT EXISTS ("
+                " SELECT 1 FROM videos WHERE parent_url = ?"
+                " AND status NOT IN ('done', 'duplicate', 'rejected', 'quarantined')"
+                " AND COALESCE(failures, 0) < ?)",
+                (get_current_time(), page_url, page_url, PAGE_MAX_FAILURES)
+            )
+        return cursor.rowcount > 0
+
+    def add_links(self, tag: str, links) -> None:
+        """
+        Enregistre les liens trouvés pour `tag` (un lien déjà connu pour ce
+        tag n'est pas dupliqué ; déjà trouvé par un autre tag, il est ajouté
+        pour celui-ci).
+        """
+        now = get_current_time()
+        with self._lock:
+            self._executemany(
+                "INSERT INTO links (url, tag, first_seen, last_seen) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(url, tag) DO UPDATE SET last_seen = excluded.last_seen",
+                [(link, tag, now, now) for link in links]
+            )
+            if self._seen is not None:
+                self._sync_seen()
+
+    def has_link(self, url: str, tag: str) -> bool:
+        """True si `url` a déjà été trouvé pour `tag`."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM links WHERE url = ? AND tag = ?",
+                                     (url, tag)).fetchone()
+        return row is not None
+
+    def seen_links(self, tag: str) -> SeenLinks:
+        """
+        Liens déjà vus pour `tag`, pour la recherche incrémentale.
+        Le filtre est ouvert (ou construit) au premier appel et rattrape les
+        liens ajoutés depuis sa dernière mise à jour, en lisant la table
+        links par rowid croissant, sans la charger en mémoire.
+        """
+        with self._lock:
+            if self._seen is None:
+                self._seen = SeenFilter(self.path + SEEN_FILTER_SUFFIX)
+                self._sync_seen()
+            return SeenLinks(self, self._seen, tag)
+
+    def mark_seen(self, url: str, tag: str) -> None:
+        """Ajoute `url` au filtre de `tag` (lien vu, enregistré ensuite par add_links)."""
+        with self._lock:
+            self._seen.add(seen_key(tag, url))
+
+    def _sync_seen(self) -> None:
+        """Intègre au filtre les liens de rowid > au dernier intégré (verrou déjà pris)."""
+        last = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM links").fetchone()[0]
+        if last < self._seen.synced_rowid:
+            self._seen.clear()  # Index remplacé ou recréé : filtre reconstruit
+        if last > self._seen.synced_rowid:
+            for url, tag in self._conn.execute("SELECT url, tag FROM links WHERE rowid > ?",
+                                               (self._seen.synced_rowid,)):
+                self._seen.add(seen_key(tag, url))
+            self._seen.set_synced(last)
+
+    def pending_links(self, tag: str) -> list:
+        """
+        Liens vus pour `tag` qui n'ont été ni téléchargés, ni rejetés, ni
+        mis en quarantaine (échecs, téléchargements partiels) : à retenter,
+        sauf s'ils attendent leur prochain essai ou ont été abandonnés
+        (record_failure).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT l.url FROM links l LEFT JOIN videos v ON v.page_url = l.url"
+                " WHERE l.tag = ? AND (v.status IS NULL"
+                " OR v.status NOT IN ('done', 'rejected', 'duplicate', 'quarantined'))"
+                f" AND {RETRY_DUE_SQL}",
+                (tag, PAGE_MAX_FAILURES, get_current_time())
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, status: str = "done") -> int:
+        """Nombre d'entrées ayant le statut donné."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM videos WHERE status = ?", (status,)
+            ).fetchone()[0]
+
+    def import_legacy(self, legacy_file: str = LEGACY_DOWNLOADED_FILE) -> int:
+        """
+        Importe l'ancien downloaded_videos.txt si l'index est encore vide,
+        ligne par ligne (le fichier n'est pas chargé en mémoire).
+        Retourne le nombre d'URL importées.
+        """
+        if not os.path.exists(legacy_file):
+            return 0
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM videos LIMIT 1").fetchone():
+                return 0
+            now = get_current_time()
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                self._executemany(
+                    "INSERT OR IGNORE INTO videos (page_url, status, created_at, updated_at)"
+                    " VALUES (?, 'done', ?, ?)",
+                    ((line.strip(), now, now) for line in f if line.strip())
+                )
+            return self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def summary(self) -> dict:
+        """
+        Nombre d'entrées par statut, de liens vus, de liens encore à traiter
+        et d'éléments abandonnés après PAGE_MAX_FAILURES échecs.
+        """
+        with self._lock:
+            statuses = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM videos GROUP BY status"
+            ).fetchall())
+            links = self._conn.execute("SELECT COUNT(DISTINCT url) FROM links").fetchone()[0]
+            pending = self._conn.execute(
+                "SELECT COUNT(DISTINCT l.url) FROM links l LEFT JOIN videos v ON v.page_url = l.url"
+                " WHERE (v.status IS NULL"
+                " OR v.status NOT IN ('done', 'rejected', 'duplicate', 'quarantined'))"
+                f" AND {RETRY_DUE_SQL}",
+                (PAGE_MAX_FAILURES, get_current_time())
+            ).fetchone()[0]
+            abandoned = self._conn.execute(
+                "SELECT COUNT(*) FROM videos WHERE failures >= ?", (PAGE_MAX_FAILURES,)
+            ).fetchone()[0]
+        return {"videos": statuses, "links": links, "pending_links": pending,
+                "abandoned": abandoned}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+            if self._seen is not None:
+                self._seen.close()
+
+# -------------------------------------------------------------------------
+# SESSIONS HTTP (POOL DE CONNEXIONS KEEP-ALIVE)
+# -------------------------------------------------------------------------
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    Adaptateur HTTP qui applique un timeout par défaut à chaque requête
+    (requests ne permet pas de le fixer au niveau de la Session).
+    """
+    def __init__(self, *args, timeout: float = TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+_sessions = {}
+_sessions_lock = Lock()
+
+def create_session(proxies: dict = None) -> requests.Session:
+    """
+    Construit une Session requests avec un pool de connexions dimensionné
+    pour THREADS workers, les en-têtes par défaut, le timeout et les proxies.
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        timeout=TIMEOUT,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    if proxies:
+        session.proxies.update(proxies)
+        # Sinon HTTP(S)_PROXY de l'environnement l'emporterait sur le proxy choisi
+        session.trust_env = False
+    return session
+
+def get_session(proxies: dict = None) -> requests.Session:
+    """
+    Retourne la Session partagée associée à cette configuration de proxy
+    (créée au premier appel). Le pool urllib3 sous-jacent est thread-safe :
+    les connexions TCP+TLS sont réutilisées entre threads au lieu d'être
+    rouvertes à chaque requête.
+    """
+    key = tuple(sorted((proxies or {}).items()))
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = create_session(proxies)
+            _sessions[key] = session
+    return session
+
+def close_sessions() -> None:
+    """Ferme toutes les sessions ouvertes (et leurs connexions keep-alive)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+# -------------------------------------------------------------------------
+# LIMITEUR DE CONCURRENCE ADAPTATIF (PAR HÔTE)
+# -------------------------------------------------------------------------
+def is_throttle_status(status_code: int) -> bool:
+    """True si le code HTTP indique une limitation de débit (429, 503)."""
+    return status_code in THROTTLE_STATUSES
+
+def parse_retry_after(value: str) -> float:
+    """
+    Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes,
+    borné à [0, MAX_RETRY_AFTER]. Retourne None si absent ou illisible.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_date.tzinfo is None:
+            retry_date = retry_date.replace(tzinfo=timezone.utc)
+        seconds = (retry_date - datetime.now(timezone.utc)).total_seconds()
+    if seconds != seconds:  # NaN
+        return None
+    return min(max(0.0, seconds), MAX_RETRY_AFTER)
+
+class HostSlot:
+    """
+    Créneau accordé par le limiteur pour un hôte ; lui signale les réponses.
+    pause() le rend le temps d'une attente sans requête en cours (tour de
+    TRANSFER_GATE) et resume() le reprend sans attendre : la réponse est
+    déjà là, seule la lecture de son corps reste à faire.
+    """
+    def __init__(self, limiter: "AdaptiveLimiter", host: str):
+        self.limiter = limiter
+        self.host = host
+        self.held = True
+
+    def pause(self) -> None:
+        if self.held:
+            self.limiter.release(self.host)
+            self.held = False
+
+    def resume(self) -> None:
+        if not self.held:
+            self.limiter.reserve(self.host)
+            self.held = True
+
+    def observe(self, resp):
+        """
+        Transmet le statut (et Retry-After) de `resp` au limiteur, puis la
+        renvoie. Accepte une réponse requests (status_code) ou aiohttp (status).
+        """
+        status_code = resp.status_code if hasattr(resp, "status_code") else resp.status
+        STATS.incr("http_responses", str(status_code))
+        self.limiter.record(self.host, status_code, resp.headers.get("Retry-After"))
+        return resp
+
+def engine_concurrency() -> int:
+    """Nombre de téléchargements simultanés du moteur configuré (ENGINE)."""
+    return ASYNC_CONCURRENCY if ENGINE == "asyncio" else THREADS
+
+class AdaptiveLimiter:
+    """
+    Limite le nombre de requêtes simultanées par hôte (site et CDN vidéo
+    sont suivis séparément), selon un schéma AIMD : la limite augmente de 1
+    après `limite` réponses saines consécutives, et elle est divisée par 2
+    sur un 429/503. L'hôte est alors suspendu pendant Retry-After
+    (ou THROTTLE_BACKOFF). Sans `maximum`, la limite plafonne à la
+    concurrence du moteur (engine_concurrency(), lue à chaque ajustement).
+    """
+    def __init__(self,
+                 initial: int = CONCURRENCY_INITIAL,
+                 minimum: int = CONCURRENCY_MIN,
+                 maximum: int = None):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self._cond = Condition()
+        self._hosts = {}
+
+    def _state(self, host: str) -> dict:
+        state = self._hosts.get(host)
+        if state is None:
+            state = {
+                "limit": self.initial,
+                "active": 0,
+                "successes": 0,
+                "blocked_until": 0.0,
+                "last_decrease": 0.0,
+                "waiters": [],      # Moteur asyncio : (boucle, future) des coroutines en attente
+            }
+            self._hosts[host] = state
+        return state
+
+    def acquire(self, host: str, deadline: Deadline = None) -> bool:
+        """
+        Attend qu'un créneau soit libre pour `host` (et la fin d'un éventuel
+        blocage). Retourne False (rien n'est réservé) si `deadline` expire
+        avant, même au milieu d'une pause Retry-After.
+        """
+        deadline = deadline or Deadline()
+        with self._cond:
+            state = self._state(host)
+            while True:
+                wait = state["blocked_until"] - time.monotonic()
+                if wait <= 0 and state["active"] < state["limit"]:
+                    break
+                if deadline.expired():
+                    return False
+                # Réveil au moins chaque seconde : Deadline.cancel() ne notifie pas
+                self._cond.wait(timeout=min(1.0, deadline.remaining(), wait if wait > 0 else 1.0))
+            state["active"] += 1
+            return True
+
+    async def async_acquire(self, host: str, deadline: Deadline = None) -> bool:
+        """Équivalent d'acquire() pour le moteur asyncio (attente sans bloquer la boucle)."""
+        deadline = deadline or Deadline()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                state = self._state(host)
+                wait = state["blocked_until"] - time.monotonic()
+                if wait <= 0 and state["active"] < state["limit"]:
+                    state["active"] += 1
+                    return True
+                if deadline.expired():
+                    return False
+                waiter = (loop, loop.create_future())
+                state["waiters"].append(waiter)
+            try:
+                # Réveil par release()/record() ; fin de blocage et échéance guettées par timeout
+                await asyncio.wait_for(waiter[1], timeout=min(1.0, deadline.remaining(),
+                                                              wait if wait > 0 else 1.0))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    if waiter in state["waiters"]:
+                        state["waiters"].remove(waiter)
+
+    def _wake(self, state: dict) -> None:
+        """
+        Réveille les coroutines en attente (verrou tenu) : autant que de
+        créneaux libres, ou toutes pendant un blocage (elles attendent alors
+        sa fin par timeout).
+        """
+        if state["blocked_until"] > time.monotonic():
+            count = len(state["waiters"])
+        else:
+            count = max(0, state["limit"] - state["active"])
+        for loop, future in state["waiters"][:count]:
+            loop.call_soon_threadsafe(_grant_future, future)
+        del state["waiters"][:count]
+
+    def reserve(self, host: str) -> None:
+        """Prend un créneau sans attendre, même au-delà de la limite (HostSlot.resume)."""
+        with self._cond:
+            self._state(host)["active"] += 1
+
+    def release(self, host: str) -> None:
+        with self._cond:
+            state = self._state(host)
+            state["active"] -= 1
+            self._wake(state)
+            self._cond.notify_all()
+
+    def record(self, host: str, status_code: int, retry_after: str = None) -> None:
+        """Ajuste la limite de `host` selon le statut d'une réponse."""
+        with self._cond:
+            state = self._state(host)
+            now = time.monotonic()
+            if is_throttle_status(status_code):
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = THROTTLE_BACKOFF
+                state["blocked_until"] = max(state["blocked_until"], now + delay)
+                state["successes"] = 0
+                # Une seule réduction par rafale de 429 (réponses déjà en vol)
+                if now - state["last_decrease"] >= DECREASE_COOLDOWN:
+                    state["limit"] = max(self.minimum, state["limit"] // 2)
+                    state["last_decrease"] = now
+                    log_event(f"[LIMIT] {host} : code {status_code}, limite réduite à "
+                              f"{state['limit']}, pause {delay:.0f}s")
+            elif status_code < 400:
+                state["successes"] += 1
+                if (state["successes"] >= state["limit"]
+                        and state["limit"] < (self.maximum or engine_concurrency())):
+                    state["limit"] += 1
+                    state["successes"] = 0
+            self._wake(state)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url: str, deadline: Deadline = None):
+        """
+        Contexte qui occupe un créneau pour l'hôte de `url` ; fournit un
+        HostSlot. Lève DeadlineExceeded si `deadline` expire avant.
+        """
+        host = urlsplit(url).netloc
+        if not self.acquire(host, deadline):
+            raise DeadlineExceeded()
+        host_slot = HostSlot(self, host)
+        try:
+            yield host_slot
+        finally:
+            if host_slot.held:
+                self.release(host)
+
+    @asynccontextmanager
+    async def async_slot(self, url: str, deadline: Deadline = None):
+        """Équivalent de slot() pour le moteur asyncio (attente sans bloquer la boucle)."""
+        host = urlsplit(url).netloc
+        if not await self.async_acquire(host, deadline):
+            raise DeadlineExceeded()
+        host_slot = HostSlot(self, host)
+        try:
+            yield host_slot
+        finally:
+            if host_slot.held:
+                self.release(host)
+
+    def limits(self) -> dict:
+        """Limite courante par hôte."""
+        with self._cond:
+            return {host: state["limit"] for host, state in self._hosts.items()}
+
+HOST_LIMITER = AdaptiveLimiter()
+
+# -------------------------------------------------------------------------
+# ORDONNANCEMENT DES TRANSFERTS (TAILLE, DÉBIT)
+# -------------------------------------------------------------------------
+class GateTicket:
+    """Transfert en attente d'admission (taille restante, ordre d'arrivée)."""
+    def __init__(self, size: int, seq: int):
+        self.size = size
+        self.seq = seq
+        self.since = time.monotonic()
+        self.granted = False
+        self.future = None          # Moteur asyncio : réveil de la coroutine
+        self.loop = None
+
+class TransferGate:
+    """
+    Admission des transferts une fois leur taille connue (en-têtes du GET),
+    avant la lecture du corps. Avec plus de workers (THREADS, ou coroutines)
+    que de créneaux (`slots`), plusieurs transferts attendent et `policy`
+    choisit celui qui démarre :
+      - "fifo"     : aucune attente (comportement historique) ;
+      - "shortest" : le plus petit d'abord (plus de vidéos finies par cycle) ;
+      - "largest"  : le plus gros d'abord (raccourcit la traîne du cycle) ;
+      - "budget"   : octets en vol bornés par `byte_budget` ; le plus gros
+                     transfert qui tient dans le reste démarre et les petits
+                     comblent les trous (remplissage de type bin packing).
+    Les limites (créneaux, budget) ne sont jamais dépassées. Le transfert
+    le plus ancien passe en priorité après TRANSFER_MAX_WAIT / 2
+    d'attente (pas de famine des gros transferts) ; après
+    TRANSFER_MAX_WAIT, il renonce (acquire retourne False), pour qu'une
+    réponse ne reste pas non lue jusqu'à TIMEOUT : l'appelant la ferme et
+    reporte la tâche (RESULT_DEFERRED).
+    """
+    POLICIES = ("fifo", "shortest", "largest", "budget")
+
+    def __init__(self,
+                 policy: str = SCHEDULING_POLICY,
+                 slots: int = TRANSFER_SLOTS,
+                 byte_budget: int = TRANSFER_BYTE_BUDGET):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Politique de transfert inconnue : {policy!r}")
+        self.policy = policy
+        self.slots = slots
+        self.byte_budget = byte_budget
+        self._cond = Condition()
+        self._waiting = []
+        self._active = 0
+        self._inflight = 0
+        self._seq = 0
+
+    def _fits(self, size: int) -> bool:
+        if self.policy == "fifo" or not self._active:
+            return True
+        if self._active >= self.slots:
+            return False
+        return self.policy != "budget" or self._inflight + size <= self.byte_budget
+
+    def _next(self) -> GateTicket:
+        """Ticket prioritaire selon la politique (ou None)."""
+        oldest = min(self._waiting, key=lambda t: t.seq)
+        if time.monotonic() - oldest.since >= TRANSFER_MAX_WAIT / 2:
+            return oldest
+        if self.policy == "shortest":
+            return min(self._waiting, key=lambda t: (t.size, t.seq))
+        if self.policy == "largest":
+            return max(self._waiting, key=lambda t: (t.size, -t.seq))
+        if self.policy == "budget":
+            fitting = [t for t in self._waiting if self._fits(t.size)]
+            return max(fitting, key=lambda t: (t.size, -t.seq)) if fitting else None
+        return oldest
+
+    def _dispatch(self) -> None:
+        """Admet les transferts en attente tant que la politique le permet (verrou tenu)."""
+        while self._waiting:
+            ticket = self._next()
+            if ticket is None or not self._fits(ticket.size):
+                break
+            self._waiting.remove(ticket)
+            ticket.granted = True
+            self._active += 1
+            self._inflight += ticket.size
+            STATS.observe("gate_wait", time.monotonic() - ticket.since)
+            if ticket.future is not None:
+                ticket.loop.call_soon_threadsafe(_grant_future, ticket.future)
+        self._cond.notify_all()
+
+    def _enter(self, size: int, loop=None) -> GateTicket:
+        with self._cond:
+            self._seq += 1
+            ticket = GateTicket(size, self._seq)
+            if loop is not None:
+                ticket.loop = loop
+                ticket.future = loop.create_future()
+            self._waiting.append(ticket)
+            self._dispatch()
+            return ticket
+
+    def _settle(self, ticket: GateTicket) -> bool:
+        """Fin d'attente : True si le ticket est admis, sinon il est retiré de la file."""
+        with self._cond:
+            if ticket.granted:
+                return True
+            if time.monotonic() - ticket.since >= TRANSFER_MAX_WAIT:
+                STATS.incr("gate_gave_up")
+            self._waiting.remove(ticket)
+            self._dispatch()
+            return False
+
+    @staticmethod
+    def _remaining(ticket: GateTicket, deadline: Deadline) -> float:
+        """Attente encore permise à `ticket` : ni après `deadline`, ni au-delà de TRANSFER_MAX_WAIT."""
+        return max(0.0, min(deadline.remaining(),
+                            ticket.since + TRANSFER_MAX_WAIT - time.monotonic()))
+
+    def acquire(self, size: int, deadline: Deadline = None) -> bool:
+        """
+        Attend l'admission d'un transfert de `size` octets. Retourne False
+        (rien n'est réservé) si `deadline` expire avant, ou après
+        TRANSFER_MAX_WAIT d'attente.
+        """
+        deadline = deadline or Deadline()
+        ticket = self._enter(size)
+        with self._cond:
+            while not ticket.granted and self._remaining(ticket, deadline):
+                self._cond.wait(timeout=min(1.0, self._remaining(ticket, deadline)))
+                self._dispatch()  # Ticket le plus ancien passé en priorité
+        return self._settle(ticket)
+
+    async def async_acquire(self, size: int, deadline: Deadline = None) -> bool:
+        """Équivalent d'acquire() pour le moteur asyncio (attente sans bloquer la boucle)."""
+        deadline = deadline or Deadline()
+        ticket = self._enter(size, asyncio.get_running_loop())
+        while not ticket.granted and self._remaining(ticket, deadline):
+            try:
+                await asyncio.wait_for(asyncio.shield(ticket.future),
+                                       timeout=min(1.0, self._remaining(ticket, deadline)))
+            except asyncio.TimeoutError:
+                with self._cond:
+                    self._dispatch()
+        return self._settle(ticket)
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self._active -= 1
+            self._inflight -= size
+            self._dispatch()
+
+    @contextmanager
+    def admit(self, size: int, deadline: Deadline = None):
+        """
+        Contexte d'un transfert de `size` octets ; fournit False si
+        l'échéance a été atteinte ou l'attente a dépassé TRANSFER_MAX_WAIT.
+        """
+        admitted = self.acquire(size, deadline)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release(size)
+
+    @asynccontextmanager
+    async def async_admit(self, size: int, deadline: Deadline = None):
+        """Équivalent d'admit() pour le moteur asyncio."""
+        admitted = await self.async_acquire(size, deadline)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release(size)
+
+def _grant_future(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(True)
+
+class TokenBucket:
+    """
+    Seau à jetons partagé par tous les transferts (threads et boucle
+    asyncio) : débit moyen `rate` octets/s, rafale `burst` octets.
+    Chaque appelant réserve ses octets puis dort le délai retourné ; une
+    réservation peut creuser une dette, payée par les suivants.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = Lock()
+
+    def reserve(self, amount: int) -> float:
+        """Réserve `amount` octets ; retourne l'attente (secondes) avant de continuer."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+TRANSFER_GATE = TransferGate()
+BANDWIDTH = TokenBucket(BANDWIDTH_LIMIT, BANDWIDTH_BURST) if BANDWIDTH_LIMIT else None
+
 # -------------------------------------------------------------------------
 # FONCTIONS DE TEST DU PROXY
 # -------------------------------------------------------------------------
@@ -91,6 +1571,17 @@ def test_proxy(proxies: dict) -> bool:
         print(f"[test_proxy] Erreur lors du test du proxy : {e}")
         return False
 
+def proxies_from_url(proxy_url: str) -> dict:
+    """
+    Construit le dict 'proxies' (requests) pour une URL de proxy, ex:
+    socks5://user:pass@hôte:port (http:// par défaut). None si vide.
+    """
+    if not proxy_url:
+        return None
+    if "://" not in proxy_url:
+        proxy_url = "http://" + proxy_url
+    return {"http": proxy_url, "https": proxy_url}
+
 def get_proxies() -> dict:
     """
     Demande à l'utilisateur s'il souhaite utiliser un proxy.
@@ -167,380 +1658,2916 @@ def get_proxies() -> dict:
             return None
 
 # -------------------------------------------------------------------------
-# FONCTIONS POUR LA RECHERCHE DE LIENS
+# EXTRACTION HTML (UNE SEULE ANALYSE PAR PAGE)
 # -------------------------------------------------------------------------
-def parse_page_for_links(html_content: str) -> list:
+@dataclass
+class PageData:
     """
-    Analyse le HTML et renvoie la liste des liens qui contiennent '/a/' ou '/v/'.
+    Résultat d'une analyse de page : tags, sources vidéo et liens /a/ /v/.
+    `video_srcs` liste toutes les <source> ; `media_srcs` une seule source
+    par <video> (la première en .mp4, sinon la première), soit une entrée
+    par vidéo d'un album.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    links_found = []
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        if "/a/" in href or "/v/" in href:
-            links_found.append(href)
-    return links_found
+    tags: list = field(default_factory=list)
+    video_srcs: list = field(default_factory=list)
+    media_srcs: list = field(default_factory=list)
+    links: list = field(default_factory=list)
 
-def search_videos(tag: str, output_file: str, proxies: dict,
-                  num_links: int = MAX_LINKS, 
-                  max_pages: int = MAX_PAGES) -> list:
+@functools.lru_cache(maxsize=None)
+def page_strainer() -> "bs4.SoupStrainer":
+    """Seules ces balises (et leur contenu) sont construites par BeautifulSoup."""
+    return bs4.SoupStrainer(["a", "p", "video"])
+
+def get_parser_backend() -> str:
     """
-    Recherche jusqu’à `num_links` liens contenant '/a/' ou '/v/' sur Erome,
-    en paginant (jusqu'à `max_pages`) si nécessaire.
-    Retourne une liste de liens uniques.
+    Retourne le backend d'analyse effectif selon PARSER_BACKEND :
+    "lxml" si demandé (ou "auto") et installé, sinon "strainer"
+    (html.parser limité par SoupStrainer) ou "html.parser" (arbre complet).
     """
-    video_links = set()
-    page = 1
-    
-    while len(video_links) < num_links and page <= max_pages:
-        url = f"https://www.erome.com/search?q={tag}&page={page}"
-        try:
-            response = requests.get(url, headers=HEADERS, proxies=proxies, timeout=TIMEOUT)
-        except requests.exceptions.RequestException as e:
-            print(f"[{get_current_time()}] Erreur réseau: {e}")
-            log_event(f"Erreur réseau lors de la recherche de vidéos : {e}")
-            break
+    if PARSER_BACKEND in ("auto", "lxml"):
+        if lxml_html is not None:
+            return "lxml"
+        return "strainer"
+    return PARSER_BACKEND
 
-        if response.status_code != 200:
-            print(f"[{get_current_time()}] Erreur HTTP {response.status_code} pour {url}. Arrêt pagination.")
-            log_event(f"Erreur HTTP {response.status_code} pour {url} (recherche_videos).")
-            break
+def _is_page_link(href: str) -> bool:
+    return "/a/" in href or "/v/" in href
 
-        links_in_page = parse_page_for_links(response.text)
-        found_on_page = 0
-        
-        for href in links_in_page:
-            # Fabriquer l'URL absolue si nécessaire
-            if not href.startswith("https://"):
-                href = "https://www.erome.com" + href
-            
-            if href not in video_links:
-                video_links.add(href)
-                found_on_page += 1
-            
-            if len(video_links) >= num_links:
-                break
+def _preferred_source(srcs: list) -> str:
+    """Source retenue pour une <video> : la première en .mp4, sinon la première."""
+    return next((src for src in srcs if is_mp4_link(src)), srcs[0])
 
-        print(f"[{get_current_time()}] Page {page}: +{found_on_page} liens. (Total provisoire: {len(video_links)})")
-        page += 1
-        time.sleep(SEARCH_DELAY)  # éviter de surcharger le site
+def _extract_page_lxml(html_content: str) -> PageData:
+    """Extraction via lxml (XPath, analyse en C)."""
+    data = PageData()
+    if not html_content.strip():
+        return data
+    doc = lxml_html.fromstring(html_content)
 
-    # Sauvegarder les liens trouvés
-    if video_links:
-        with open(output_file, "a", encoding="utf-8") as f:
-            for link in video_links:
-                f.write(f"[{get_current_time()}] {link}\n")
+    p_tags = doc.xpath('//p[contains(concat(" ", normalize-space(@class), " "), " mt-10 ")]')
+    if p_tags:
+        for a in p_tags[0].xpath('.//a[@href]'):
+            raw_text = "".join(text.strip() for text in a.itertext())
+            if raw_text:
+                data.tags.append(clean_tag(raw_text))
 
-        print(f"[{get_current_time()}] Total: {len(video_links)} liens pour le tag '{tag}', pages: {page-1}.")
-    else:
-        print(f"[{get_current_time()}] Aucun lien récupéré pour '{tag}'.")
+    for video in doc.xpath('//video'):
+        srcs = [src for src in video.xpath('.//source/@src') if src]
+        if srcs:
+            data.video_srcs.extend(srcs)
+            data.media_srcs.append(_preferred_source(srcs))
+    data.links = [href for href in doc.xpath('//a/@href') if _is_page_link(href)]
+    return data
 
-    return list(video_links)
+def _extract_page_soup(html_content: str, parse_only=None) -> PageData:
+    """Extraction via BeautifulSoup/html.parser (arbre complet ou filtré)."""
+    data = PageData()
+    soup = bs4.BeautifulSoup(html_content, "html.parser", parse_only=parse_only)
+
+    p_tags = soup.find("p", class_="mt-10")
+    if p_tags:
+        for a in p_tags.find_all("a", href=True):
+            raw_text = a.get_text(strip=True)
+            if raw_text:
+                data.tags.append(clean_tag(raw_text))
+
+    for video_tag in soup.find_all("video"):
+        srcs = [source_tag["src"] for source_tag in video_tag.find_all("source")
+                if source_tag.get("src")]
+        if srcs:
+            data.video_srcs.extend(srcs)
+            data.media_srcs.append(_preferred_source(srcs))
+
+    for link in soup.find_all("a", href=True):
+        if _is_page_link(link["href"]):
+            data.links.append(link["href"])
+    return data
+
+def extract_page(html_content: str) -> PageData:
+    """
+    Analyse le HTML une seule fois et renvoie un PageData contenant
+    les tags (<p class="mt-10">), toutes les sources <video><source>
+    et les liens '/a/' ou '/v/' de la page.
+    """
+    backend = get_parser_backend()
+    if backend == "lxml":
+        return _extract_page_lxml(html_content)
+    if backend == "strainer":
+        return _extract_page_soup(html_content, parse_only=page_strainer())
+    return _extract_page_soup(html_content)
+
+# -------------------------------------------------------------------------
+# CACHE DES PAGES (SQLITE, LRU BORNÉ, REVALIDATION CONDITIONNELLE)
+# -------------------------------------------------------------------------
+@dataclass
+class CachedPage:
+    """Entrée du cache : page analysée et validateurs de la réponse d'origine."""
+    data: PageData
+    etag: str
+    last_modified: str
+    fetched_at: float  # time.time() de la dernière réponse 200 ou 304
+
+class PageCache:
+    """
+    Cache disque (SQLite, mode WAL) des pages du site, indexé par URL : le
+    résultat de l'analyse (PageData en JSON, pas le HTML), l'ETag et le
+    Last-Modified pour la revalidation, la date de récupération (TTL) et
+    celle du dernier usage (LRU). Au-delà de `max_bytes`, les entrées les
+    moins récemment utilisées sont supprimées jusqu'à 90 % de la borne.
+    Une seule connexion partagée, protégée par un verrou interne.
+    """
+    def __init__(self, path: str = PAGE_CACHE_FILE, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_used_at ON pages (used_at)")
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str) -> CachedPage:
+        """Entrée de `url` (marquée comme utilisée), ou None si absente."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET used_at = ? WHERE url = ?", (time.time(), url))
+        data, etag, last_modified, fetched_at = row
+        return CachedPage(PageData(**json.loads(data)), etag, last_modified, fetched_at)
+
+    def put(self, url: str, data: PageData, etag: str = None, last_modified: str = None) -> None:
+        """Enregistre (ou remplace) l'entrée de `url`, puis applique la borne de taille."""
+        payload = json.dumps(asdict(data), ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, data, size, etag, last_modified, fetched_at, used_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, payload, len(payload), etag, last_modified, now, now)
+            )
+            self._total += len(payload) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict(self.max_bytes * 9 // 10)
+
+    def usage(self) -> tuple:
+        """(nombre d'entrées, octets occupés)."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            return entries, self._total
+
+    def refresh(self, url: str) -> None:
+        """Réponse 304 : l'entrée de `url` redevient fraîche."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ?, used_at = ? WHERE url = ?",
+                               (now, now, url))
+
+    def discard(self, url: str) -> None:
+        """Supprime l'entrée de `url` (source vidéo refusée, page à relire)."""
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._total -= row[0]
+
+    def _evict(self, target: int) -> None:
+        """Supprime les entrées les moins récemment utilisées jusqu'à `target` octets (verrou pris)."""
+        victims = []
+        total = self._total
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY used_at"):
+            if total <= target:
+                break
+            victims.append((url,))
+            total -= size
+        self._conn.execute("BEGIN")
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", victims)
+        self._conn.execute("COMMIT")
+        self._total = total
+        STATS.incr("page_cache", "evicted", len(victims))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+PAGE_CACHE = None  # PageCache ouvert par main() (None : pages toujours relues)
+
+def cached_page(url: str, max_age: float) -> tuple:
+    """
+    Consulte PAGE_CACHE pour `url`. Retourne (entrée, en-têtes) : l'entrée
+    seule si elle a moins de `max_age` secondes (à servir sans requête),
+    sinon les en-têtes conditionnels (If-None-Match / If-Modified-Since)
+    de sa revalidation, avec l'entrée éventuelle (à servir sur un 304).
+    """
+    if PAGE_CACHE is None:
+        return None, {}
+    entry = PAGE_CACHE.get(url)
+    if entry is None:
+        STATS.incr("page_cache", "miss")
+        return None, {}
+    if time.time() - entry.fetched_at < max_age:
+        STATS.incr("page_cache", "hit")
+        return entry, None
+    headers = {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return entry, headers
+
+def store_page(url: str, status_code: int, response_headers, html_content: str,
+               entry: CachedPage, parse_stage: str) -> PageData:
+    """
+    Exploite la réponse du GET de `url` : sur un 304, l'entrée du cache est
+    rafraîchie et servie ; sur un 200, le HTML est analysé une fois et mis
+    en cache avec ses validateurs. Retourne None pour tout autre statut.
+    """
+    if status_code == 304 and entry is not None:
+        STATS.incr("page_cache", "revalidated")
+        PAGE_CACHE.refresh(url)
+        return entry.data
+    if status_code != 200:
+        return None
+    with STATS.timed(parse_stage):
+        data = extract_page(html_content)
+    if PAGE_CACHE is not None:
+        PAGE_CACHE.put(url, data, response_headers.get("ETag"), response_headers.get("Last-Modified"))
+    return data
+
+def fetch_page(session: requests.Session, url: str, max_age: float,
+               get_stage: str, parse_stage: str, deadline: Deadline = None) -> tuple:
+    """
+    Page `url` analysée, via PAGE_CACHE : servie sans requête si elle a
+    moins de `max_age` secondes, revalidée sinon (304 : inchangée, rien
+    n'est retéléchargé ni réanalysé). Les erreurs réseau remontent à
+    l'appelant, ainsi que DeadlineExceeded si `deadline` expire en
+    attendant le limiteur d'hôte. Retourne (PageData ou None, code HTTP,
+    True si la page vient du cache).
+    """
+    entry, headers = cached_page(url, max_age)
+    if headers is None:
+        return entry.data, 200, True
+    with HOST_LIMITER.slot(url, deadline) as slot, STATS.timed(get_stage):
+        response = slot.observe(session.get(url, headers=headers))
+    data = store_page(url, response.status_code, response.headers, response.text, entry, parse_stage)
+    if response.status_code == 304 and data is not None:
+        return data, 200, True
+    return data, response.status_code, False
+
+async def async_fetch_page(http: "aiohttp.ClientSession", url: str, max_age: float,
+                           get_stage: str, parse_stage: str, deadline: Deadline = None) -> tuple:
+    """
+    Équivalent asyncio de fetch_page (les erreurs aiohttp remontent à
+    l'appelant). Le cache SQLite et l'analyse du HTML passent par un thread.
+    """
+    entry, headers = await asyncio.to_thread(cached_page, url, max_age)
+    if headers is None:
+        return entry.data, 200, True
+    async with HOST_LIMITER.async_slot(url, deadline) as slot:
+        with STATS.timed(get_stage):
+            async with http.get(url, headers=headers) as response:
+                slot.observe(response)
+                status_code = response.status
+                html_content = await response.text() if status_code == 200 else ""
+    data = await asyncio.to_thread(store_page, url, status_code, response.headers, html_content,
+                                   entry, parse_stage)
+    if status_code == 304 and data is not None:
+        return data, 200, True
+    return data, status_code, False
+
+def page_max_age(entry: tuple) -> float:
+    """
+    Âge max d'une page vidéo servie par le cache, selon son entrée d'index
+    (DownloadIndex.get_entry) : sans limite pour un album déjà analysé
+    (nouvel essai de ses vidéos), PAGE_CACHE_TTL sinon.
+    """
+    if entry is not None and entry[0] == "album":
+        return float("inf")
+    return PAGE_CACHE_TTL
+
+def forget_page(page_url: str) -> None:
+    """Oublie la page en cache (source vidéo refusée) : elle sera relue au prochain essai."""
+    if PAGE_CACHE is not None:
+        PAGE_CACHE.discard(page_url)
+
+# -------------------------------------------------------------------------
+# FONCTIONS POUR LA RECHERCHE DE LIENS
+# -------------------------------------------------------------------------
+def search_videos(tag: str, index: "DownloadIndex", proxies: dict,
+                  num_links: int = MAX_LINKS, 
+                  max_pages: int = MAX_PAGES,
+                  on_link=None,
+                  seen_links: "SeenLinks" = None,
+                  stale_pages: int = STALE_PAGES_LIMIT,
+                  deadline: Deadline = None) -> list:
+    """
+    Recherche jusqu’à `num_links` liens contenant '/a/' ou '/v/' sur Erome,
+    en paginant (jusqu'à `max_pages`) si nécessaire.
+    Si `on_link` est fourni, il est appelé avec chaque nouveau lien dès que
+    sa page est analysée (mode pipeline), sans attendre la fin de la pagination.
+    Mode incrémental (`seen_links` fourni : SeenLinks de l'index, ou un
+    ensemble) : les liens déjà présents dans `seen_links` sont ignorés, les
+    nouveaux y sont ajoutés, et la pagination s'arrête après `stale_pages`
+    pages consécutives sans nouveau lien.
+    La pagination s'arrête aussi à l'échéance `deadline` (Deadline) du cycle.
+    Les pages passent par le cache (fetch_page) : servies sans requête
+    pendant SEARCH_CACHE_TTL secondes, revalidées ensuite.
+    Les liens trouvés sont enregistrés (sans doublon) dans `index` à la
+    fin de chaque page.
+    Retourne une liste de liens uniques (uniquement les nouveaux en mode incrémental).
+    """
+    session = get_session(proxies)
+    video_links = set()
+    page = 1
+    stale = 0
+    deadline = deadline or Deadline()
+    
+    while len(video_links) < num_links and page <= max_pages:
+        if deadline.expired():
+            console(f"Échéance du cycle atteinte, arrêt de la pagination (page {page}).")
+            break
+        url = f"{BASE_URL}/search?q={tag}&page={page}"
+        try:
+            page_data, status_code, _ = fetch_page(session, url, SEARCH_CACHE_TTL,
+                                                   "search_get", "parse_links", deadline)
+        except DeadlineExceeded:
+            console(f"Échéance du cycle atteinte, arrêt de la pagination (page {page}).")
+            break
+        except requests.exceptions.RequestException as e:
+            console(f"Erreur réseau: {e}")
+            log_event(f"Erreur réseau lors de la recherche de vidéos : {e}")
+            break
+
+        if status_code != 200:
+            console(f"Erreur HTTP {status_code} pour {url}. Arrêt pagination.")
+            log_event(f"Erreur HTTP {status_code} pour {url} (recherche_videos).")
+            break
+
+        new_on_page = []
+        
+        for href in page_data.links:
+            # Fabriquer l'URL absolue si nécessaire
+            if not href.startswith(("https://", "http://")):
+                href = BASE_URL + href
+            
+            if seen_links is not None and href in seen_links:
+                continue
+
+            if href not in video_links:
+                video_links.add(href)
+                new_on_page.append(href)
+                if seen_links is not None:
+                    seen_links.add(href)
+                if on_link is not None:
+                    on_link(href)
+            
+            if len(video_links) >= num_links:
+                break
+
+        if new_on_page:
+            index.add_links(tag, new_on_page)
+        console(f"Page {page}: +{len(new_on_page)} liens. (Total provisoire: {len(video_links)})")
+        page += 1
+
+        if seen_links is not None:
+            stale = stale + 1 if not new_on_page else 0
+            if stale >= stale_pages:
+                console(f"{stale} page(s) sans nouveau lien, arrêt de la pagination.")
+                break
+
+        if len(video_links) < num_links and page <= max_pages:
+            deadline.sleep(SEARCH_DELAY)  # éviter de surcharger le site
+
+    if video_links:
+        console(f"Total: {len(video_links)} liens pour le tag '{tag}', pages: {page-1}.")
+    else:
+        console(f"Aucun nouveau lien récupéré pour '{tag}'.")
+
+    return list(video_links)
+
+# -------------------------------------------------------------------------
+# VÉRIFICATION D'INTÉGRITÉ (PENDANT LE TRANSFERT)
+# -------------------------------------------------------------------------
+class Mp4BoxScanner:
+    """
+    Analyse MP4 en flux : suit les en-têtes (taille + type) des boîtes de
+    premier niveau au fil des blocs reçus, sans relire le fichier. Seuls
+    quelques octets par boîte sont examinés, le contenu est sauté.
+    L'état est sérialisable (sidecar) pour continuer après une reprise.
+    """
+    def __init__(self, state: dict = None):
+        state = state or {}
+        self.position = state.get("position", 0)      # Octets analysés
+        self.next_box = state.get("next_box", 0)      # Début de la prochaine boîte
+        self.header = bytes.fromhex(state.get("header", ""))  # En-tête à cheval sur deux blocs
+        self.types = list(state.get("types", []))     # Types des boîtes vues, dans l'ordre
+        self.open_ended = state.get("open_ended", False)  # Boîte de taille 0 (jusqu'à la fin)
+        self.error = state.get("error")
+
+    def state(self) -> dict:
+        return {"position": self.position, "next_box": self.next_box, "header": self.header.hex(),
+                "types": self.types, "open_ended": self.open_ended, "error": self.error}
+
+    def update(self, data: bytes) -> None:
+        start = self.position
+        self.position += len(data)
+        while self.error is None and not self.open_ended:
+            rel = self.next_box + len(self.header) - start
+            if rel >= len(data):
+                return
+            want = 16 if len(self.header) >= 8 and self.header[:4] == b"\x00\x00\x00\x01" else 8
+            self.header += data[rel:rel + want - len(self.header)]
+            if len(self.header) < want:
+                continue
+            size, box_type = struct.unpack(">I4s", self.header[:8])
+            if size == 1 and want == 8:
+                continue  # Taille sur 64 bits : 8 octets d'en-tête de plus
+            if size == 1:
+                size = struct.unpack(">Q", self.header[8:16])[0]
+            if not all(32 <= c < 127 for c in box_type):
+                self.error = f"en-tête de boîte invalide à l'octet {self.next_box}"
+                return
+            self.types.append(box_type.decode("ascii"))
+            if size == 0:
+                self.open_ended = True
+            elif size < len(self.header):
+                self.error = f"taille de boîte invalide ({size}) à l'octet {self.next_box}"
+            else:
+                self.next_box += size
+            self.header = b""
+
+    def check(self) -> str:
+        """None si la structure est complète (ftyp, moov, dernière boîte entière), sinon la raison."""
+        if self.error:
+            return self.error
+        if "ftyp" not in self.types[:2]:
+            return "pas de boîte ftyp en tête"
+        if "moov" not in self.types:
+            return "pas de boîte moov"
+        if not self.open_ended and (self.header or self.next_box != self.position):
+            return f"dernière boîte incomplète ({self.position}/{self.next_box} octets)"
+        return None
+
+class StreamVerifier:
+    """
+    Contrôles calculés au fil des blocs écrits : CRC32 cumulatif (stocké
+    dans l'index) et, si VERIFY_MP4, structure des boîtes MP4. Son état
+    est enregistré dans le sidecar à chaque point de reprise.
+    """
+    def __init__(self, state: dict = None):
+        state = state or {}
+        self.position = state.get("position", 0)
+        self.crc = state.get("crc32", 0)
+        self.scanner = Mp4BoxScanner(state.get("mp4")) if VERIFY_MP4 else None
+
+    def update(self, data: bytes) -> None:
+        self.position += len(data)
+        self.crc = zlib.crc32(data, self.crc)
+        if self.scanner is not None:
+            self.scanner.update(data)
+
+    def state(self) -> dict:
+        state = {"position": self.position, "crc32": self.crc}
+        if self.scanner is not None:
+            state["mp4"] = self.scanner.state()
+        return state
+
+    @property
+    def checksum(self) -> str:
+        return f"crc32:{self.crc:08x}"
+
+    def check(self) -> str:
+        """None si le contenu reçu est valide, sinon la raison."""
+        return self.scanner.check() if self.scanner is not None else None
+
+def new_stream_verifier(part_path: str, offset: int, part_meta: dict):
+    """
+    StreamVerifier pour un transfert commençant à `offset` (None si
+    VERIFY_DOWNLOADS est désactivé). En reprise, l'état du sidecar est
+    repris tel quel ; à défaut (ancien sidecar), le début du .part est relu.
+    """
+    if not VERIFY_DOWNLOADS:
+        return None
+    state = part_meta.get("verify") if offset else None
+    if state and state.get("position") == offset:
+        return StreamVerifier(state)
+
+    verifier = StreamVerifier()
+    if offset:
+        remaining = offset
+        with open(part_path, "rb") as f:
+            while remaining > 0:
+                block = f.read(min(CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                verifier.update(block)
+                remaining -= len(block)
+    return verifier
+
+def quarantine_part(save_path: str) -> str:
+    """
+    Déplace le .part de `save_path` vers le sous-dossier QUARANTINE_FOLDER
+    (même disque) et supprime son sidecar. Retourne le nouveau chemin.
+    """
+    folder = os.path.join(os.path.dirname(save_path), QUARANTINE_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, os.path.basename(save_path))
+    os.replace(save_path + PART_SUFFIX, target)
+    try:
+        os.remove(save_path + PART_META_SUFFIX)
+    except FileNotFoundError:
+        pass
+    return target
 
 # -------------------------------------------------------------------------
 # FONCTIONS POUR LE TÉLÉCHARGEMENT
 # -------------------------------------------------------------------------
-def parse_page_for_tags(html_content: str) -> list:
+def get_resume_offset(save_path: str, video_src: str,
+                      etag: str = None, expected_size: int = None) -> tuple:
+    """
+    Retourne (octets déjà présents dans le .part de `save_path`, sidecar)
+    si le .part peut être repris : même URL et, si fournis (HEAD strict),
+    même ETag et même taille attendue. Sinon supprime le .part et son
+    sidecar et retourne (0, {}).
+    """
+    part_path = save_path + PART_SUFFIX
+    meta_path = save_path + PART_META_SUFFIX
+    if not os.path.exists(part_path):
+        return 0, {}
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = None
+
+    if (not meta
+            or meta.get("url") != video_src
+            or not meta.get("expected_size")
+            or (expected_size and meta.get("expected_size") != expected_size)
+            or (etag and meta.get("etag") and meta.get("etag") != etag)):
+        clear_part_state(save_path)
+        return 0, {}
+
+    # Anciens sidecars sans "written" : la taille du .part fait foi
+    part_size = os.path.getsize(part_path)
+    return min(meta.get("written", part_size), part_size), meta
+
+def preallocate_file(f, size: int) -> None:
+    """
+    Réserve `size` octets sur le disque pour le fichier ouvert `f`
+    (posix_fallocate si disponible, sinon extension par truncate).
+    """
+    if os.fstat(f.fileno()).st_size >= size:
+        return
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except (AttributeError, OSError):
+        f.truncate(size)
+
+def stream_to_file(chunks, part_path: str, offset: int, total_size: int,
+                   desc: str = "", checkpoint=None, hasher=None, verifier=None,
+                   deadline: Deadline = None) -> tuple:
+    """
+    Écrit les blocs de `chunks` dans `part_path` à partir de `offset`
+    (fichier préalloué à `total_size` si PREALLOCATE), en alimentant
+    `hasher` (empreinte du contenu) et `verifier` (StreamVerifier) s'ils
+    sont fournis : les contrôles portent sur les blocs déjà en mémoire.
+    La barre de progression, la vitesse et `checkpoint(octets_écrits)`
+    ne sont mis à jour qu'une fois par PROGRESS_INTERVAL, pas à chaque bloc.
+    Le transfert s'interrompt (DeadlineExceeded) dès que `deadline` expire ;
+    le dernier checkpoint permet de le reprendre au cycle suivant.
+    Le débit est borné par BANDWIDTH (seau à jetons global) s'il est défini.
+    Retourne (octets présents, exception réseau/disque/échéance ou None).
+    """
+    written = offset
+    reported = offset
+    error = None
+    with open(part_path, 'r+b' if offset else 'wb') as f, \
+            tqdm.tqdm(total=total_size, initial=offset, unit='B', unit_scale=True,
+                 desc=desc, mininterval=PROGRESS_INTERVAL) as pbar:
+        if PREALLOCATE and total_size:
+            preallocate_file(f, total_size)
+        f.seek(offset)
+
+        start_time = last_report = time.monotonic()
+        try:
+            for chunk in chunks:
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                if verifier is not None:
+                    verifier.update(chunk)
+                written += len(chunk)
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    speed = (written - offset) / (now - start_time)
+                    pbar.set_postfix_str(f"{speed/1024:.2f} KB/s", refresh=False)
+                    pbar.update(written - reported)
+                    reported = written
+                    last_report = now
+                    if checkpoint is not None:
+                        f.flush()  # Le sidecar ne doit pas devancer le fichier
+                        checkpoint(written)
+                if BANDWIDTH is not None:
+                    delay = BANDWIDTH.reserve(len(chunk))
+                    if delay:
+                        time.sleep(min(delay, deadline.remaining()) if deadline else delay)
+                if deadline is not None and deadline.expired():
+                    error = DeadlineExceeded()
+                    break
+        except (requests.exceptions.RequestException, OSError) as e:
+            error = e
+        pbar.update(written - reported)
+
+    STATS.incr("bytes_downloaded", value=written - offset)
+    if checkpoint is not None:
+        checkpoint(written)
+    return written, error
+
+def get_content_total(resp) -> int:
+    """
+    Taille totale du fichier distant d'après les en-têtes : le total de
+    Content-Range pour une réponse 206, sinon Content-Length. 0 si inconnue.
+    Accepte une réponse requests (status_code) ou aiohttp (status).
+    """
+    status_code = resp.status_code if hasattr(resp, "status_code") else resp.status
+    if status_code == 206:
+        total_str = resp.headers.get('Content-Range', '').rpartition('/')[2]
+    else:
+        total_str = resp.headers.get('Content-Length', '0')
+    try:
+        return int(total_str)
+    except ValueError:
+        return 0
+
+def check_media_headers(ctype: str, total_size: int) -> str:
+    """
+    Vérifie le type et la taille annoncés d'une vidéo.
+    Retourne None si acceptable, sinon la raison du rejet.
+    """
+    if not ctype.startswith('video'):
+        STATS.incr("rejections", "non_video")
+        return f"un type non vidéo ({ctype})"
+    if not (MIN_SIZE_BYTES <= total_size <= MAX_SIZE_BYTES):
+        STATS.incr("rejections", "size_out_of_bounds")
+        return f"une taille hors limites ({total_size} bytes)"
+    return None
+
+def save_part_state(save_path: str, video_src: str, etag: str,
+                    expected_size: int, written: int = 0, verify: dict = None) -> None:
+    """
+    Écrit le sidecar (URL, ETag, taille attendue, octets écrits, état des
+    vérifications en cours) à côté du .part. `written` fait foi pour la
+    reprise, le .part pouvant être préalloué à sa taille finale : les
+    octets comptés doivent donc avoir été vidés (flush) dans le .part
+    avant l'appel.
+    """
+    meta = {"url": video_src, "etag": etag, "expected_size": expected_size, "written": written}
+    if verify:
+        meta["verify"] = verify
+    # Remplacement atomique : un arrêt brutal laisse l'ancien sidecar, jamais un JSON tronqué
+    tmp_path = save_path + PART_META_SUFFIX + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, save_path + PART_META_SUFFIX)
+
+def clear_part_state(save_path: str) -> None:
+    """Supprime le .part et son sidecar s'ils existent."""
+    for suffix in (PART_SUFFIX, PART_META_SUFFIX):
+        try:
+            os.remove(save_path + suffix)
+        except FileNotFoundError:
+            pass
+
+def finalize_part(save_path: str) -> None:
+    """Renomme le .part terminé vers `save_path` et supprime le sidecar."""
+    os.replace(save_path + PART_SUFFIX, save_path)
+    try:
+        os.remove(save_path + PART_META_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+@dataclass
+class MediaTask:
+    """Vidéo d'un album, téléchargée comme tâche à part avec les tags de sa page."""
+    item_url: str     # Clé dans l'index : <page>#<fichier>
+    page_url: str     # Page de l'album
+    video_src: str
+    tags: list
+
+def task_key(task) -> str:
+    """Clé d'une tâche (lien de page ou MediaTask) dans l'index et les files."""
+    return task.item_url if isinstance(task, MediaTask) else task
+
+def album_item_url(page_url: str, video_src: str) -> str:
+    """Clé d'index d'une vidéo d'album : la page suivie du nom de fichier."""
+    return f"{page_url}#{media_key(video_src).rsplit('/', 1)[-1]}"
+
+def pick_video_sources(page_url: str, page_data: PageData, index: "DownloadIndex") -> list:
+    """
+    Retourne les sources MP4 (URL absolues, sans doublon) de la page : une
+    par <video>, donc plusieurs pour un album. Si aucune n'est retenue, le
+    rejet est journalisé et enregistré (pas de source, source non-MP4) et
+    la liste est vide.
+    """
+    tags_found = page_data.tags[:5]
+
+    # Repérer la source MP4
+    if not page_data.media_srcs:
+        log_event(f"Pas de source MP4 trouvée sur {page_url}")
+        console(f"Pas de source MP4 trouvée sur {page_url}")
+        STATS.incr("rejections", "no_source")
+        index.record(page_url, "rejected", tags=tags_found)
+        return []
+
+    sources = []
+    keys = set()
+    for video_src in page_data.media_srcs:
+        if not video_src.startswith("http"):
+            video_src = "https:" + video_src
+
+        if not is_mp4_link(video_src):
+            log_event(f"Source non-MP4 sur {page_url} -> {video_src}")
+            console(f"Source non-MP4 sur {page_url} -> {video_src}")
+            STATS.incr("rejections", "non_mp4")
+            continue
+
+        key = media_key(video_src)
+        if key not in keys:
+            keys.add(key)
+            sources.append(video_src)
+
+    if not sources:
+        index.record(page_url, "rejected", video_src=video_src, tags=tags_found)
+    return sources
+
+def expand_album(page_url: str, sources: list, tags_found: list, index: "DownloadIndex") -> list:
+    """
+    Enregistre l'album `page_url` et ses vidéos dans l'index, puis retourne
+    les MediaTask des vidéos à (re)tenter (vide : album complet, ou vidéos
+    restantes en attente de leur prochain essai).
+    """
+    tasks = [MediaTask(album_item_url(page_url, video_src), page_url, video_src, tags_found)
+             for video_src in sources]
+    index.add_album(page_url, [(task.item_url, task.video_src) for task in tasks], tags_found)
+    STATS.incr("album_media", value=len(tasks))
+    tasks = [task for task in tasks if index.is_due(task.item_url)]
+    if not tasks:
+        index.complete_album(page_url)
+    else:
+        console(f"Album : {len(tasks)}/{len(sources)} vidéo(s) à télécharger sur {page_url}")
+    return tasks
+
+def media_save_path(save_folder: str, video_src: str, tags_found: list) -> tuple:
+    """Retourne (nom final, chemin) : tags en préfixe du nom d'origine."""
+    tags_string = "_".join(tags_found)
+    original_name = video_src.split('/')[-1]
+    final_name = f"{tags_string}_{original_name}" if tags_string else original_name
+    return final_name, os.path.join(save_folder, final_name)
+
+def resume_headers(offset: int, part_meta: dict) -> dict:
+    """En-têtes Range/If-Range pour reprendre un .part à `offset`."""
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if part_meta.get("etag"):
+            headers["If-Range"] = part_meta["etag"]
+    return headers
+
+def resume_rejected(resp, offset: int, part_meta: dict) -> bool:
+    """
+    True si une reprise a été refusée (416) ou si la plage renvoyée ne
+    correspond pas au .part (autre début, autre taille totale).
+    """
+    status_code = resp.status_code if hasattr(resp, "status_code") else resp.status
+    if not offset or status_code not in (206, 416):
+        return False
+    return not (status_code == 206
+                and resp.headers.get('Content-Range', '').startswith(f"bytes {offset}-")
+                and get_content_total(resp) == part_meta["expected_size"])
+
+def record_if_duplicate(page_url: str, video_src: str, tags_found: list,
+                        index: "DownloadIndex", match: str, **criteria) -> bool:
+    """
+    Cherche dans l'index une vidéo déjà téléchargée depuis une autre page
+    (critères de DownloadIndex.find_duplicate). Si elle existe, `page_url`
+    est enregistrée en "duplicate" (avec le chemin du fichier existant) et
+    la fonction retourne True. `match` nomme le critère (statistiques, log).
+    """
+    original = index.find_duplicate(page_url, **criteria)
+    if original is None:
+        return False
+    original_page, original_path = original
+    log_event(f"Doublon ({match}) : {page_url} -> {original_page}")
+    console(f"Doublon ignoré ({match}) : {page_url} (déjà téléchargé via {original_page})")
+    STATS.incr("duplicates", match)
+    index.record(page_url, "duplicate", video_src=video_src, size=criteria.get("size"),
+                 etag=criteria.get("etag"), tags=tags_found, path=original_path,
+                 content_hash=criteria.get("content_hash"), duplicate_of=original_page)
+    return True
+
+_active_media = set()
+_active_media_lock = Lock()
+
+@contextmanager
+def media_claim(video_src: str):
+    """
+    Réserve la source vidéo (media_key) le temps de son téléchargement :
+    deux pages pointant vers le même fichier ne le téléchargent pas (ni
+    n'écrivent le même .part) en parallèle. Donne False si la source est
+    déjà en cours (RESULT_BUSY) ; la page sera reprise (et dédoublonnée)
+    plus tard.
+    """
+    key = media_key(video_src)
+    with _active_media_lock:
+        claimed = key not in _active_media
+        if claimed:
+            _active_media.add(key)
+    try:
+        yield claimed
+    finally:
+        if claimed:
+            with _active_media_lock:
+                _active_media.discard(key)
+
+def new_content_hasher(part_path: str, offset: int):
+    """
+    Empreinte CONTENT_HASH (None si désactivée), initialisée avec les
+    `offset` octets déjà présents dans le .part en cas de reprise.
+    """
+    if not CONTENT_HASH:
+        return None
+    hasher = hashlib.new(CONTENT_HASH)
+    if offset:
+        remaining = offset
+        with open(part_path, "rb") as f:
+            while remaining > 0:
+                block = f.read(min(CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+def check_media_response(page_url: str, video_src: str, tags_found: list,
+                         resp, index: "DownloadIndex") -> str:
+    """
+    Valide la réponse du GET vidéo avant de lire le corps : statut, taille
+    annoncée, type et bornes MIN/MAX_SIZE_BYTES, puis cherche un doublon :
+    même source (media_key) confirmée par la taille et l'ETag, ou même
+    taille et même ETag.
+    Retourne None si le téléchargement peut continuer, sinon le RESULT_*
+    (l'appelant ferme alors la réponse sans lire le corps).
+    """
+    status_code = resp.status_code if hasattr(resp, "status_code") else resp.status
+    if status_code not in (200, 206):
+        msg_block = f"Erreur téléchargement (code={status_code}) sur {video_src}"
+        if status_code == 403:
+            msg_block = f"[BLOCK] Téléchargement interdit (403) sur {video_src}"
+        elif status_code == 429:
+            msg_block = f"[BLOCK] Trop de requêtes (429) en téléchargement sur {video_src}"
+
+        log_event(msg_block)
+        console(msg_block)
+        return RESULT_THROTTLED if is_throttle_status(status_code) else RESULT_FAILED
+
+    total_size = get_content_total(resp)
+    if total_size == 0:
+        log_event(f"Pas de content-length ou 0 lors du téléchargement sur {video_src}")
+        console(f"content-length=0 pour {video_src}")
+        return RESULT_FAILED
+
+    reason = check_media_headers(resp.headers.get('Content-Type', ''), total_size)
+    if reason:
+        log_event(f"GET indique {reason} sur {video_src}")
+        console(f"Rejet ({reason}) pour {video_src}")
+        index.record(page_url, "rejected", video_src=video_src, size=total_size, tags=tags_found)
+        return RESULT_REJECTED
+
+    etag = resp.headers.get('ETag')
+    if record_if_duplicate(page_url, video_src, tags_found, index, "source",
+                           source=video_src, size=total_size, etag=etag):
+        return RESULT_DUPLICATE
+    if etag and record_if_duplicate(page_url, video_src, tags_found, index, "size_etag",
+                                    size=total_size, etag=etag):
+        return RESULT_DUPLICATE
+    return None
+
+def finish_media_download(page_url: str, video_src: str, tags_found: list,
+                          save_path: str, etag: str, total_size: int,
+                          downloaded_size: int, error: Exception,
+                          index: "DownloadIndex", content_hash: str = None,
+                          verifier: "StreamVerifier" = None) -> str:
+    """
+    Conclut un transfert : conserve le .part (reprise) s'il est interrompu
+    ou incomplet, le met en quarantaine s'il est invalide (plus d'octets
+    qu'annoncé, contrôles de `verifier`), le supprime si son empreinte est
+    déjà connue, sinon le renomme et enregistre la vidéo dans l'index.
+    Un transfert suspendu par l'échéance du cycle retourne RESULT_DEFERRED.
+    """
+    final_name = os.path.basename(save_path)
+    part_path = save_path + PART_SUFFIX
+    if isinstance(error, DeadlineExceeded):
+        log_event(f"Échéance du cycle : transfert suspendu à {downloaded_size}/{total_size} octets sur {video_src}")
+        console(f"Échéance du cycle, transfert suspendu ({downloaded_size}/{total_size}) : {final_name}", newline=True)
+        index.record(page_url, "partial", video_src=video_src, size=total_size,
+                     etag=etag, tags=tags_found, path=part_path)
+        return RESULT_DEFERRED
+    if error is not None:
+        # Le .part et son sidecar sont conservés pour la prochaine tentative
+        log_event(f"Téléchargement interrompu à {downloaded_size}/{total_size} octets sur {video_src} : {error}")
+        console(f"Téléchargement interrompu ({downloaded_size}/{total_size}) : {final_name}", newline=True)
+        index.record(page_url, "partial", video_src=video_src, size=total_size,
+                     etag=etag, tags=tags_found, path=part_path)
+        return RESULT_PARTIAL
+
+    if downloaded_size < total_size:
+        log_event(f"Téléchargement incomplet ({downloaded_size}/{total_size} octets) sur {video_src}")
+        console(f"Téléchargement incomplet, reprise au prochain passage : {final_name}", newline=True)
+        index.record(page_url, "partial", video_src=video_src, size=total_size,
+                     etag=etag, tags=tags_found, path=part_path)
+        return RESULT_PARTIAL
+
+    if downloaded_size > total_size:
+        reason = f"plus d'octets qu'annoncé ({downloaded_size}/{total_size})"
+    else:
+        reason = verifier.check() if verifier is not None else None
+    if reason:
+        target = quarantine_part(save_path)
+        log_event(f"Fichier invalide ({reason}) sur {video_src}, mis en quarantaine : {target}")
+        console(f"Fichier invalide ({reason}), mis en quarantaine : {final_name}", newline=True)
+        STATS.incr("quarantined")
+        index.record(page_url, "quarantined", video_src=video_src, size=total_size,
+                     etag=etag, tags=tags_found, path=target)
+        return RESULT_QUARANTINED
+    checksum = verifier.checksum if verifier is not None else None
+
+    # Vérification finale
+    final_size = os.path.getsize(part_path)
+    if final_size < 2000:
+        # Fichier trop petit, on le supprime
+        clear_part_state(save_path)
+        STATS.incr("rejections", "too_small")
+        log_event(f"Fichier trop petit après téléchargement (corrompu ?) : {final_name}")
+        console(f"Fichier {final_name} trop petit (probablement corrompu). Supprimé.")
+        return RESULT_FAILED
+
+    if content_hash and record_if_duplicate(page_url, video_src, tags_found, index, "content",
+                                            size=final_size, etag=etag, content_hash=content_hash):
+        clear_part_state(save_path)
+        return RESULT_DUPLICATE
+
+    finalize_part(save_path)
+    console(f"Fichier enregistré : {final_name} ({final_size} octets)", newline=True)
+    index.record(page_url, "done", video_src=video_src, size=final_size,
+                 etag=etag, tags=tags_found, path=save_path, content_hash=content_hash,
+                 checksum=checksum)
+    return RESULT_DONE
+
+def count_failure(index: "DownloadIndex", key: str, result: str) -> None:
+    """
+    RESULT_FAILED (403, 404, erreur réseau...) : compté dans l'index, qui
+    espace puis abandonne les nouveaux essais (DownloadIndex.record_failure).
+    """
+    if result != RESULT_FAILED:
+        return
+    failures = index.record_failure(key)
+    if failures >= PAGE_MAX_FAILURES:
+        log_event(f"Abandon de {key} après {failures} échecs consécutifs.")
+
+def download_video(page_url: str,
+                   save_folder: str,
+                   in_progress: set,
+                   index: "DownloadIndex",
+                   lock: Lock,
+                   proxies: dict,
+                   on_media=None,
+                   deadline: Deadline = None) -> str:
+    """
+    Télécharge la vidéo Erome pour une page (URL /a/ ou /v/),
+    après vérification de la taille et du type sur les en-têtes du GET
+    (ou d'un HEAD préalable si STRICT_HEAD_CHECK).
+    Renomme selon les 5 premiers tags trouvés.
+    Le contenu est écrit dans un fichier .part (repris via Range en cas
+    d'interruption) puis renommé une fois complet.
+    Inclut des logs pour détecter si un blocage a pu se produire
+    (ex: statut 403, 429, etc.).
+    Le résultat (terminé, rejeté, partiel) est enregistré dans `index`.
+    `lock` protège uniquement `in_progress`.
+    Retourne un RESULT_* ; RESULT_THROTTLED (429/503) signale un élément
+    à remettre en file plus tard.
+    Album (plusieurs vidéos) : chaque vidéo à (re)tenter est confiée à
+    `on_media(MediaTask)` (qui retourne False s'il ne peut pas la prendre)
+    ou, à défaut, téléchargée ici ; la page retourne RESULT_DONE si
+    l'album est complet, sinon RESULT_ALBUM (le résultat de chaque vidéo
+    est compté sur sa propre entrée).
+    Passé `deadline`, la page n'est pas commencée (RESULT_DEFERRED) et un
+    transfert en cours est suspendu au bloc suivant.
+    """
+    if index.is_downloaded(page_url):
+        return RESULT_SKIPPED
+    if deadline is not None and deadline.expired():
+        return RESULT_DEFERRED
+    with lock:
+        if page_url in in_progress:
+            return RESULT_SKIPPED
+        in_progress.add(page_url)
+
+    try:
+        # Nouvelle vérification une fois l'élément réservé : un autre worker a pu
+        # le terminer entre le premier contrôle et la prise du verrou
+        if index.is_downloaded(page_url):
+            return RESULT_SKIPPED
+        result = _download_page(page_url, save_folder, index, get_session(proxies),
+                                on_media, deadline)
+        count_failure(index, page_url, result)
+        STATS.incr("downloads", result)
+        return result
+    finally:
+        with lock:
+            in_progress.discard(page_url)
+
+def download_album_item(task: MediaTask,
+                        save_folder: str,
+                        in_progress: set,
+                        index: "DownloadIndex",
+                        lock: Lock,
+                        proxies: dict,
+                        deadline: Deadline = None) -> str:
+    """Télécharge une vidéo d'album (tâche créée par download_video)."""
+    if index.is_downloaded(task.item_url):
+        return RESULT_SKIPPED
+    if deadline is not None and deadline.expired():
+        return RESULT_DEFERRED
+    with lock:
+        if task.item_url in in_progress:
+            return RESULT_SKIPPED
+        in_progress.add(task.item_url)
+
+    try:
+        # Nouvelle vérification une fois l'élément réservé : un autre worker a pu
+        # le terminer entre le premier contrôle et la prise du verrou
+        if index.is_downloaded(task.item_url):
+            return RESULT_SKIPPED
+        return _download_item(task, save_folder, index, get_session(proxies), deadline)
+    finally:
+        with lock:
+            in_progress.discard(task.item_url)
+
+def run_task(task,
+             save_folder: str,
+             in_progress: set,
+             index: "DownloadIndex",
+             lock: Lock,
+             proxies: dict,
+             on_media=None,
+             deadline: Deadline = None) -> str:
+    """Exécute une tâche du pool : lien de page (download_video) ou MediaTask."""
+    if isinstance(task, MediaTask):
+        return download_album_item(task, save_folder, in_progress, index, lock, proxies, deadline)
+    return download_video(task, save_folder, in_progress, index, lock, proxies, on_media, deadline)
+
+def _download_page(page_url: str,
+                   save_folder: str,
+                   index: "DownloadIndex",
+                   session: requests.Session,
+                   on_media=None,
+                   deadline: Deadline = None) -> str:
+    """
+    Récupère et analyse la page (via le cache), puis télécharge sa ou ses
+    vidéo(s). Après un transfert interrompu, la source et les tags déjà
+    connus sont repris sans GET de la page.
+    """
+    entry = index.get_entry(page_url)
+    if entry is not None and entry[0] == RESULT_PARTIAL and entry[1]:
+        STATS.incr("page_cache", "resumed")
+        result = _download_source(page_url, entry[1], entry[2], save_folder, index,
+                                  session, deadline)
+        if result != RESULT_FAILED:
+            return result
+        forget_page(page_url)  # Source refusée (jeton expiré ?) : page relue
+    max_age = page_max_age(entry)
+
+    # Récupération de la page
+    try:
+        page_data, status_code, cached = fetch_page(session, page_url, max_age,
+                                                    "page_get", "parse_page", deadline)
+    except DeadlineExceeded:
+        return RESULT_DEFERRED
+    except requests.exceptions.RequestException as e:
+        log_event(f"Erreur GET sur {page_url} : {e}")
+        console(f"Erreur GET sur {page_url} : {e}")
+        return RESULT_FAILED
+
+    if status_code != 200:
+        # Exemple de blocage possible : 403, 429, etc.
+        msg_block = f"Erreur GET (code={status_code}) sur {page_url}"
+        if status_code == 403:
+            msg_block = f"[BLOCK] Accès interdit (403) sur {page_url}"
+        elif status_code == 429:
+            msg_block = f"[BLOCK] Trop de requêtes (429) sur {page_url}"
+
+        log_event(msg_block)
+        console(msg_block)
+        # On arrête ce téléchargement, mais pas le script complet
+        return RESULT_THROTTLED if is_throttle_status(status_code) else RESULT_FAILED
+
+    # Une seule analyse de la page : tags (max 5) et source(s) vidéo
+    tags_found = page_data.tags[:5]
+    sources = pick_video_sources(page_url, page_data, index)
+    if not sources:
+        return RESULT_REJECTED
+    if len(sources) == 1:
+        result = _download_source(page_url, sources[0], tags_found, save_folder, index,
+                                  session, deadline)
+        if cached and result == RESULT_FAILED:
+            forget_page(page_url)
+        return result
+
+    # Album : une tâche par vidéo, confiées au pool (à défaut, téléchargées ici)
+    tasks = expand_album(page_url, sources, tags_found, index)
+    inline = [task for task in tasks if on_media is None or not on_media(task)]
+    for task in inline:
+        _download_item(task, save_folder, index, session, deadline)
+    return album_result(page_url, index)
+
+def album_result(page_url: str, index: "DownloadIndex") -> str:
+    """
+    Résultat de la page d'un album : RESULT_DONE s'il est complet, sinon
+    RESULT_ALBUM. Celui de chaque vidéo est compté sur sa propre entrée
+    (_download_item) : un échec ne compte pas contre la page, et l'album
+    reste dans pending_links tant qu'une vidéo est à retenter.
+    """
+    return RESULT_DONE if index.is_downloaded(page_url) else RESULT_ALBUM
+
+def _download_item(task: MediaTask,
+                   save_folder: str,
+                   index: "DownloadIndex",
+                   session: requests.Session,
+                   deadline: Deadline = None) -> str:
+    """
+    Télécharge une vidéo d'album et compte son résultat sur sa propre
+    entrée, puis clôt l'album si c'était la dernière.
+    """
+    result = _download_source(task.item_url, task.video_src, task.tags, save_folder, index,
+                              session, deadline)
+    count_failure(index, task.item_url, result)
+    STATS.incr("downloads", result)
+    index.complete_album(task.page_url)
+    return result
+
+def _download_source(item_url: str,
+                     video_src: str,
+                     tags_found: list,
+                     save_folder: str,
+                     index: "DownloadIndex",
+                     session: requests.Session,
+                     deadline: Deadline = None) -> str:
+    """
+    Télécharge `video_src` (enregistrée sous `item_url` : la page, ou
+    <page>#<fichier> pour un album), sauf doublon (reconnu aux en-têtes du
+    GET) ou source déjà en cours. Rien n'est commencé une fois `deadline`
+    atteinte (RESULT_DEFERRED).
+    """
+    if deadline is not None and deadline.expired():
+        return RESULT_DEFERRED
+
+    with media_claim(video_src) as claimed:
+        if not claimed:
+            return RESULT_BUSY
+        try:
+            with HOST_LIMITER.slot(video_src, deadline) as slot:
+                return download_media(item_url, video_src, tags_found, save_folder, index,
+                                      session, slot, deadline)
+        except DeadlineExceeded:
+            return RESULT_DEFERRED
+
+def download_media(page_url: str,
+                   video_src: str,
+                   tags_found: list,
+                   save_folder: str,
+                   index: "DownloadIndex",
+                   session: requests.Session,
+                   slot: "HostSlot",
+                   deadline: Deadline = None) -> str:
+    """
+    Télécharge la vidéo `video_src` trouvée sur `page_url` vers un .part,
+    puis le renomme une fois complet. Les réponses HTTP sont signalées à
+    `slot` (créneau du limiteur pour l'hôte média), tenu pendant les
+    requêtes et le transfert, suspendu à l'échéance `deadline`. Une fois la
+    taille connue, la lecture du corps attend son tour dans TRANSFER_GATE,
+    sans occuper le créneau de l'hôte (repris à l'admission).
+    """
+    # HEAD (mode strict uniquement) : vérifier taille, type avant le GET
+    etag = None
+    expected_size = None
+    if STRICT_HEAD_CHECK:
+        try:
+            with STATS.timed("head"):
+                head_resp = slot.observe(session.head(video_src))
+        except requests.exceptions.RequestException as e:
+            log_event(f"Erreur HEAD sur {video_src} : {e}")
+            console(f"Erreur HEAD sur {video_src} : {e}")
+            return RESULT_FAILED
+
+        if head_resp.status_code != 200:
+            msg_block = f"HEAD status {head_resp.status_code} sur {video_src}"
+            if head_resp.status_code == 403:
+                msg_block = f"[BLOCK] HEAD interdit (403) sur {video_src}"
+            elif head_resp.status_code == 429:
+                msg_block = f"[BLOCK] Trop de requêtes (429) sur {video_src}"
+
+            log_event(msg_block)
+            console(msg_block)
+            # On arrête juste ce téléchargement
+            return RESULT_THROTTLED if is_throttle_status(head_resp.status_code) else RESULT_FAILED
+
+        expected_size = get_content_total(head_resp)
+        reason = check_media_headers(head_resp.headers.get('Content-Type', ''), expected_size)
+        if reason:
+            log_event(f"HEAD indique {reason} sur {video_src}")
+            console(f"Rejet ({reason}) pour {video_src}")
+            index.record(page_url, "rejected", video_src=video_src, size=expected_size, tags=tags_found)
+            return RESULT_REJECTED
+
+        etag = head_resp.headers.get('ETag')
+
+    # Construire le nom de fichier
+    final_name, save_path = media_save_path(save_folder, video_src, tags_found)
+    part_path = save_path + PART_SUFFIX
+
+    # Reprise éventuelle d'un .part laissé par une tentative précédente
+    offset, part_meta = get_resume_offset(save_path, video_src, etag, expected_size)
+    if offset and offset >= part_meta["expected_size"]:
+        # Le .part est déjà complet (interruption juste avant le renommage)
+        return finish_media_download(page_url, video_src, tags_found, save_path,
+                                     part_meta.get("etag"), part_meta["expected_size"], offset,
+                                     None, index, verifier=new_stream_verifier(part_path, offset, part_meta))
+
+    # Téléchargement : la validation (type, taille) se fait sur les en-têtes
+    # du GET en streaming ; la connexion est fermée avant le corps si rejet.
+    # Deux essais au plus : si la reprise est refusée, on repart de zéro.
+    video_resp = None
+    for _ in range(2):
+        try:
+            with STATS.timed("media_get"):
+                video_resp = slot.observe(session.get(video_src, stream=True,
+                                                      headers=resume_headers(offset, part_meta)))
+        except requests.exceptions.RequestException as e:
+            log_event(f"Erreur GET (téléchargement) sur {video_src} : {e}")
+            console(f"Erreur GET (téléchargement) sur {video_src} : {e}")
+            return RESULT_FAILED
+
+        if not resume_rejected(video_resp, offset, part_meta):
+            break
+
+        # Plage refusée ou fichier distant différent : on repart de zéro
+        log_event(f"Reprise refusée (code={video_resp.status_code}) sur {video_src}, on repart de zéro.")
+        video_resp.close()
+        clear_part_state(save_path)
+        offset = 0
+
+    result = check_media_response(page_url, video_src, tags_found, video_resp, index)
+    if result is not None:
+        # Fermeture immédiate : aucun octet du corps n'est transféré
+        video_resp.close()
+        return result
+
+    if video_resp.status_code == 200:
+        # Le serveur a ignoré le Range (ou l'ETag a changé) : on repart de zéro
+        offset = 0
+
+    total_size = get_content_total(video_resp)
+    etag = video_resp.headers.get('ETag', etag)
+
+    # Ordonnancement par taille : le corps n'est lu qu'une fois le transfert
+    # admis ; le créneau de l'hôte est rendu pendant l'attente
+    slot.pause()
+    with TRANSFER_GATE.admit(max((total_size or 0) - offset, 0), deadline) as admitted:
+        slot.resume()
+        if not admitted:
+            # Échéance, ou attente trop longue : réponse fermée, tâche reportée
+            video_resp.close()
+            return RESULT_DEFERRED
+        verifier = new_stream_verifier(part_path, offset, part_meta)
+
+        def checkpoint(written: int) -> None:
+            save_part_state(save_path, video_src, etag, total_size, written,
+                            verifier.state() if verifier is not None else None)
+
+        checkpoint(offset)
+        if offset:
+            console(f"Reprise à {offset} octets : {final_name}")
+        else:
+            console(f"Téléchargement : {final_name}")
+
+        hasher = new_content_hasher(part_path, offset)
+        with STATS.timed("transfer"):
+            downloaded_size, error = stream_to_file(
+                video_resp.iter_content(chunk_size=CHUNK_SIZE),
+                part_path, offset, total_size, desc=final_name, checkpoint=checkpoint,
+                hasher=hasher, verifier=verifier, deadline=deadline
+            )
+        video_resp.close()  # Corps non lu si le transfert a été suspendu
+        content_hash = hasher.hexdigest() if hasher is not None else None
+        return finish_media_download(page_url, video_src, tags_found, save_path, etag,
+                                     total_size, downloaded_size, error, index, content_hash,
+                                     verifier)
+
+# -------------------------------------------------------------------------
+# MOTEUR ASYNCIO (ALTERNATIVE AU POOL DE THREADS)
+# -------------------------------------------------------------------------
+def async_engine_error(proxies: dict) -> str:
+    """Retourne None si le moteur asyncio est utilisable, sinon la raison."""
+    if aiohttp is None:
+        return "aiohttp n'est pas installé"
+    proxy_url = (proxies or {}).get("https", "")
+    if proxy_url.startswith("socks") and aiohttp_socks is None:
+        return "proxy SOCKS5 : aiohttp_socks n'est pas installé"
+    return None
+
+def create_async_session(proxies: dict = None) -> "aiohttp.ClientSession":
+    """
+    Construit une ClientSession aiohttp (à appeler dans la boucle) : pool
+    de ASYNC_CONCURRENCY connexions keep-alive, en-têtes et timeouts par
+    défaut, proxy HTTP(S) ou SOCKS5 (via aiohttp_socks).
+    """
+    proxy_url = (proxies or {}).get("https")
+    timeout = aiohttp.ClientTimeout(sock_connect=TIMEOUT, sock_read=TIMEOUT)
+    if proxy_url and proxy_url.startswith("socks"):
+        connector = aiohttp_socks.ProxyConnector.from_url(proxy_url, limit=ASYNC_CONCURRENCY)
+        proxy_url = None
+    else:
+        connector = aiohttp.TCPConnector(limit=ASYNC_CONCURRENCY)
+    return aiohttp.ClientSession(connector=connector, headers=HEADERS,
+                                 timeout=timeout, proxy=proxy_url)
+
+async def async_download_video(page_url: str,
+                               save_folder: str,
+                               in_progress: set,
+                               index: "DownloadIndex",
+                               http: "aiohttp.ClientSession",
+                               file_executor: ThreadPoolExecutor,
+                               on_media=None,
+                               deadline: Deadline = None) -> str:
+    """
+    Équivalent asyncio de download_video : mêmes vérifications, même .part
+    repris via Range, même index, même découpage des albums (`on_media`),
+    même échéance (`deadline`).
+    Les écritures disque passent par `file_executor`, les accès à l'index
+    par asyncio.to_thread. `in_progress` n'est manipulé que depuis la
+    boucle (pas de verrou) ; la page est réservée avant de consulter
+    l'index, qui rend la main à la boucle.
+    """
+    if page_url in in_progress:
+        return RESULT_SKIPPED
+    if deadline is not None and deadline.expired():
+        return RESULT_DEFERRED
+    in_progress.add(page_url)
+    try:
+        if await asyncio.to_thread(index.is_downloaded, page_url):
+            return RESULT_SKIPPED
+        result = await _async_download_page(page_url, save_folder, index, http,
+                                            file_executor, on_media, deadline)
+        await asyncio.to_thread(count_failure, index, page_url, result)
+        STATS.incr("downloads", result)
+        return result
+    finally:
+        in_progress.discard(page_url)
+
+async def async_download_album_item(task: MediaTask,
+                                    save_folder: str,
+                                    in_progress: set,
+                                    index: "DownloadIndex",
+                                    http: "aiohttp.ClientSession",
+                                    file_executor: ThreadPoolExecutor,
+                                    deadline: Deadline = None) -> str:
+    """Équivalent asyncio de download_album_item."""
+    if task.item_url in in_progress:
+        return RESULT_SKIPPED
+    if deadline is not None and deadline.expired():
+        return RESULT_DEFERRED
+    in_progress.add(task.item_url)
+    try:
+        if await asyncio.to_thread(index.is_downloaded, task.item_url):
+            return RESULT_SKIPPED
+        return await _async_download_item(task, save_folder, index, http, file_executor,
+                                          deadline)
+    finally:
+        in_progress.discard(task.item_url)
+
+async def async_run_task(task,
+                         save_folder: str,
+                         in_progress: set,
+                         index: "DownloadIndex",
+                         http: "aiohttp.ClientSession",
+                         file_executor: ThreadPoolExecutor,
+                         on_media=None,
+                         deadline: Deadline = None) -> str:
+    """Équivalent asyncio de run_task (lien de page ou MediaTask)."""
+    if isinstance(task, MediaTask):
+        return await async_download_album_item(task, save_folder, in_progress, index,
+                                               http, file_executor, deadline)
+    return await async_download_video(task, save_folder, in_progress, index,
+                                      http, file_executor, on_media, deadline)
+
+async def _async_download_page(page_url: str,
+                               save_folder: str,
+                               index: "DownloadIndex",
+                               http: "aiohttp.ClientSession",
+                               file_executor: ThreadPoolExecutor,
+                               on_media=None,
+                               deadline: Deadline = None) -> str:
+    """Équivalent asyncio de _download_page."""
+    entry = await asyncio.to_thread(index.get_entry, page_url)
+    if entry is not None and entry[0] == RESULT_PARTIAL and entry[1]:
+        STATS.incr("page_cache", "resumed")
+        result = await _async_download_source(page_url, entry[1], entry[2], save_folder,
+                                              index, http, file_executor, deadline)
+        if result != RESULT_FAILED:
+            return result
+        await asyncio.to_thread(forget_page, page_url)
+    max_age = page_max_age(entry)
+
+    try:
+        page_data, status_code, cached = await async_fetch_page(http, page_url, max_age,
+                                                                "page_get", "parse_page", deadline)
+    except DeadlineExceeded:
+        return RESULT_DEFERRED
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        log_event(f"Erreur GET sur {page_url} : {e!r}")
+        console(f"Erreur GET sur {page_url} : {e!r}")
+        return RESULT_FAILED
+
+    if status_code != 200:
+        msg_block = f"Erreur GET (code={status_code}) sur {page_url}"
+        if status_code == 403:
+            msg_block = f"[BLOCK] Accès interdit (403) sur {page_url}"
+        elif status_code == 429:
+            msg_block = f"[BLOCK] Trop de requêtes (429) sur {page_url}"
+
+        log_event(msg_block)
+        console(msg_block)
+        return RESULT_THROTTLED if is_throttle_status(status_code) else RESULT_FAILED
+
+    tags_found = page_data.tags[:5]
+    sources = await asyncio.to_thread(pick_video_sources, page_url, page_data, index)
+    if not sources:
+        return RESULT_REJECTED
+    if len(sources) == 1:
+        result = await _async_download_source(page_url, sources[0], tags_found, save_folder,
+                                              index, http, file_executor, deadline)
+        if cached and result == RESULT_FAILED:
+            await asyncio.to_thread(forget_page, page_url)
+        return result
+
+    # Album : une tâche par vidéo, confiées à la file (à défaut, téléchargées ici)
+    tasks = await asyncio.to_thread(expand_album, page_url, sources, tags_found, index)
+    inline = [task for task in tasks if on_media is None or not on_media(task)]
+    for task in inline:
+        await _async_download_item(task, save_folder, index, http, file_executor, deadline)
+    return await asyncio.to_thread(album_result, page_url, index)
+
+async def _async_download_item(task: MediaTask,
+                               save_folder: str,
+                               index: "DownloadIndex",
+                               http: "aiohttp.ClientSession",
+                               file_executor: ThreadPoolExecutor,
+                               deadline: Deadline = None) -> str:
+    """Équivalent asyncio de _download_item."""
+    result = await _async_download_source(task.item_url, task.video_src, task.tags,
+                                          save_folder, index, http, file_executor, deadline)
+    await asyncio.to_thread(count_failure, index, task.item_url, result)
+    STATS.incr("downloads", result)
+    await asyncio.to_thread(index.complete_album, task.page_url)
+    return result
+
+async def _async_download_source(item_url: str,
+                                 video_src: str,
+                                 tags_found: list,
+                                 save_folder: str,
+                                 index: "DownloadIndex",
+                                 http: "aiohttp.ClientSession",
+                                 file_executor: ThreadPoolExecutor,
+                                 deadline: Deadline = None) -> str:
+    """Équivalent asyncio de _download_source."""
+    if deadline is not None and deadline.expired():
+        return RESULT_DEFERRED
+
+    with media_claim(video_src) as claimed:
+        if not claimed:
+            return RESULT_BUSY
+        try:
+            async with HOST_LIMITER.async_slot(video_src, deadline) as slot:
+                return await async_download_media(item_url, video_src, tags_found, save_folder,
+                                                  index, http, slot, file_executor, deadline)
+        except DeadlineExceeded:
+            return RESULT_DEFERRED
+
+async def async_download_media(page_url: str,
+                               video_src: str,
+                               tags_found: list,
+                               save_folder: str,
+                               index: "DownloadIndex",
+                               http: "aiohttp.ClientSession",
+                               slot: "HostSlot",
+                               file_executor: ThreadPoolExecutor,
+                               deadline: Deadline = None) -> str:
+    """
+    Équivalent asyncio de download_media (sans HEAD strict : la validation
+    se fait sur les en-têtes du GET). Les accès disque et index passent
+    par `file_executor` (ou asyncio.to_thread pour les vérifications).
+    """
+    final_name, save_path = media_save_path(save_folder, video_src, tags_found)
+
+    loop = asyncio.get_running_loop()
+    part_path = save_path + PART_SUFFIX
+    offset, part_meta = await loop.run_in_executor(file_executor, get_resume_offset,
+                                                   save_path, video_src)
+    if offset and offset >= part_meta["expected_size"]:
+        verifier = await loop.run_in_executor(file_executor, new_stream_verifier,
+                                              part_path, offset, part_meta)
+        return await loop.run_in_executor(
+            file_executor, finish_media_download, page_url, video_src, tags_found, save_path,
+            part_meta.get("etag"), part_meta["expected_size"], offset, None, index, None, verifier
+        )
+
+    try:
+        for _ in range(2):
+            start = time.perf_counter()
+            async with http.get(video_src, headers=resume_headers(offset, part_meta)) as video_resp:
+                STATS.observe("media_get", time.perf_counter() - start)
+                slot.observe(video_resp)
+                if resume_rejected(video_resp, offset, part_meta):
+                    log_event(f"Reprise refusée (code={video_resp.status}) sur {video_src}, on repart de zéro.")
+                    await loop.run_in_executor(file_executor, clear_part_state, save_path)
+                    offset = 0
+                    continue
+
+                # Sortie du bloc sans lire le corps : la connexion est fermée
+                result = await asyncio.to_thread(check_media_response, page_url, video_src,
+                                                 tags_found, video_resp, index)
+                if result is not None:
+                    return result
+
+                if video_resp.status == 200:
+                    offset = 0
+                total_size = get_content_total(video_resp)
+                etag = video_resp.headers.get('ETag')
+                # Ordonnancement par taille : le corps n'est lu qu'une fois le transfert
+                # admis ; le créneau de l'hôte est rendu pendant l'attente
+                slot.pause()
+                async with TRANSFER_GATE.async_admit(max((total_size or 0) - offset, 0),
+                                                     deadline) as admitted:
+                    slot.resume()
+                    if not admitted:
+                        # Échéance, ou attente trop longue : réponse fermée, tâche reportée
+                        return RESULT_DEFERRED
+                    verifier = await loop.run_in_executor(
+                        file_executor, new_stream_verifier, part_path, offset, part_meta
+                    )
+                    await loop.run_in_executor(file_executor, save_part_state,
+                                               save_path, video_src, etag, total_size, offset,
+                                               verifier.state() if verifier is not None else None)
+
+                    if offset:
+                        console(f"Reprise à {offset} octets : {final_name}")
+                    else:
+                        console(f"Téléchargement : {final_name}")
+
+                    hasher = await loop.run_in_executor(
+                        file_executor, new_content_hasher, part_path, offset
+                    )
+                    with STATS.timed("transfer"):
+                        downloaded_size, error = await async_stream_to_file(
+                            video_resp, save_path, video_src, etag, offset, total_size,
+                            file_executor, hasher, verifier, deadline
+                        )
+                    content_hash = hasher.hexdigest() if hasher is not None else None
+                    return await loop.run_in_executor(
+                        file_executor, finish_media_download, page_url, video_src, tags_found,
+                        save_path, etag, total_size, downloaded_size, error, index, content_hash,
+                        verifier
+                    )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        log_event(f"Erreur GET (téléchargement) sur {video_src} : {e!r}")
+        console(f"Erreur GET (téléchargement) sur {video_src} : {e!r}")
+        return RESULT_FAILED
+    return RESULT_FAILED
+
+def write_block(f, data: bytes, hasher=None, verifier: "StreamVerifier" = None) -> None:
+    """Écrit `data` dans `f` et l'ajoute à `hasher`, `verifier` (appelé depuis file_executor)."""
+    f.write(data)
+    if hasher is not None:
+        hasher.update(data)
+    if verifier is not None:
+        verifier.update(data)
+
+async def async_stream_to_file(video_resp: "aiohttp.ClientResponse",
+                               save_path: str,
+                               video_src: str,
+                               etag: str,
+                               offset: int,
+                               total_size: int,
+                               file_executor: ThreadPoolExecutor,
+                               hasher=None,
+                               verifier: "StreamVerifier" = None,
+                               deadline: Deadline = None) -> tuple:
+    """
+    Équivalent asyncio de stream_to_file : les blocs reçus sont regroupés
+    jusqu'à CHUNK_SIZE puis écrits (et ajoutés à `hasher`, `verifier`) via
+    `file_executor`, sans bloquer la boucle. Le sidecar est mis à jour
+    une fois par PROGRESS_INTERVAL ; le transfert s'arrête à `deadline`
+    et son débit est borné par BANDWIDTH s'il est défini.
+    Retourne (octets présents, exception réseau/disque/échéance ou None).
+    """
+    loop = asyncio.get_running_loop()
+    part_path = save_path + PART_SUFFIX
+    f = await loop.run_in_executor(file_executor, open, part_path, 'r+b' if offset else 'wb')
+    written = offset
+    error = None
+    try:
+        if PREALLOCATE and total_size:
+            await loop.run_in_executor(file_executor, preallocate_file, f, total_size)
+        await loop.run_in_executor(file_executor, f.seek, offset)
+
+        buffer = bytearray()
+        last_report = time.monotonic()
+        try:
+            async for data in video_resp.content.iter_chunked(CHUNK_SIZE):
+                buffer += data
+                if len(buffer) < CHUNK_SIZE:
+                    continue
+                await loop.run_in_executor(file_executor, write_block, f, bytes(buffer),
+                                           hasher, verifier)
+                written += len(buffer)
+                if BANDWIDTH is not None:
+                    delay = BANDWIDTH.reserve(len(buffer))
+                    if delay:
+                        await asyncio.sleep(min(delay, deadline.remaining()) if deadline else delay)
+                buffer.clear()
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    await loop.run_in_executor(file_executor, f.flush)
+                    await loop.run_in_executor(file_executor, save_part_state,
+                                               save_path, video_src, etag, total_size, written,
+                                               verifier.state() if verifier is not None else None)
+                if deadline is not None and deadline.expired():
+                    error = DeadlineExceeded()
+                    break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+
+        # Données reçues avant une éventuelle coupure : conservées pour la reprise
+        if buffer:
+            await loop.run_in_executor(file_executor, write_block, f, bytes(buffer),
+                                       hasher, verifier)
+            written += len(buffer)
+    except OSError as e:
+        error = e
+    finally:
+        await loop.run_in_executor(file_executor, f.close)
+
+    STATS.incr("bytes_downloaded", value=written - offset)
+    await loop.run_in_executor(file_executor, save_part_state,
+                               save_path, video_src, etag, total_size, written,
+                               verifier.state() if verifier is not None else None)
+    return written, error
+
+async def async_download_worker(link_queue: asyncio.Queue,
+                                queued: set,
+                                save_folder: str,
+                                in_progress: set,
+                                index: "DownloadIndex",
+                                http: "aiohttp.ClientSession",
+                                file_executor: ThreadPoolExecutor,
+                                retry_later=None,
+                                on_media=None,
+                                deadline: Deadline = None) -> None:
     """
-    Analyse le HTML pour extraire les tags dans <p class="mt-10"> 
-    (ex: <a> #Tag </a>).
-    Retourne une liste de tags (sans le '#', espace -> underscore).
+    Consommateur asyncio : traite les tâches de `link_queue` (liens ou
+    MediaTask) jusqu'à recevoir None. Comme download_worker, confie à
+    `retry_later` les tâches bloquées ou reportées par l'échéance.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-    tags = []
-    p_tags = soup.find("p", class_="mt-10")
-    if p_tags:
-        a_tags = p_tags.find_all("a", href=True)
-        for a in a_tags:
-            raw_text = a.get_text(strip=True)
-            if raw_text:
-                tags.append(clean_tag(raw_text))
-    return tags
+    while True:
+        task = await link_queue.get()
+        if task is None:
+            break
+        queued.discard(task_key(task))
+        try:
+            result = await async_run_task(task, save_folder, in_progress, index,
+                                          http, file_executor, on_media, deadline)
+            if result in (RESULT_THROTTLED, RESULT_DEFERRED) and retry_later is not None:
+                retry_later(task)
+        except Exception as e:
+            log_event(f"Exception non gérée dans une tâche: {e!r}")
+            console(f"Exception non gérée: {e!r}")
 
-def get_video_src(html_content: str) -> str:
+async def async_download_links(links: list,
+                               save_folder: str,
+                               index: "DownloadIndex",
+                               proxies: dict = None,
+                               concurrency: int = ASYNC_CONCURRENCY,
+                               deadline: Deadline = None) -> dict:
     """
-    Analyse le HTML pour trouver la balise <video><source>,
-    et renvoie l'URL (src) de la vidéo si trouvée, sinon None.
+    Télécharge une liste de liens avec `concurrency` tâches asyncio (les
+    vidéos des albums sont ajoutées à la même file), jusqu'à `deadline`.
+    Retourne le nombre de résultats par RESULT_* (utilisé par bench.py).
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-    video_tag = soup.find('video')
-    if not video_tag:
-        return None
-    
-    source_tag = video_tag.find('source')
-    if not source_tag or not source_tag.get('src'):
-        return None
-    return source_tag['src']
+    results = {}
+    in_progress = set()
+    link_queue = asyncio.Queue()
+    for link in links:
+        link_queue.put_nowait(link)
 
-def download_video(page_url: str,
+    def on_media(task: MediaTask) -> bool:
+        link_queue.put_nowait(task)
+        return True
+
+    async def worker(http, file_executor):
+        while True:
+            task = await link_queue.get()
+            try:
+                result = await async_run_task(task, save_folder, in_progress, index,
+                                              http, file_executor, on_media, deadline)
+                results[result] = results.get(result, 0) + 1
+            finally:
+                link_queue.task_done()
+
+    with ThreadPoolExecutor(max_workers=ASYNC_FILE_WORKERS) as file_executor:
+        async with create_async_session(proxies) as http:
+            workers = [asyncio.create_task(worker(http, file_executor)) for _ in range(concurrency)]
+            await link_queue.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    return results
+
+# -------------------------------------------------------------------------
+# CYCLES DE RECHERCHE / TÉLÉCHARGEMENT
+# -------------------------------------------------------------------------
+def run_batch_cycle(tag: str,
+                    save_folder: str,
+                    index: "DownloadIndex",
+                    lock: Lock,
+                    proxies: dict,
+                    start_cycle: float,
+                    carry_over: list = None) -> list:
+    """
+    Mode historique : recherche complète, puis téléchargement de tous les
+    liens trouvés, puis nouvelle recherche, jusqu'à SESSION_DURATION.
+    En recherche incrémentale, seuls les nouveaux liens et ceux encore
+    en attente dans l'index (échecs précédents) sont téléchargés.
+    Les tâches reportées du cycle précédent (`carry_over`) passent en
+    premier. À l'échéance, la recherche et les transferts s'arrêtent ;
+    retourne les tâches non terminées, à reporter au cycle suivant.
+    """
+    seen_links = index.seen_links(tag) if INCREMENTAL_SEARCH else None
+    deadline = Deadline(SESSION_DURATION - (time.time() - start_cycle))
+    carried = []
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        while not deadline.expired():
+            in_progress = set()
+            video_links = search_videos(
+                tag=tag, 
+                index=index,
+                proxies=proxies,
+                num_links=MAX_LINKS, 
+                max_pages=MAX_PAGES,
+                seen_links=seen_links,
+                deadline=deadline
+            )
+            if seen_links is not None:
+                new_links = set(video_links)
+                video_links += [link for link in index.pending_links(tag) if link not in new_links]
+            if carry_over:
+                video_links = list(carry_over) + video_links
+                carry_over = None
+
+            attempt = 0
+            while video_links:
+                _, throttled, deferred = download_tasks(executor, video_links, save_folder,
+                                                        in_progress, index, lock, proxies,
+                                                        deadline)
+                carried += deferred
+
+                # Éléments bloqués (429/503) : nouvel essai après une pause croissante
+                if not throttled or attempt >= MAX_THROTTLE_RETRIES:
+                    break
+                delay = THROTTLE_BACKOFF * 2 ** attempt
+                console(f"{len(throttled)} lien(s) bloqué(s), nouvel essai dans {delay}s.")
+                if not deadline.sleep(delay):
+                    carried += throttled
+                    break
+                attempt += 1
+                video_links = throttled
+
+            if deadline.expired():
+                break
+            console(f"En pause {SLEEP_BETWEEN_SEARCH}s avant la prochaine recherche.", newline=True)
+            deadline.sleep(SLEEP_BETWEEN_SEARCH)
+
+    console(f"20 minutes écoulées pour le tag '{tag}'.")
+    return carried + list(carry_over or [])
+
+def download_tasks(executor: ThreadPoolExecutor,
+                   tasks: list,
                    save_folder: str,
                    in_progress: set,
-                   downloaded_videos: set,
+                   index: "DownloadIndex",
                    lock: Lock,
-                   proxies: dict) -> None:
+                   proxies: dict,
+                   deadline: Deadline = None) -> tuple:
     """
-    Télécharge la vidéo Erome pour une page (URL /a/ ou /v/),
-    après vérification HEAD (taille, type).
-    Renomme selon les 5 premiers tags trouvés.
-    Inclut des logs pour détecter si un blocage a pu se produire
-    (ex: statut 403, 429, etc.).
+    Exécute `tasks` (liens ou MediaTask) dans `executor` et attend la fin ;
+    les vidéos supplémentaires des albums sont soumises au même pool dès
+    leur découverte. Passé `deadline`, les tâches pas encore commencées
+    rendent la main aussitôt et les transferts en cours sont suspendus.
+    Retourne (nombre de résultats par RESULT_*, tâches bloquées par un
+    429/503, tâches reportées par l'échéance).
     """
-    with lock:
-        if page_url in downloaded_videos or page_url in in_progress:
-            return
-        in_progress.add(page_url)
+    discovered = []
 
-    # Récupération de la page
-    try:
-        resp_page = requests.get(page_url, headers=HEADERS, proxies=proxies, timeout=TIMEOUT)
-    except requests.exceptions.RequestException as e:
-        log_event(f"Erreur GET sur {page_url} : {e}")
-        print(f"[{get_current_time()}] Erreur GET sur {page_url} : {e}")
+    def on_media(task: MediaTask) -> bool:
         with lock:
-            in_progress.discard(page_url)
-        return
+            discovered.append(task)
+        return True
 
-    if resp_page.status_code != 200:
-        # Exemple de blocage possible : 403, 429, etc.
-        msg_block = f"Erreur GET (code={resp_page.status_code}) sur {page_url}"
-        if resp_page.status_code == 403:
-            msg_block = f"[BLOCK] Accès interdit (403) sur {page_url}"
-        elif resp_page.status_code == 429:
-            msg_block = f"[BLOCK] Trop de requêtes (429) sur {page_url}"
+    def submit(task):
+        return executor.submit(run_task, task, save_folder, in_progress,
+                               index, lock, proxies, on_media, deadline)
+
+    pending = {submit(task): task for task in tasks}
+    results = {}
+    throttled = []
+    deferred = []
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            task = pending.pop(fut)
+            # Au lieu d'un simple fut.result(), on entoure d'un try/except
+            try:
+                result = fut.result()
+            except Exception as e:
+                # On log l'exception et on continue
+                log_event(f"Exception non gérée dans un thread: {e}")
+                console(f"Exception non gérée: {e}")
+                continue
+            results[result] = results.get(result, 0) + 1
+            if result == RESULT_THROTTLED:
+                throttled.append(task)
+            elif result == RESULT_DEFERRED:
+                deferred.append(task)
 
-        log_event(msg_block)
-        print(f"[{get_current_time()}] {msg_block}")
-        
         with lock:
-            in_progress.discard(page_url)
-        return  # On arrête ce téléchargement, mais pas le script complet
+            new_tasks = discovered[:]
+            discovered.clear()
+        if deadline is not None and deadline.expired():
+            deferred += new_tasks
+            continue
+        for task in new_tasks:
+            pending[submit(task)] = task
+    return results, throttled, deferred
 
-    # Extraction des tags (max 5)
-    tags_found = parse_page_for_tags(resp_page.text)[:5]
-    tags_string = "_".join(tags_found)
+def download_worker(link_queue: queue.Queue,
+                    queued: set,
+                    save_folder: str,
+                    in_progress: set,
+                    index: "DownloadIndex",
+                    lock: Lock,
+                    proxies: dict,
+                    retry_later=None,
+                    on_media=None,
+                    deadline: Deadline = None,
+                    on_result=None) -> None:
+    """
+    Consommateur du mode pipeline : traite les tâches de `link_queue`
+    (liens ou MediaTask) jusqu'à recevoir None. Les tâches bloquées
+    (429/503) ou reportées par l'échéance `deadline` sont confiées à
+    `retry_later` (remise en file après une pause, ou report au cycle
+    suivant) ; les vidéos d'album découvertes, à `on_media`. Chaque
+    résultat (RESULT_FAILED sur exception) est passé à `on_result(tâche,
+    résultat)` si fourni (magasin de tâches partagé).
+    """
+    while True:
+        task = link_queue.get()
+        if task is None:
+            break
+        with lock:
+            queued.discard(task_key(task))
+        result = RESULT_FAILED
+        try:
+            result = run_task(task, save_folder, in_progress, index, lock, proxies,
+                              on_media, deadline)
+            if result in (RESULT_THROTTLED, RESULT_DEFERRED) and retry_later is not None:
+                retry_later(task)
+        except Exception as e:
+            log_event(f"Exception non gérée dans un thread: {e}")
+            console(f"Exception non gérée: {e}")
+        finally:
+            if on_result is not None:
+                on_result(task, result)
 
-    # Repérer la source MP4
-    video_src = get_video_src(resp_page.text)
-    if not video_src:
-        log_event(f"Pas de source MP4 trouvée sur {page_url}")
-        print(f"[{get_current_time()}] Pas de source MP4 trouvée sur {page_url}")
+def run_pipeline_cycle(tag: str,
+                       save_folder: str,
+                       index: "DownloadIndex",
+                       lock: Lock,
+                       proxies: dict,
+                       start_cycle: float,
+                       carry_over: list = None) -> list:
+    """
+    Mode pipeline : chaque lien trouvé par la recherche est placé
+    immédiatement dans une file bornée consommée par THREADS workers.
+    Les téléchargements de la page 1 démarrent pendant que la page 2 est
+    récupérée, et la recherche suivante n'attend pas les derniers fichiers.
+    Quand la file est pleine, la recherche attend (contre-pression).
+    Les vidéos supplémentaires d'un album sont ajoutées à la même file.
+    Les liens bloqués (429/503) sont remis en file avec une pause croissante.
+    En recherche incrémentale, les liens en attente dans l'index sont
+    remis en file à chaque tour, puis seuls les nouveaux liens sont ajoutés.
+    Les tâches reportées du cycle précédent (`carry_over`) sont mises en
+    file les premières. À l'échéance du cycle, la recherche s'arrête, les
+    transferts en cours sont suspendus (.part conservé) et les tâches
+    encore en file ou en attente d'un nouvel essai sont retournées, à
+    reporter au cycle suivant.
+    """
+    seen_links = index.seen_links(tag) if INCREMENTAL_SEARCH else None
+    link_queue = queue.Queue(maxsize=QUEUE_MAXSIZE)
+    queued = set()
+    in_progress = set()
+    deadline = Deadline(SESSION_DURATION - (time.time() - start_cycle))
+    carried = []
+
+    def enqueue(task) -> None:
+        key = task_key(task)
+        if index.is_downloaded(key):
+            return
         with lock:
-            in_progress.discard(page_url)
-        return
+            if key in in_progress or key in queued:
+                return
+            queued.add(key)
+        link_queue.put(task)
+
+    def enqueue_media(task: MediaTask) -> bool:
+        # Appelé par un worker : jamais bloquant (file pleine -> téléchargée sur place)
+        key = task_key(task)
+        with lock:
+            if key in in_progress or key in queued:
+                return True
+            queued.add(key)
+        try:
+            link_queue.put_nowait(task)
+        except queue.Full:
+            with lock:
+                queued.discard(key)
+            return False
+        return True
 
-    if not video_src.startswith("http"):
-        video_src = "https:" + video_src
+    throttle_retries = {}
+    timers = {}  # clé -> (Timer, tâche) en attente d'un nouvel essai
 
-    if not is_mp4_link(video_src):
-        log_event(f"Source non-MP4 sur {page_url} -> {video_src}")
-        print(f"[{get_current_time()}] Source non-MP4 sur {page_url} -> {video_src}")
+    def retry_later(task) -> None:
+        key = task_key(task)
         with lock:
-            in_progress.discard(page_url)
-        return
+            if deadline.expired():
+                carried.append(task)
+                return
+            attempt = throttle_retries.get(key, 0)
+            if attempt >= MAX_THROTTLE_RETRIES:
+                return
+            throttle_retries[key] = attempt + 1
+            timer = Timer(THROTTLE_BACKOFF * 2 ** attempt, requeue, args=(key,))
+            timers[key] = (timer, task)
+        timer.daemon = True
+        timer.start()
 
-    # HEAD : vérifier taille, type
-    try:
-        head_resp = requests.head(video_src, headers=HEADERS, proxies=proxies, timeout=TIMEOUT)
-    except requests.exceptions.RequestException as e:
-        log_event(f"Erreur HEAD sur {video_src} : {e}")
-        print(f"[{get_current_time()}] Erreur HEAD sur {video_src} : {e}")
+    def requeue(key: str) -> None:
         with lock:
-            in_progress.discard(page_url)
+            entry = timers.pop(key, None)
+            if entry is None:
+                return  # Annulé par la fin du cycle
+            if deadline.expired():
+                carried.append(entry[1])
+                return
+        enqueue(entry[1])
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        for _ in range(THREADS):
+            executor.submit(download_worker, link_queue, queued, save_folder,
+                            in_progress, index, lock, proxies, retry_later, enqueue_media,
+                            deadline)
+
+        for task in carry_over or []:
+            enqueue(task)
+
+        while not deadline.expired():
+            if seen_links is not None:
+                for link in index.pending_links(tag):
+                    enqueue(link)
+
+            search_videos(
+                tag=tag,
+                index=index,
+                proxies=proxies,
+                num_links=MAX_LINKS,
+                max_pages=MAX_PAGES,
+                on_link=enqueue,
+                seen_links=seen_links,
+                deadline=deadline
+            )
+
+            if deadline.expired():
+                break
+            console(f"En pause {SLEEP_BETWEEN_SEARCH}s avant la prochaine recherche.", newline=True)
+            deadline.sleep(SLEEP_BETWEEN_SEARCH)
+        console(f"20 minutes écoulées pour le tag '{tag}'.")
+
+        # Fin du cycle : les workers vident la file (tâches reportées
+        # aussitôt, l'échéance étant passée) puis s'arrêtent
+        for _ in range(THREADS):
+            link_queue.put(None)
+
+    with lock:
+        for timer, task in timers.values():
+            timer.cancel()
+            carried.append(task)
+        timers.clear()
+    return carried
+
+def run_async_cycle(tag: str,
+                    save_folder: str,
+                    index: "DownloadIndex",
+                    lock: Lock,
+                    proxies: dict,
+                    start_cycle: float,
+                    carry_over: list = None) -> list:
+    """
+    Moteur asyncio : même pipeline que run_pipeline_cycle (échéance et
+    report des tâches compris), mais les
+    téléchargements sont ASYNC_CONCURRENCY coroutines partageant une
+    ClientSession aiohttp, au lieu de THREADS threads. La recherche
+    (requests) tourne dans un thread et alimente la file de la boucle ;
+    la contre-pression de la file bornée s'applique de la même façon.
+    Sans aiohttp (ou sans aiohttp_socks pour un proxy SOCKS5), on revient
+    au mode pipeline par threads.
+    """
+    reason = async_engine_error(proxies)
+    if reason:
+        console(f"Moteur asyncio indisponible ({reason}), mode threads.")
+        log_event(f"Moteur asyncio indisponible ({reason}), mode threads.")
+        return run_pipeline_cycle(tag, save_folder, index, lock, proxies, start_cycle,
+                                  carry_over)
+    return asyncio.run(_run_async_cycle(tag, save_folder, index, proxies, start_cycle,
+                                        carry_over))
+
+async def _run_async_cycle(tag: str,
+                           save_folder: str,
+                           index: "DownloadIndex",
+                           proxies: dict,
+                           start_cycle: float,
+                           carry_over: list = None) -> list:
+    """Corps de run_async_cycle, exécuté dans la boucle asyncio."""
+    loop = asyncio.get_running_loop()
+    seen_links = await asyncio.to_thread(index.seen_links, tag) if INCREMENTAL_SEARCH else None
+    link_queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+    queued = set()
+    in_progress = set()
+    deadline = Deadline(SESSION_DURATION - (time.time() - start_cycle))
+    carried = []
+
+    async def enqueue(task) -> None:
+        # Clé réservée avant de consulter l'index, qui rend la main à la boucle
+        key = task_key(task)
+        if key in in_progress or key in queued:
+            return
+        queued.add(key)
+        if await asyncio.to_thread(index.is_downloaded, key):
+            queued.discard(key)
+            return
+        await link_queue.put(task)
+
+    def enqueue_media(task: MediaTask) -> bool:
+        # Appelé par un worker : jamais bloquant (file pleine -> téléchargée sur place)
+        key = task_key(task)
+        if key in in_progress or key in queued:
+            return True
+        queued.add(key)
+        try:
+            link_queue.put_nowait(task)
+        except asyncio.QueueFull:
+            queued.discard(key)
+            return False
+        return True
+
+    def enqueue_from_thread(link: str) -> None:
+        # Appelé par la recherche (thread) : bloque tant que la file est pleine
+        asyncio.run_coroutine_threadsafe(enqueue(link), loop).result()
+
+    throttle_retries = {}
+    timers = {}  # clé -> (TimerHandle, tâche) en attente d'un nouvel essai
+
+    def retry_later(task) -> None:
+        key = task_key(task)
+        if deadline.expired():
+            carried.append(task)
+            return
+        attempt = throttle_retries.get(key, 0)
+        if attempt >= MAX_THROTTLE_RETRIES:
+            return
+        throttle_retries[key] = attempt + 1
+        handle = loop.call_later(THROTTLE_BACKOFF * 2 ** attempt, requeue, key)
+        timers[key] = (handle, task)
+
+    def requeue(key: str) -> None:
+        _, task = timers.pop(key)
+        if deadline.expired():
+            carried.append(task)
+        else:
+            loop.create_task(enqueue(task))
+
+    def search_loop() -> None:
+        for task in carry_over or []:
+            enqueue_from_thread(task)
+
+        while not deadline.expired():
+            if seen_links is not None:
+                for link in index.pending_links(tag):
+                    enqueue_from_thread(link)
+
+            search_videos(
+                tag=tag,
+                index=index,
+                proxies=proxies,
+                num_links=MAX_LINKS,
+                max_pages=MAX_PAGES,
+                on_link=enqueue_from_thread,
+                seen_links=seen_links,
+                deadline=deadline
+            )
+
+            if deadline.expired():
+                break
+            console(f"En pause {SLEEP_BETWEEN_SEARCH}s avant la prochaine recherche.", newline=True)
+            deadline.sleep(SLEEP_BETWEEN_SEARCH)
+        console(f"20 minutes écoulées pour le tag '{tag}'.")
+
+    with ThreadPoolExecutor(max_workers=ASYNC_FILE_WORKERS) as file_executor:
+        async with create_async_session(proxies) as http:
+            workers = [
+                asyncio.create_task(async_download_worker(
+                    link_queue, queued, save_folder, in_progress, index,
+                    http, file_executor, retry_later, enqueue_media, deadline
+                ))
+                for _ in range(ASYNC_CONCURRENCY)
+            ]
+            await asyncio.to_thread(search_loop)
+
+            # Fin du cycle : les workers vident la file (tâches reportées
+            # aussitôt, l'échéance étant passée) puis s'arrêtent
+            for _ in range(ASYNC_CONCURRENCY):
+                await link_queue.put(None)
+            await asyncio.gather(*workers)
+
+    for handle, task in timers.values():
+        handle.cancel()
+        carried.append(task)
+    return carried
+
+# -------------------------------------------------------------------------
+# MAGASIN DE TÂCHES PARTAGÉ (PLUSIEURS MACHINES, BAUX)
+# -------------------------------------------------------------------------
+# Résultats définitifs : la tâche est close dans le magasin (RESULT_ALBUM :
+# chaque vidéo de l'album y a sa propre tâche). Les autres, RESULT_SKIPPED
+# compris, ne la closent que si l'index la donne terminée.
+FINAL_RESULTS = (RESULT_DONE, RESULT_REJECTED, RESULT_DUPLICATE, RESULT_QUARANTINED, RESULT_ALBUM)
+# Rendues sans échec mais à ne pas reprendre aussitôt : TASK_RECHECK_DELAY
+RECHECK_RESULTS = (RESULT_SKIPPED, RESULT_BUSY)
+
+def settle_task(store, index: "DownloadIndex", task, result: str) -> None:
+    """
+    Clôt la tâche `task` dans `store` (résultat définitif, ou entrée
+    terminée dans l'index), ou la rend pour un nouvel essai ici ou
+    ailleurs ; seuls les échecs consomment une prise (TASK_MAX_ATTEMPTS).
+    """
+    key = task_key(task)
+    if result in FINAL_RESULTS or index.is_downloaded(key):
+        store.complete(key)
         return
+    delay = 0
+    if result == RESULT_THROTTLED:
+        delay = THROTTLE_BACKOFF
+    elif result in RECHECK_RESULTS:
+        delay = TASK_RECHECK_DELAY
+    store.release(NODE_ID, key, delay, attempt=result in (RESULT_FAILED, RESULT_THROTTLED))
 
-    if head_resp.status_code != 200:
-        msg_block = f"HEAD status {head_resp.status_code} sur {video_src}"
-        if head_resp.status_code == 403:
-            msg_block = f"[BLOCK] HEAD interdit (403) sur {video_src}"
-        elif head_resp.status_code == 429:
-            msg_block = f"[BLOCK] Trop de requêtes (429) sur {video_src}"
+def encode_task(task) -> str:
+    """Sérialise une tâche (lien de page ou MediaTask) pour le magasin."""
+    if isinstance(task, MediaTask):
+        return json.dumps(asdict(task))
+    return json.dumps({"url": task})
 
-        log_event(msg_block)
-        print(f"[{get_current_time()}] {msg_block}")
-        
-        with lock:
-            in_progress.discard(page_url)
-        return  # On arrête juste ce téléchargement
+def decode_task(payload: str):
+    """Inverse d'encode_task."""
+    data = json.loads(payload)
+    return data["url"] if "url" in data else MediaTask(**data)
 
-    ctype = head_resp.headers.get('Content-Type', '')
-    clength_str = head_resp.headers.get('Content-Length', '0')
-    try:
-        clength = int(clength_str)
-    except ValueError:
-        clength = 0
+class MemoryTaskStore:
+    """
+    Magasin de tâches en mémoire (un seul processus : tests, benchmark),
+    même interface que SQLiteTaskStore :
+      - add(tag, tâches)                 : ajoute (sans doublon) les tâches d'un tag ;
+      - claim(nœud, tag, n, bail)        : prend jusqu'à n tâches libres pour `bail` secondes ;
+      - renew(nœud, bail)                : prolonge les baux du nœud ;
+      - complete(clé)                    : clôt la tâche (True au premier appel seulement) ;
+      - release(nœud, clé, délai, essai) : rend la tâche (nouvel essai après `délai`) ;
+      - release_all(nœud)                : rend toutes les tâches du nœud ;
+      - counts()                         : nombre de tâches par statut.
+    Une tâche libre est "pending" (ou "leased" avec un bail expiré : nœud
+    arrêté). Après TASK_MAX_ATTEMPTS prises sans succès, elle passe en
+    "failed" ; une tâche rendue avec essai=False (reportée, transfert
+    partiel) ou par release_all ne consomme pas de prise.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._tasks = {}            # clé -> dict(task, status, owner, lease_until, attempts, seq)
+        self._tags = {}             # tag -> clés, dans l'ordre d'ajout
+        self._seq = 0
 
-    if not ctype.startswith('video'):
-        log_event(f"HEAD indique un type non vidéo ({ctype}) sur {video_src}")
-        print(f"[{get_current_time()}] Type non vidéo pour {video_src} ({ctype})")
+    def add(self, tag: str, tasks: list) -> int:
+        added = 0
+        with self._lock:
+            keys = self._tags.setdefault(tag, {})
+            for task in tasks:
+                key = task_key(task)
+                if key not in self._tasks:
+                    self._seq += 1
+                    self._tasks[key] = {"task": task, "status": "pending", "owner": None,
+                                        "lease_until": 0.0, "attempts": 0, "seq": self._seq}
+                    added += 1
+                keys[key] = None
+        return added
+
+    def claim(self, node: str, tag: str, limit: int, lease: float = None) -> list:
+        now = time.time()
+        with self._lock:
+            free = [
+                entry for entry in (self._tasks[key] for key in self._tags.get(tag, ()))
+                if entry["status"] in ("pending", "leased") and entry["lease_until"] <= now
+            ]
+            free.sort(key=lambda entry: (entry["lease_until"], entry["seq"]))
+            claimed = []
+            for entry in free[:limit]:
+                entry.update(status="leased", owner=node,
+                             lease_until=now + (lease or TASK_LEASE),
+                             attempts=entry["attempts"] + 1)
+                claimed.append(entry["task"])
+        return claimed
+
+    def renew(self, node: str, lease: float = None) -> int:
+        lease_until = time.time() + (lease or TASK_LEASE)
+        with self._lock:
+            entries = [entry for entry in self._tasks.values()
+                       if entry["owner"] == node and entry["status"] == "leased"]
+            for entry in entries:
+                entry["lease_until"] = lease_until
+        return len(entries)
+
+    def complete(self, key: str) -> bool:
+        with self._lock:
+            entry = self._tasks.get(key)
+            if entry is None or entry["status"] == "done":
+                return False
+            entry.update(status="done", owner=None)
+            return True
+
+    def release(self, node: str, key: str, delay: float = 0, attempt: bool = True) -> bool:
+        with self._lock:
+            entry = self._tasks.get(key)
+            if entry is None or entry["owner"] != node or entry["status"] != "leased":
+                return False    # Bail perdu : la tâche a été reprise par un autre nœud
+            if not attempt:
+                entry["attempts"] -= 1
+            status = "failed" if attempt and entry["attempts"] >= TASK_MAX_ATTEMPTS else "pending"
+            entry.update(status=status, owner=None, lease_until=time.time() + delay)
+            return True
+
+    def release_all(self, node: str) -> int:
+        with self._lock:
+            entries = [entry for entry in self._tasks.values()
+                       if entry["owner"] == node and entry["status"] == "leased"]
+            for entry in entries:
+                entry.update(status="pending", owner=None, lease_until=0.0,
+                             attempts=entry["attempts"] - 1)
+        return len(entries)
+
+    def counts(self) -> dict:
+        with self._lock:
+            counts = {}
+            for entry in self._tasks.values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def close(self) -> None:
+        pass
+
+class SQLiteTaskStore:
+    """
+    Magasin de tâches SQLite partagé par plusieurs machines (fichier sur un
+    système de fichiers commun) ; interface décrite dans MemoryTaskStore.
+    Journal "DELETE" et non WAL (le WAL exige une mémoire partagée, absente
+    sur NFS/SMB) ; chaque prise de tâches est une transaction
+    BEGIN IMMEDIATE, donc deux nœuds ne peuvent pas prendre la même tâche.
+    Les baux sont en temps absolu (time.time()) : horloges des machines
+    synchronisées (NTP) à quelques secondes près.
+    Une tâche trouvée par plusieurs tags n'est stockée qu'une fois.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=TASK_STORE_BUSY_TIMEOUT)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " task_key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " owner TEXT,"
+            " lease_until REAL NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_tags ("
+            " tag TEXT NOT NULL,"
+            " task_key TEXT NOT NULL,"
+            " PRIMARY KEY (tag, task_key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_owner ON tasks (owner)")
+
+    @contextmanager
+    def _transaction(self):
+        """Transaction en écriture (verrou interne + BEGIN IMMEDIATE)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add(self, tag: str, tasks: list) -> int:
+        now = get_current_time()
+        rows = [(task_key(task), encode_task(task)) for task in tasks]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (task_key, payload, status, created_at, updated_at)"
+                " VALUES (?, ?, 'pending', ?, ?)",
+                [(key, payload, now, now) for key, payload in rows]
+            )
+            added = conn.total_changes - before
+            conn.executemany("INSERT OR IGNORE INTO task_tags (tag, task_key) VALUES (?, ?)",
+                             [(tag, key) for key, _ in rows])
+        return added
+
+    def claim(self, node: str, tag: str, limit: int, lease: float = None) -> list:
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT t.task_key, t.payload FROM task_tags g"
+                " JOIN tasks t ON t.task_key = g.task_key"
+                " WHERE g.tag = ? AND t.status IN ('pending', 'leased') AND t.lease_until <= ?"
+                " ORDER BY t.lease_until, t.rowid LIMIT ?",
+                (tag, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', owner = ?, lease_until = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE task_key = ?",
+                [(node, now + (lease or TASK_LEASE), get_current_time(), key) for key, _ in rows]
+            )
+        return [decode_task(payload) for _, payload in rows]
+
+    def renew(self, node: str, lease: float = None) -> int:
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE owner = ? AND status = 'leased'",
+                (time.time() + (lease or TASK_LEASE), node)
+            ).rowcount
+
+    def complete(self, key: str) -> bool:
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = 'done', owner = NULL, updated_at = ?"
+                " WHERE task_key = ? AND status != 'done'",
+                (get_current_time(), key)
+            ).rowcount == 1
+
+    def release(self, node: str, key: str, delay: float = 0, attempt: bool = True) -> bool:
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = CASE WHEN ? AND attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " attempts = attempts - ?, owner = NULL, lease_until = ?, updated_at = ?"
+                " WHERE task_key = ? AND owner = ? AND status = 'leased'",
+                (attempt, TASK_MAX_ATTEMPTS, 0 if attempt else 1, time.time() + delay,
+                 get_current_time(), key, node)
+            ).rowcount == 1
+
+    def release_all(self, node: str) -> int:
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = 'pending', owner = NULL, lease_until = 0,"
+                " attempts = attempts - 1, updated_at = ? WHERE owner = ? AND status = 'leased'",
+                (get_current_time(), node)
+            ).rowcount
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def open_task_store(location: str):
+    """Ouvre le magasin désigné par `location` : ":memory:" ou chemin d'un fichier SQLite."""
+    if location == ":memory:":
+        return MemoryTaskStore()
+    return SQLiteTaskStore(location)
+
+# -------------------------------------------------------------------------
+# ORDONNANCEUR MULTI-TAGS (MODE SANS SURVEILLANCE)
+# -------------------------------------------------------------------------
+@dataclass
+class TagConfig:
+    """Réglages d'un tag en mode sans surveillance (fichier JSON ou --tag)."""
+    tag: str
+    weight: float = 1.0             # Part relative du pool de téléchargement
+    max_links: int = MAX_LINKS      # Liens au plus par recherche
+    max_pages: int = MAX_PAGES      # Pages au plus par recherche
+    max_active: int = None          # Téléchargements simultanés au plus (None = sans limite)
+
+class FairQueue:
+    """
+    File de téléchargement partagée par plusieurs tags : une sous-file
+    bornée (`maxsize`) par tag, servies par ordonnancement à pas pondéré
+    (stride scheduling). Chaque tâche servie avance le « passage » de son
+    tag de 1/poids et le tag éligible au plus petit passage est servi en
+    premier. Un tag sans tâche en attente ne consomme rien : sa part
+    revient aux autres, et il ne cumule pas de crédit pendant ce temps.
+    Interface de queue.Queue utilisée par download_worker (get, put,
+    put_nowait, None pour s'arrêter après close()). Une tâche ajoutée
+    depuis un worker sans tag explicite (vidéos d'album, nouvel essai)
+    hérite du tag de la tâche en cours dans ce thread.
+    """
+    def __init__(self, configs: list, maxsize: int = QUEUE_MAXSIZE):
+        self._configs = {config.tag: config for config in configs}
+        self._queues = {config.tag: deque() for config in configs}
+        self._pass = {config.tag: 0.0 for config in configs}
+        self._active = {config.tag: 0 for config in configs}
+        self._vtime = 0.0           # Passage de la dernière tâche servie
+        self._maxsize = maxsize
+        self._closed = False
+        self._cond = Condition()
+        self._local = threading.local()
+
+    def current_tag(self) -> str:
+        """Tag de la tâche en cours dans le thread appelant (ou None)."""
+        return getattr(self._local, "tag", None)
+
+    def put(self, task, tag: str = None, block: bool = True) -> None:
+        """Ajoute `task` à la sous-file de `tag` (bloque si elle est pleine)."""
+        tag = tag or self.current_tag()
+        with self._cond:
+            tasks = self._queues[tag]
+            while self._maxsize and len(tasks) >= self._maxsize:
+                if not block:
+                    raise queue.Full
+                self._cond.wait()
+            if not tasks and not self._active[tag]:
+                # Tag qui redevient actif : il repart du passage courant
+                self._pass[tag] = max(self._pass[tag], self._vtime)
+            tasks.append(task)
+            self._cond.notify_all()
+
+    def put_nowait(self, task, tag: str = None) -> None:
+        self.put(task, tag, block=False)
+
+    def get(self):
+        """
+        Retourne la prochaine tâche (la précédente de ce thread est
+        considérée terminée), ou None une fois la file fermée et vide.
+        """
+        with self._cond:
+            self._release()
+            while True:
+                tag = self._pick()
+                if tag is not None:
+                    break
+                if self._closed and not any(self._queues.values()):
+                    return None
+                self._cond.wait()
+            task = self._queues[tag].popleft()
+            self._active[tag] += 1
+            self._local.tag = tag
+            self._cond.notify_all()  # Place libérée pour un put() bloqué
+            return task
+
+    def close(self) -> None:
+        """Les workers s'arrêtent (None) une fois les sous-files vidées."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def pending(self) -> dict:
+        """Nombre de tâches en attente par tag."""
+        with self._cond:
+            return {tag: len(tasks) for tag, tasks in self._queues.items()}
+
+    def _pick(self) -> str:
+        """Tag éligible (tâche en attente, sous max_active) au plus petit passage."""
+        best = None
+        for tag, tasks in self._queues.items():
+            config = self._configs[tag]
+            if not tasks or (config.max_active and self._active[tag] >= config.max_active):
+                continue
+            if best is None or self._pass[tag] < self._pass[best]:
+                best = tag
+        if best is not None:
+            self._vtime = self._pass[best]
+            self._pass[best] += 1 / self._configs[best].weight
+        return best
+
+    def _release(self) -> None:
+        tag = self.current_tag()
+        if tag is not None:
+            self._active[tag] -= 1
+            self._local.tag = None
+            self._cond.notify_all()
+
+def run_scheduler(configs: list,
+                  save_folder: str,
+                  index: "DownloadIndex",
+                  lock: Lock,
+                  proxies: dict,
+                  duration: float = None,
+                  store=None) -> list:
+    """
+    Mode sans surveillance : tous les tags de `configs` (TagConfig) sont
+    traités en même temps. Chaque tag a son thread de recherche
+    (incrémentale) qui alimente sa sous-file d'une FairQueue ; un seul
+    pool de THREADS workers la consomme selon les poids et limites des
+    tags. Un tag dont la recherche ne trouve rien de nouveau espace ses
+    recherches (jusqu'à TAG_IDLE_MAX_SLEEP) et laisse le pool aux autres.
+    S'arrête après `duration` secondes (None : sans fin) ou sur Ctrl-C,
+    avec la même échéance que les cycles ; retourne les tâches reportées.
+
+    Avec un magasin de tâches partagé (`store`, plusieurs machines), les
+    liens et vidéos d'album trouvés y sont ajoutés au lieu d'être mis en
+    file ; un thread prend des tâches sous bail (TASK_LEASE, renouvelé
+    tant que le nœud tourne) pour alimenter la FairQueue, et chaque
+    résultat clôt la tâche ou la rend aux autres nœuds. Le bail d'un nœud
+    arrêté expire et ses tâches sont reprises ailleurs.
+    """
+    deadline = Deadline(duration)
+    fair_queue = FairQueue(configs)
+    queued = set()
+    in_progress = set()
+    carried = []
+
+    def enqueue(task, tag: str = None) -> None:
+        if store is not None:
+            store.add(tag or fair_queue.current_tag(), [task])
+            return
+        key = task_key(task)
+        if index.is_downloaded(key):
+            return
         with lock:
-            in_progress.discard(page_url)
-        return
+            if key in in_progress or key in queued:
+                return
+            queued.add(key)
+        fair_queue.put(task, tag)
 
-    if not (MIN_SIZE_BYTES <= clength <= MAX_SIZE_BYTES):
-        log_event(f"HEAD indique une taille hors limites ({clength} bytes) sur {video_src}")
-        print(f"[{get_current_time()}] Taille hors limites ({clength} bytes) pour {video_src}")
+    def enqueue_media(task: MediaTask) -> bool:
+        # Appelé par un worker : jamais bloquant (file pleine -> téléchargée sur place)
+        if store is not None:
+            enqueue(task)
+            return True
+        key = task_key(task)
         with lock:
-            in_progress.discard(page_url)
-        return
+            if key in in_progress or key in queued:
+                return True
+            queued.add(key)
+        try:
+            fair_queue.put_nowait(task)
+        except queue.Full:
+            with lock:
+                queued.discard(key)
+            return False
+        return True
 
-    # Construire le nom de fichier
-    original_name = video_src.split('/')[-1]
-    final_name = f"{tags_string}_{original_name}" if tags_string else original_name
-    save_path = os.path.join(save_folder, final_name)
+    throttle_retries = {}
+    timers = {}  # clé -> (Timer, tâche) en attente d'un nouvel essai
 
-    # Téléchargement
-    try:
-        video_resp = requests.get(video_src, stream=True, headers=HEADERS, proxies=proxies, timeout=TIMEOUT)
-    except requests.exceptions.RequestException as e:
-        log_event(f"Erreur GET (téléchargement) sur {video_src} : {e}")
-        print(f"[{get_current_time()}] Erreur GET (téléchargement) sur {video_src} : {e}")
+    def retry_later(task) -> None:
+        key = task_key(task)
         with lock:
-            in_progress.discard(page_url)
-        return
+            if deadline.expired():
+                carried.append(task)
+                return
+            attempt = throttle_retries.get(key, 0)
+            if attempt >= MAX_THROTTLE_RETRIES:
+                return
+            throttle_retries[key] = attempt + 1
+            timer = Timer(THROTTLE_BACKOFF * 2 ** attempt, requeue,
+                          args=(key, fair_queue.current_tag()))
+            timers[key] = (timer, task)
+        timer.daemon = True
+        timer.start()
 
-    if video_resp.status_code != 200:
-        msg_block = f"Erreur téléchargement (code={video_resp.status_code}) sur {video_src}"
-        if video_resp.status_code == 403:
-            msg_block = f"[BLOCK] Téléchargement interdit (403) sur {video_src}"
-        elif video_resp.status_code == 429:
-            msg_block = f"[BLOCK] Trop de requêtes (429) en téléchargement sur {video_src}"
-
-        log_event(msg_block)
-        print(f"[{get_current_time()}] {msg_block}")
-        
+    def requeue(key: str, tag: str) -> None:
         with lock:
-            in_progress.discard(page_url)
-        return
+            entry = timers.pop(key, None)
+            if entry is None:
+                return  # Annulé par l'arrêt
+            if deadline.expired():
+                carried.append(entry[1])
+                return
+        enqueue(entry[1], tag)
 
-    tsize_str = video_resp.headers.get('content-length', '0')
-    try:
-        tsize = int(tsize_str)
-    except ValueError:
-        tsize = 0
+    def search_loop(config: TagConfig) -> None:
+        tag = config.tag
+        seen_links = index.seen_links(tag)
+        pause = SLEEP_BETWEEN_SEARCH
+        while not deadline.expired():
+            if store is not None:
+                store.add(tag, index.pending_links(tag))
+            else:
+                for link in index.pending_links(tag):
+                    enqueue(link, tag)
 
-    if tsize == 0:
-        log_event(f"Pas de content-length ou 0 lors du téléchargement sur {video_src}")
-        print(f"[{get_current_time()}] content-length=0 pour {video_src}")
-        with lock:
-            in_progress.discard(page_url)
-        return
+            found = search_videos(
+                tag=tag,
+                index=index,
+                proxies=proxies,
+                num_links=config.max_links,
+                max_pages=config.max_pages,
+                on_link=lambda link: enqueue(link, tag),
+                seen_links=seen_links,
+                deadline=deadline
+            )
 
-    print(f"[{get_current_time()}] Téléchargement : {final_name}")
-    with tqdm(total=tsize, unit='B', unit_scale=True, desc=final_name) as pbar:
-        downloaded_size = 0
-        start_time = time.time()
+            if found:
+                pause = SLEEP_BETWEEN_SEARCH
+            else:
+                pause = min(pause * 2, TAG_IDLE_MAX_SLEEP)
+                log_event(f"Rien de nouveau pour '{tag}', prochaine recherche dans {pause}s.",
+                          tag=tag)
+            deadline.sleep(pause)
 
-        with open(save_path, 'wb') as f:
-            for chunk in video_resp.iter_content(chunk_size=1024):
-                if not chunk:
-                    continue
-                f.write(chunk)
-                downloaded_size += len(chunk)
-                pbar.update(len(chunk))
+    def settle(task, result: str) -> None:
+        try:
+            settle_task(store, index, task, result)
+        except sqlite3.Error as e:
+            log_event(f"Magasin de tâches indisponible ({task_key(task)}) : {e}")
 
-                # Calcul de la vitesse
-                elapsed = time.time() - start_time
-                speed = downloaded_size / elapsed if elapsed > 0 else 0
-                print(f"\r[{get_current_time()}] Vitesse : {speed/1024:.2f} KB/s", end='')
+    def claim_loop() -> None:
+        # Magasin partagé : complète à THREADS tâches prises la sous-file de
+        # chaque tag à moitié vide ; un tag sans tâche libre attend TASK_POLL_INTERVAL
+        next_poll = {config.tag: 0.0 for config in configs}
+        while not deadline.expired():
+            pending = fair_queue.pending()
+            now = time.monotonic()
+            try:
+                for config in configs:
+                    room = THREADS - pending[config.tag]
+                    if room < THREADS / 2 or now < next_poll[config.tag]:
+                        continue
+                    tasks = store.claim(NODE_ID, config.tag, room)
+                    for task in tasks:
+                        fair_queue.put(task, config.tag)
+                    if not tasks:
+                        next_poll[config.tag] = now + TASK_POLL_INTERVAL
+            except sqlite3.Error as e:
+                log_event(f"Magasin de tâches indisponible : {e}")
+            deadline.sleep(TASK_REFILL_INTERVAL)
 
-    # Vérification finale
-    final_size = os.path.getsize(save_path)
-    if final_size < 2000:
-        # Fichier trop petit, on le supprime
-        os.remove(save_path)
-        log_event(f"Fichier trop petit après téléchargement (corrompu ?) : {final_name}")
-        print(f"[{get_current_time()}] Fichier {final_name} trop petit (probablement corrompu). Supprimé.")
-    else:
-        print(f"\n[{get_current_time()}] Fichier enregistré : {final_name} ({final_size} octets)")
-        with lock:
-            downloaded_videos.add(page_url)
+    def heartbeat() -> None:
+        # Magasin partagé : prolonge les baux des tâches prises par ce nœud
+        while deadline.sleep(TASK_LEASE / 3):
+            try:
+                store.renew(NODE_ID)
+            except sqlite3.Error as e:
+                log_event(f"Magasin de tâches indisponible (renouvellement des baux) : {e}")
+
+    def guarded(target, name: str, *args) -> None:
+        try:
+            target(*args)
+        except Exception as e:
+            log_event(f"Exception non gérée dans '{name}': {e!r}")
+            console(f"Exception non gérée ({name}): {e!r}")
 
+    console(f"Ordonnanceur : {len(configs)} tag(s) sur {THREADS} workers "
+            f"({'sans fin' if duration is None else f'{duration:.0f}s'}"
+            f"{'' if store is None else f', nœud {NODE_ID}'}).", newline=True)
+    with ThreadPoolExecutor(max_workers=THREADS) as workers, \
+            ThreadPoolExecutor(max_workers=len(configs) + 2) as searchers:
+        for _ in range(THREADS):
+            workers.submit(download_worker, fair_queue, queued, save_folder, in_progress,
+                           index, lock, proxies, None if store else retry_later, enqueue_media,
+                           deadline, None if store is None else settle)
+        searches = [searchers.submit(guarded, search_loop, f"recherche '{config.tag}'", config)
+                    for config in configs]
+        if store is not None:
+            searches.append(searchers.submit(guarded, claim_loop, "magasin de tâches"))
+            searches.append(searchers.submit(guarded, heartbeat, "baux"))
+        try:
+            wait(searches)
+        except KeyboardInterrupt:
+            console("Interruption : arrêt des transferts au bloc suivant.", newline=True)
+            deadline.cancel()
+            wait(searches)
+
+        # Les workers vident la file (tâches reportées aussitôt) puis s'arrêtent
+        fair_queue.close()
+
+    if store is not None:
+        store.release_all(NODE_ID)
     with lock:
-        in_progress.discard(page_url)
+        for timer, task in timers.values():
+            timer.cancel()
+            carried.append(task)
+        timers.clear()
+    return carried
 
 # -------------------------------------------------------------------------
 # BOUCLE PRINCIPALE
 # -------------------------------------------------------------------------
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    """Options de la ligne de commande (sans --config ni --tag : mode interactif)."""
+    parser = argparse.ArgumentParser(
+        description="Recherche et téléchargement de vidéos Erome par tag.",
+        epilog="Sans --config ni --tag, le tag et le proxy sont demandés au clavier."
+    )
+    parser.add_argument("--config", metavar="FICHIER",
+                        help="fichier JSON : tags (poids, limites), proxy, durée")
+    parser.add_argument("--tag", action="append", default=[], metavar="TAG[:POIDS]",
+                        help="tag à traiter (option répétable), avec un poids facultatif")
+    parser.add_argument("--proxy", metavar="URL",
+                        help="proxy HTTP(S) ou SOCKS5 (ex: socks5://user:pass@hôte:port)")
+    parser.add_argument("--duration", type=float, metavar="SECONDES",
+                        help="durée totale du mode sans surveillance (défaut : sans fin)")
+    parser.add_argument("--task-store", metavar="FICHIER",
+                        help="magasin de tâches SQLite partagé entre plusieurs machines")
+    parser.add_argument("--status", action="store_true",
+                        help="affiche l'état de l'index, du cache et du magasin de tâches, puis quitte")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="valide --config/--tag et affiche le programme prévu, sans réseau")
+    return parser.parse_args(argv)
+
+def load_schedule(args: argparse.Namespace) -> tuple:
+    """
+    Construit (liste de TagConfig, proxies, durée, magasin de tâches) à
+    partir du fichier --config, complété ou remplacé par les options
+    --tag, --proxy, --duration et --task-store. Exemple de fichier :
+      {"tags": ["tag1", {"tag": "tag2", "weight": 2, "max_active": 5}],
+       "proxy": "socks5://127.0.0.1:9050", "duration": null,
+       "task_store": "/mnt/partage/dump_tasks.sqlite"}
+    Lève ValueError si la configuration est invalide.
+    """
+    settings = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            settings = json.load(f)
+
+    configs = {}
+    for entry in settings.get("tags", []):
+        if isinstance(entry, str):
+            entry = {"tag": entry}
+        try:
+            config = TagConfig(**entry)
+        except TypeError as e:
+            raise ValueError(f"entrée de tag invalide {entry!r} ({e})") from None
+        configs[config.tag] = config
+    for spec in args.tag:
+        tag, _, weight = spec.partition(":")
+        config = configs.setdefault(tag, TagConfig(tag))
+        if weight:
+            config.weight = float(weight)
+
+    if not configs:
+        raise ValueError("aucun tag à traiter")
+    for config in configs.values():
+        if not config.tag or config.weight <= 0:
+            raise ValueError(f"tag vide ou poids invalide : {config!r}")
+
+    proxies = proxies_from_url(args.proxy or settings.get("proxy"))
+    duration = args.duration if args.duration is not None else settings.get("duration")
+    task_store = args.task_store or settings.get("task_store")
+    return list(configs.values()), proxies, duration, task_store
+
+def show_status(task_store: str = None) -> None:
+    """
+    Commande --status : état de l'index, du cache des pages et du magasin
+    de tâches `task_store`, sans accès réseau (ni bs4, tqdm ou aiohttp).
+    """
+    if os.path.exists(INDEX_FILE):
+        index = DownloadIndex(INDEX_FILE)
+        summary = index.summary()
+        index.close()
+        print(f"Index {INDEX_FILE} : {summary['links']} liens vus, "
+              f"{summary['pending_links']} à traiter, {summary['abandoned']} abandonné(s)")
+        for status, count in sorted(summary["videos"].items()):
+            print(f"  {status:<12}: {count}")
+    else:
+        print(f"Index {INDEX_FILE} : absent")
+    if PAGE_CACHE_FILE and os.path.exists(PAGE_CACHE_FILE):
+        cache = PageCache(PAGE_CACHE_FILE)
+        entries, size = cache.usage()
+        cache.close()
+        print(f"Cache des pages {PAGE_CACHE_FILE} : {entries} pages, "
+              f"{size / (1024 * 1024):.1f} Mo sur {PAGE_CACHE_MAX_BYTES / (1024 * 1024):.0f} Mo")
+    if task_store:
+        store = open_task_store(task_store)
+        print(f"Magasin de tâches {task_store} : {store.counts()}")
+        store.close()
+
+def show_schedule(configs: list, proxies: dict, duration: float, task_store: str) -> None:
+    """
+    Commande --dry-run : programme du mode sans surveillance (tags, limites,
+    liens déjà en attente dans l'index), sans test du proxy ni recherche.
+    """
+    index = DownloadIndex(INDEX_FILE) if os.path.exists(INDEX_FILE) else None
+    for config in configs:
+        pending = len(index.pending_links(config.tag)) if index is not None else 0
+        active = f"{config.max_active} actifs max" if config.max_active else "actifs sans limite"
+        print(f"Tag '{config.tag}' : poids {config.weight}, {config.max_links} liens et "
+              f"{config.max_pages} pages max, {active}, {pending} lien(s) en attente")
+    if index is not None:
+        index.close()
+    proxy = urlsplit(proxies["https"]) if proxies else None
+    print(f"Proxy : {f'{proxy.scheme}://{proxy.hostname}:{proxy.port}' if proxy else 'aucun'}")
+    print(f"Durée : {f'{duration}s' if duration else 'sans fin'}")
+    print(f"Magasin de tâches : {task_store or 'aucun (file locale)'}")
+    print(f"Moteur : {ENGINE}, {THREADS} threads, politique de transfert {SCHEDULING_POLICY}")
+
+def run_interactive(save_folder: str, index: "DownloadIndex", lock: Lock) -> None:
     """
-    Boucle principale :
-      1. Demande le tag et le proxy (HTTP/HTTPS ou SOCKS5).
+    Mode interactif :
+      1. Demande le tag, puis le proxy (HTTP/HTTPS ou SOCKS5) au premier
+         cycle seulement : il est testé une fois et réutilisé ensuite.
       2. Recherche et télécharge pendant 20 minutes.
       3. Au bout de 20 minutes, on redemande à l'utilisateur
          s'il veut changer de tag ou arrêter.
       4. Recommence avec le nouveau tag si choisi.
-
-    Les mini-logs (erome_log.txt) notent les blocages potentiels (403, 429)
-    ou toute autre erreur notable, et on affiche aussi un message en console.
     """
-    save_folder = "downloads"
-    output_file = "video_links.txt"
-    os.makedirs(save_folder, exist_ok=True)
-
-    # Liste des vidéos déjà téléchargées
-    downloaded_videos = set()
-    if os.path.exists("downloaded_videos.txt"):
-        with open("downloaded_videos.txt", 'r', encoding="utf-8") as f:
-            for line in f:
-                downloaded_videos.add(line.strip())
-
-    lock = Lock()
+    if ENGINE == "asyncio":
+        run_cycle = run_async_cycle
+    else:
+        run_cycle = run_pipeline_cycle if PIPELINE_MODE else run_batch_cycle
 
+    proxies = None
+    proxies_asked = False
+    carry_over = []  # Tâches non terminées à l'échéance, reprises au cycle suivant
     while True:
+        flush_logs()  # Messages en attente affichés avant la question
         tag = input("\nEntrez le tag à rechercher : ").strip()
         if not tag:
             print("[!] Tag vide, fin du programme.")
             break
 
-        proxies = get_proxies()
+        if not proxies_asked:
+            proxies = get_proxies()
+            proxies_asked = True
 
-        print(f"\n[{get_current_time()}] Début du cycle pour le tag : '{tag}' (20 minutes max).")
+        console(f"Début du cycle pour le tag : '{tag}' (20 minutes max).", newline=True)
         start_cycle = time.time()
 
-        with ThreadPoolExecutor(max_workers=THREADS) as executor:
-            while True:
-                elapsed = time.time() - start_cycle
-                if elapsed > SESSION_DURATION:
-                    print(f"[{get_current_time()}] 20 minutes écoulées pour le tag '{tag}'.")
-                    break
+        carry_over = run_cycle(tag, save_folder, index, lock, proxies, start_cycle, carry_over)
+        if carry_over:
+            console(f"{len(carry_over)} tâche(s) reportée(s) au prochain cycle.")
 
-                in_progress = set()
-                video_links = search_videos(
-                    tag=tag, 
-                    output_file=output_file,
-                    proxies=proxies,
-                    num_links=MAX_LINKS, 
-                    max_pages=MAX_PAGES
-                )
-                if video_links:
-                    futures = []
-                    for link in video_links:
-                        futures.append(executor.submit(
-                            download_video,
-                            link,
-                            save_folder,
-                            in_progress,
-                            downloaded_videos,
-                            lock,
-                            proxies
-                        ))
-                    # Au lieu d'un simple fut.result(), on entoure d'un try/except
-                    for fut in as_completed(futures):
-                        try:
-                            fut.result()
-                        except Exception as e:
-                            # On log l'exception et on continue
-                            log_event(f"Exception non gérée dans un thread: {e}")
-                            print(f"[{get_current_time()}] Exception non gérée: {e}")
-
-                    # Mettre à jour la liste des téléchargées
-                    with open("downloaded_videos.txt", 'w', encoding="utf-8") as f:
-                        for url in downloaded_videos:
-                            f.write(f"{url}\n")
-
-                print(f"\n[{get_current_time()}] En pause {SLEEP_BETWEEN_SEARCH}s avant la prochaine recherche.")
-                time.sleep(SLEEP_BETWEEN_SEARCH)
-        
+        flush_logs()
         choice = input(
             "\nLe cycle de 20 minutes est terminé. Voulez-vous :\n"
             "  [1] Rechercher un nouveau tag\n"
@@ -551,8 +4578,77 @@ def main():
         if choice == '1':
             continue
         else:
-            print(f"[{get_current_time()}] Fin du programme.")
+            console("Fin du programme.")
             break
 
+def main(argv=None) -> int:
+    """
+    Point d'entrée. Sans option : mode interactif (run_interactive).
+    --status et --dry-run affichent l'état ou le programme prévu et
+    quittent aussitôt, sans réseau.
+    Avec --config et/ou --tag : mode sans surveillance (run_scheduler),
+    plusieurs tags en parallèle sur un seul pool, proxy testé une seule
+    fois au démarrage, travail partagé avec d'autres machines si un
+    magasin de tâches (--task-store) est indiqué.
+
+    Les mini-logs (erome_log.txt, JSON lines) notent les blocages potentiels
+    (403, 429) ou toute autre erreur notable, et on affiche aussi un message
+    en console ; les deux passent par le thread de journalisation.
+    """
+    global PAGE_CACHE
+    args = parse_args(argv)
+    if args.status:
+        show_status(args.task_store)
+        return 0
+    headless = bool(args.config or args.tag)
+    if args.dry_run and not headless:
+        print("[!] --dry-run nécessite --config ou --tag.")
+        return 2
+    if headless:
+        try:
+            configs, proxies, duration, task_store = load_schedule(args)
+        except (OSError, ValueError) as e:
+            print(f"[!] Configuration invalide : {e}")
+            return 2
+        if args.dry_run:
+            show_schedule(configs, proxies, duration, task_store)
+            return 0
+        if not test_proxy(proxies):
+            print("[!] Le proxy ne fonctionne pas, arrêt.")
+            return 1
+
+    save_folder = "downloads"
+    os.makedirs(save_folder, exist_ok=True)
+
+    # Index des vidéos déjà téléchargées (import unique de l'ancien .txt)
+    index = DownloadIndex(INDEX_FILE)
+    imported = index.import_legacy(LEGACY_DOWNLOADED_FILE)
+    if imported:
+        console(f"{imported} entrées importées depuis {LEGACY_DOWNLOADED_FILE}.")
+    if PAGE_CACHE_FILE:
+        PAGE_CACHE = PageCache(PAGE_CACHE_FILE)
+
+    stop_stats = start_stats_exporter()
+    lock = Lock()
+    if headless:
+        store = open_task_store(task_store) if task_store else None
+        carried = run_scheduler(configs, save_folder, index, lock, proxies, duration, store)
+        if carried:
+            console(f"{len(carried)} tâche(s) non terminée(s), reprises au prochain lancement.")
+        if store is not None:
+            console(f"Magasin de tâches : {store.counts()}")
+            store.close()
+        console("Fin du programme.")
+    else:
+        run_interactive(save_folder, index, lock)
+
+    stop_stats()
+    index.close()
+    if PAGE_CACHE is not None:
+        PAGE_CACHE.close()
+    close_sessions()
+    LOG_WRITER.close()
+    return 0
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# dump.py et bench.py sont des scripts à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True, scope="session")
+def work_dir(tmp_path_factory):
+    """Dossier courant temporaire : le journal (erome_log.txt) n'est pas écrit dans le dépôt."""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("work"))
+    yield
+    os.chdir(cwd)
@@ -0,0 +1,77 @@
+"""Échéance du cycle (Deadline) et report des tâches au cycle suivant."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import dump
+
+def test_no_deadline():
+    deadline = dump.Deadline()
+    assert deadline.remaining() == float("inf")
+    assert not deadline.expired()
+
+def test_expiry():
+    deadline = dump.Deadline(0.05)
+    assert not deadline.expired()
+    time.sleep(0.06)
+    assert deadline.expired()
+    assert deadline.remaining() == 0.0
+
+def test_sleep_stops_at_deadline():
+    deadline = dump.Deadline(0.05)
+    start = time.monotonic()
+    assert not deadline.sleep(10)
+    assert time.monotonic() - start < 1
+
+def test_sleep_before_deadline():
+    assert dump.Deadline(10).sleep(0.01)
+
+def test_cancel_wakes_sleep():
+    deadline = dump.Deadline()
+    threading.Timer(0.05, deadline.cancel).start()
+    start = time.monotonic()
+    assert not deadline.sleep(10)
+    assert time.monotonic() - start < 1
+    assert deadline.expired()
+
+def test_expired_tasks_are_carried_over(tmp_path):
+    index = dump.DownloadIndex(str(tmp_path / "index.sqlite"))
+    links = [f"https://www.erome.com/v/{i}" for i in range(5)]
+    deadline = dump.Deadline(0)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results, throttled, deferred = dump.download_tasks(
+            executor, links, str(tmp_path), set(), index, Lock(), None, deadline
+        )
+    index.close()
+    assert results == {dump.RESULT_DEFERRED: len(links)}
+    assert throttled == []
+    assert sorted(deferred) == links
+
+def test_suspended_transfer_resumes(tmp_path):
+    # Transfert suspendu à l'échéance : .part et sidecar permettent la reprise
+    index = dump.DownloadIndex(str(tmp_path / "index.sqlite"))
+    save_path = str(tmp_path / "video.mp4")
+    video_src = "https://v1.erome.com/video.mp4"
+    deadline = dump.Deadline()
+    chunks = [b"a" * 100, b"b" * 100, b"c" * 100, b"d" * 100]
+
+    def stream():
+        for i, chunk in enumerate(chunks):
+            if i == 2:
+                deadline.cancel()
+            yield chunk
+
+    def checkpoint(written):
+        dump.save_part_state(save_path, video_src, "etag", 400, written)
+
+    written, error = dump.stream_to_file(stream(), save_path + dump.PART_SUFFIX, 0, 400,
+                                         checkpoint=checkpoint, deadline=deadline)
+    assert written == 300 and isinstance(error, dump.DeadlineExceeded)
+    result = dump.finish_media_download("https://www.erome.com/v/1", video_src, [], save_path,
+                                        "etag", 400, written, error, index)
+    assert result == dump.RESULT_DEFERRED
+    assert index.get_entry("https://www.erome.com/v/1")[0] == dump.RESULT_PARTIAL
+    offset, meta = dump.get_resume_offset(save_path, video_src)
+    assert offset == 300 and meta["etag"] == "etag"
+    index.close()
@@ -0,0 +1,64 @@
+"""Échecs répétés : comptés sur l'élément concerné, espacés puis abandonnés."""
+from threading import Lock
+
+import pytest
+
+import dump
+
+ALBUM_URL = "https://www.erome.com/a/album"
+SOURCES = ["https://v1.erome.com/a.mp4", "https://v1.erome.com/b.mp4"]
+
+@pytest.fixture
+def album_site(tmp_path, monkeypatch):
+    """Album de deux vidéos dont la première échoue toujours (404)."""
+    index = dump.DownloadIndex(str(tmp_path / "index.sqlite"))
+    page_data = dump.PageData(tags=["bench"], media_srcs=SOURCES)
+    monkeypatch.setattr(dump, "PAGE_RETRY_DELAY", 0)
+    monkeypatch.setattr(dump, "fetch_page", lambda *args, **kwargs: (page_data, 200, False))
+
+    def download_source(item_url, video_src, tags_found, save_folder, index, session,
+                        deadline=None):
+        if video_src == SOURCES[0]:
+            return dump.RESULT_FAILED
+        index.record(item_url, dump.RESULT_DONE, video_src=video_src)
+        return dump.RESULT_DONE
+
+    monkeypatch.setattr(dump, "_download_source", download_source)
+    index.add_links("bench", [ALBUM_URL])
+    yield index
+    index.close()
+
+def failures(index: "dump.DownloadIndex", page_url: str) -> int:
+    return index._conn.execute("SELECT failures FROM videos WHERE page_url = ?",
+                               (page_url,)).fetchone()[0]
+
+def run(index: "dump.DownloadIndex", tmp_path) -> str:
+    return dump.download_video(ALBUM_URL, str(tmp_path), set(), index, Lock(), None)
+
+def test_album_item_failures_counted_on_item(album_site, tmp_path):
+    index = album_site
+    item_url = dump.album_item_url(ALBUM_URL, SOURCES[0])
+    assert run(index, tmp_path) == dump.RESULT_ALBUM
+    assert failures(index, item_url) == 1
+    assert failures(index, ALBUM_URL) is None
+    assert index.get_entry(dump.album_item_url(ALBUM_URL, SOURCES[1]))[0] == dump.RESULT_DONE
+    # L'album reste à retenter tant que sa vidéo en échec n'est pas abandonnée
+    assert index.pending_links("bench") == [ALBUM_URL]
+
+def test_album_completes_once_item_abandoned(album_site, tmp_path):
+    index = album_site
+    for _ in range(dump.PAGE_MAX_FAILURES - 1):
+        assert run(index, tmp_path) == dump.RESULT_ALBUM
+    assert run(index, tmp_path) == dump.RESULT_DONE
+    assert failures(index, dump.album_item_url(ALBUM_URL, SOURCES[0])) == dump.PAGE_MAX_FAILURES
+    assert index.get_entry(ALBUM_URL)[0] == dump.RESULT_DONE
+    assert index.pending_links("bench") == []
+
+def test_album_waiting_for_retry_stays_pending(album_site, tmp_path, monkeypatch):
+    index = album_site
+    assert run(index, tmp_path) == dump.RESULT_ALBUM
+    # Vidéo en échec en attente de son prochain essai : rien à lancer, album non clos
+    monkeypatch.setattr(dump, "PAGE_RETRY_DELAY", 600)
+    index.record_failure(dump.album_item_url(ALBUM_URL, SOURCES[0]))
+    assert run(index, tmp_path) == dump.RESULT_ALBUM
+    assert index.get_entry(ALBUM_URL)[0] == dump.RESULT_ALBUM
@@ -0,0 +1,66 @@
+"""File multi-tags (FairQueue) : pas pondéré, max_active, fermeture."""
+import threading
+
+import pytest
+
+import dump
+
+def fill(fair_queue: dump.FairQueue, tag: str, count: int) -> None:
+    for i in range(count):
+        fair_queue.put(f"{tag}{i}", tag)
+
+def in_thread(func):
+    """Résultat de func() exécutée dans un autre thread (tâches en cours propres au thread)."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join(timeout=5)
+    return result[0]
+
+def test_stride_follows_weights():
+    fair_queue = dump.FairQueue([dump.TagConfig("a", weight=3), dump.TagConfig("b", weight=1)])
+    fill(fair_queue, "a", 20)
+    fill(fair_queue, "b", 20)
+    served = [fair_queue.get()[0] for _ in range(16)]
+    assert served.count("a") == 12
+    assert served.count("b") == 4
+
+def test_idle_tag_gains_no_credit():
+    fair_queue = dump.FairQueue([dump.TagConfig("a"), dump.TagConfig("b")])
+    fill(fair_queue, "a", 10)
+    for _ in range(6):
+        assert fair_queue.get()[0] == "a"
+    # "b" revient : partage équitable, pas de rattrapage des tours manqués
+    fill(fair_queue, "b", 10)
+    served = [fair_queue.get()[0] for _ in range(4)]
+    assert served.count("a") == 2 and served.count("b") == 2
+
+def test_max_active():
+    fair_queue = dump.FairQueue([dump.TagConfig("a", weight=10, max_active=1), dump.TagConfig("b")])
+    fill(fair_queue, "a", 5)
+    fill(fair_queue, "b", 5)
+    assert fair_queue.get() == "a0"
+    # "a" a déjà une tâche en cours (ce thread) : un autre worker reçoit "b"
+    assert in_thread(fair_queue.get) == "b0"
+    # La tâche de ce thread se termine avec get() : "a" redevient éligible
+    assert fair_queue.get() == "a1"
+
+def test_worker_puts_inherit_tag():
+    fair_queue = dump.FairQueue([dump.TagConfig("a"), dump.TagConfig("b")])
+    fair_queue.put("page", "b")
+    assert fair_queue.get() == "page"
+    fair_queue.put_nowait("album-item")
+    assert fair_queue.pending() == {"a": 0, "b": 1}
+
+def test_full_queue():
+    fair_queue = dump.FairQueue([dump.TagConfig("a")], maxsize=1)
+    fair_queue.put("x", "a")
+    with pytest.raises(dump.queue.Full):
+        fair_queue.put_nowait("y", "a")
+
+def test_close_drains_then_stops():
+    fair_queue = dump.FairQueue([dump.TagConfig("a")])
+    fair_queue.put("x", "a")
+    fair_queue.close()
+    assert fair_queue.get() == "x"
+    assert fair_queue.get() is None
@@ -0,0 +1,101 @@
+"""Contrôles pendant le transfert : Mp4BoxScanner, StreamVerifier."""
+import json
+import struct
+import zlib
+
+import dump
+
+def box(box_type: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+MP4 = box(b"ftyp", b"isom\x00\x00\x02\x00") + box(b"moov", b"\x00" * 24) + box(b"mdat", b"\x01" * 40)
+
+def scan(data: bytes, chunk: int = None) -> dump.Mp4BoxScanner:
+    scanner = dump.Mp4BoxScanner()
+    chunk = chunk or len(data)
+    for start in range(0, len(data), chunk):
+        scanner.update(data[start:start + chunk])
+    return scanner
+
+def test_complete_file():
+    scanner = scan(MP4)
+    assert scanner.types == ["ftyp", "moov", "mdat"]
+    assert scanner.check() is None
+
+def test_byte_by_byte():
+    # En-têtes à cheval sur plusieurs blocs
+    scanner = scan(MP4, chunk=1)
+    assert scanner.types == ["ftyp", "moov", "mdat"]
+    assert scanner.check() is None
+
+def test_truncated_last_box():
+    assert "incomplète" in scan(MP4[:-5]).check()
+
+def test_missing_moov():
+    data = box(b"ftyp", b"isom") + box(b"mdat", b"\x01" * 16)
+    assert scan(data).check() == "pas de boîte moov"
+
+def test_missing_ftyp():
+    data = box(b"free") + box(b"skip") + box(b"moov")
+    assert scan(data).check() == "pas de boîte ftyp en tête"
+
+def test_invalid_header():
+    scanner = scan(box(b"ftyp") + b"\x00\x00\x00\x10\xff\xfe\xfd\xfc" + b"\x00" * 8)
+    assert "en-tête de boîte invalide" in scanner.check()
+
+def test_invalid_size():
+    scanner = scan(box(b"ftyp") + struct.pack(">I4s", 4, b"moov"))
+    assert "taille de boîte invalide" in scanner.check()
+
+def test_64_bit_size():
+    large = struct.pack(">I4sQ", 1, b"mdat", 16 + 8) + b"\x01" * 8
+    scanner = scan(box(b"ftyp") + box(b"moov") + large, chunk=3)
+    assert scanner.types == ["ftyp", "moov", "mdat"]
+    assert scanner.check() is None
+
+def test_open_ended_box():
+    data = box(b"ftyp") + box(b"moov") + struct.pack(">I4s", 0, b"mdat") + b"\x01" * 100
+    scanner = scan(data)
+    assert scanner.open_ended
+    assert scanner.check() is None
+
+def test_state_round_trip():
+    # Reprise : l'état passe par le sidecar JSON au milieu d'une boîte
+    for cut in range(1, len(MP4)):
+        first = scan(MP4[:cut])
+        scanner = dump.Mp4BoxScanner(json.loads(json.dumps(first.state())))
+        scanner.update(MP4[cut:])
+        assert scanner.types == ["ftyp", "moov", "mdat"], cut
+        assert scanner.check() is None, cut
+
+def test_verifier_checksum_and_resume():
+    verifier = dump.StreamVerifier()
+    verifier.update(MP4[:30])
+    resumed = dump.StreamVerifier(json.loads(json.dumps(verifier.state())))
+    resumed.update(MP4[30:])
+    assert resumed.position == len(MP4)
+    assert resumed.checksum == f"crc32:{zlib.crc32(MP4):08x}"
+    assert resumed.check() is None
+
+def test_verifier_reports_scanner_error():
+    verifier = dump.StreamVerifier()
+    verifier.update(MP4[:-1])
+    assert verifier.check() is not None
+
+def test_new_stream_verifier_rereads_part(tmp_path):
+    # Sidecar sans état de vérification : le début du .part est relu
+    part_path = tmp_path / "video.mp4.part"
+    part_path.write_bytes(MP4[:50])
+    verifier = dump.new_stream_verifier(str(part_path), 50, {})
+    verifier.update(MP4[50:])
+    assert verifier.checksum == f"crc32:{zlib.crc32(MP4):08x}"
+    assert verifier.check() is None
+
+def test_new_stream_verifier_uses_sidecar_state(tmp_path):
+    part_path = tmp_path / "video.mp4.part"
+    part_path.write_bytes(b"\x00" * 50)  # Non relu : l'état du sidecar fait foi
+    first = dump.StreamVerifier()
+    first.update(MP4[:50])
+    verifier = dump.new_stream_verifier(str(part_path), 50, {"verify": first.state()})
+    verifier.update(MP4[50:])
+    assert verifier.check() is None
@@ -0,0 +1,112 @@
+"""Cache des pages : borne LRU, fraîcheur et revalidation (304)."""
+import json
+from dataclasses import asdict
+from types import SimpleNamespace
+
+import pytest
+
+import dump
+
+PAGE_URL = "https://www.erome.com/v/abc"
+HTML = ('<html><body><p class="mt-10"><a href="/search?q=bench">#bench</a></p>'
+        '<video><source src="https://v1.erome.com/abc.mp4" type="video/mp4"></video></body></html>')
+
+class FakeSession:
+    """Session requests minimale : rejoue `responses` et garde les en-têtes envoyés."""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, headers=None):
+        self.sent.append(headers)
+        return self.responses.pop(0)
+
+def response(status_code: int, text: str = "", **headers) -> SimpleNamespace:
+    return SimpleNamespace(status_code=status_code, text=text, headers=headers)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge time.time() contrôlée (used_at et fetched_at distincts et prévisibles)."""
+    now = [1000.0]
+
+    def advance(seconds: float = 1.0) -> None:
+        now[0] += seconds
+
+    monkeypatch.setattr(dump.time, "time", lambda: now[0])
+    return advance
+
+@pytest.fixture
+def page_cache(tmp_path, monkeypatch):
+    cache = dump.PageCache(str(tmp_path / "pages.sqlite"))
+    monkeypatch.setattr(dump, "PAGE_CACHE", cache)
+    yield cache
+    cache.close()
+
+def page(i: int) -> dump.PageData:
+    return dump.PageData(tags=[f"tag{i}"], video_srcs=[f"https://v1.erome.com/{i}.mp4"])
+
+def test_lru_eviction(tmp_path, clock):
+    size = len(json.dumps(asdict(page(0)), ensure_ascii=False))
+    cache = dump.PageCache(str(tmp_path / "pages.sqlite"), max_bytes=int(size * 3.5))
+    for i in range(3):
+        cache.put(f"u{i}", page(i))
+        clock()
+    assert cache.get("u0") is not None  # u0 utilisée : u1 devient la plus ancienne
+    clock()
+    cache.put("u3", page(3))
+    assert cache.get("u1") is None
+    assert [cache.get(f"u{i}") is not None for i in (0, 2, 3)] == [True, True, True]
+    assert cache.usage() == (3, 3 * size)
+    cache.close()
+
+def test_total_survives_reopen(tmp_path):
+    cache = dump.PageCache(str(tmp_path / "pages.sqlite"))
+    cache.put("u0", page(0))
+    cache.put("u0", page(1))  # Remplacement : la taille n'est comptée qu'une fois
+    usage = cache.usage()
+    cache.close()
+    cache = dump.PageCache(str(tmp_path / "pages.sqlite"))
+    assert cache.usage() == usage
+    cache.discard("u0")
+    assert cache.usage() == (0, 0)
+    cache.close()
+
+def test_fresh_page_served_without_request(page_cache, clock):
+    page_cache.put(PAGE_URL, page(0), etag='"v1"')
+    session = FakeSession()
+    data, status_code, cached = dump.fetch_page(session, PAGE_URL, 60, "page_get", "parse_page")
+    assert (data, status_code, cached) == (page(0), 200, True)
+    assert session.sent == []
+
+def test_stale_page_revalidated_with_304(page_cache, clock):
+    session = FakeSession(response(200, HTML, ETag='"v1"', **{"Last-Modified": "Mon"}),
+                          response(304))
+    first, status_code, cached = dump.fetch_page(session, PAGE_URL, 60, "page_get", "parse_page")
+    assert status_code == 200 and not cached
+    assert first.tags == ["bench"]
+
+    clock(120)
+    data, status_code, cached = dump.fetch_page(session, PAGE_URL, 60, "page_get", "parse_page")
+    assert (data, status_code, cached) == (first, 200, True)
+    assert session.sent[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon"}
+    # 304 : l'entrée redevient fraîche
+    assert page_cache.get(PAGE_URL).fetched_at == dump.time.time()
+
+def test_changed_page_replaced(page_cache, clock):
+    page_cache.put(PAGE_URL, page(0), etag='"v1"')
+    clock(120)
+    session = FakeSession(response(200, HTML, ETag='"v2"'))
+    data, status_code, cached = dump.fetch_page(session, PAGE_URL, 60, "page_get", "parse_page")
+    assert status_code == 200 and not cached
+    assert page_cache.get(PAGE_URL).etag == '"v2"'
+    assert page_cache.get(PAGE_URL).data == data
+
+def test_error_status_not_cached(page_cache):
+    session = FakeSession(response(404))
+    data, status_code, cached = dump.fetch_page(session, PAGE_URL, 60, "page_get", "parse_page")
+    assert (data, status_code, cached) == (None, 404, False)
+    assert page_cache.get(PAGE_URL) is None
+
+def test_album_pages_never_expire():
+    assert dump.page_max_age(("album", None, [])) == float("inf")
+    assert dump.page_max_age(None) == dump.PAGE_CACHE_TTL
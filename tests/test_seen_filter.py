@@ -0,0 +1,122 @@
+"""Filtre des liens vus (SeenFilter) : construction, rattrapage et reconstruction."""
+import os
+import sqlite3
+
+import dump
+
+LINKS = [f"https://www.erome.com/v/{i:04x}" for i in range(200)]
+
+def test_filter_membership(tmp_path):
+    seen_filter = dump.SeenFilter(str(tmp_path / "f.seen"), bits=1 << 16)
+    for link in LINKS:
+        seen_filter.add(link)
+    assert all(link in seen_filter for link in LINKS)
+    absent = [f"https://www.erome.com/a/{i}" for i in range(200)]
+    assert sum(link in seen_filter for link in absent) < 5  # Faux positifs rares
+    seen_filter.close()
+
+def test_fresh_file_is_sparse(tmp_path):
+    path = str(tmp_path / "f.seen")
+    dump.SeenFilter(path, bits=1 << 20).close()
+    assert os.path.getsize(path) == dump.SeenFilter.HEADER.size + (1 << 17)
+    assert os.stat(path).st_blocks * 512 < 1 << 17
+
+def test_state_persists(tmp_path):
+    path = str(tmp_path / "f.seen")
+    seen_filter = dump.SeenFilter(path, bits=1 << 16)
+    seen_filter.add("x")
+    seen_filter.set_synced(42)
+    seen_filter.close()
+    seen_filter = dump.SeenFilter(path, bits=1 << 16)
+    assert "x" in seen_filter and seen_filter.synced_rowid == 42
+    seen_filter.close()
+
+def test_mismatched_header_clears(tmp_path):
+    path = str(tmp_path / "f.seen")
+    seen_filter = dump.SeenFilter(path, bits=1 << 16, hashes=7)
+    seen_filter.add("x")
+    seen_filter.set_synced(42)
+    seen_filter.close()
+    seen_filter = dump.SeenFilter(path, bits=1 << 16, hashes=5)
+    assert "x" not in seen_filter and seen_filter.synced_rowid == 0
+    seen_filter.close()
+
+def test_seen_links_per_tag(tmp_path):
+    index = dump.DownloadIndex(str(tmp_path / "index.sqlite"))
+    index.add_links("a", LINKS[:100])
+    seen_a, seen_b = index.seen_links("a"), index.seen_links("b")
+    assert all(link in seen_a for link in LINKS[:100])
+    assert not any(link in seen_b for link in LINKS[:100])
+    assert LINKS[150] not in seen_a
+    # Lien vu en cours de page, enregistré en fin de page par add_links
+    seen_b.add(LINKS[150])
+    index.add_links("b", [LINKS[150]])
+    assert LINKS[150] in seen_b and LINKS[150] not in seen_a
+    index.close()
+
+def test_links_shared_between_tags(tmp_path):
+    index = dump.DownloadIndex(str(tmp_path / "index.sqlite"))
+    index.add_links("a", LINKS[:100])
+    seen_b = index.seen_links("b")
+    # Liens déjà trouvés par "a" : nouveaux pour "b" tant qu'il ne les a pas trouvés
+    assert not any(link in seen_b for link in LINKS[:100])
+    for link in LINKS[50:100]:
+        seen_b.add(link)
+    index.add_links("b", LINKS[50:100])
+    assert all(link in seen_b for link in LINKS[50:100])
+    assert not any(link in seen_b for link in LINKS[:50])
+    assert sorted(index.pending_links("b")) == sorted(LINKS[50:100])
+    assert len(index.pending_links("a")) == 100
+    assert index.summary()["links"] == 100
+    index.close()
+
+def test_first_tag_links_migrated(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE links (url TEXT PRIMARY KEY, tag TEXT,"
+                     " first_seen TEXT NOT NULL, last_seen TEXT NOT NULL)")
+        conn.executemany("INSERT INTO links VALUES (?, 'a', 'x', 'x')", [(link,) for link in LINKS])
+    index = dump.DownloadIndex(path)
+    assert all(link in index.seen_links("a") for link in LINKS)
+    index.add_links("b", LINKS[:10])
+    assert all(link in index.seen_links("b") for link in LINKS[:10])
+    assert len(index.pending_links("a")) == len(LINKS)
+    index.close()
+
+def test_sync_from_links_added_elsewhere(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    index = dump.DownloadIndex(path)
+    index.add_links("a", LINKS[:100])
+    index.seen_links("a")
+    index.close()
+    # Liens ajoutés sans le filtre ouvert (autre processus, import)
+    index = dump.DownloadIndex(path)
+    index.add_links("a", LINKS[100:])
+    index.close()
+
+    index = dump.DownloadIndex(path)
+    seen = index.seen_links("a")
+    assert all(link in seen for link in LINKS)
+    with sqlite3.connect(path) as conn:
+        last = conn.execute("SELECT MAX(rowid) FROM links").fetchone()[0]
+    assert index._seen.synced_rowid == last
+    index.close()
+
+def test_rebuilt_when_index_replaced(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    index = dump.DownloadIndex(path)
+    index.add_links("a", LINKS)
+    index.seen_links("a")
+    index.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    # Nouvel index plus court : le filtre (rowid intégré plus grand) est reconstruit
+    index = dump.DownloadIndex(path)
+    index.add_links("a", LINKS[:10])
+    seen = index.seen_links("a")
+    assert all(link in seen for link in LINKS[:10])
+    assert not any(link in seen._filter for link in
+                   (dump.seen_key("a", link) for link in LINKS[10:]))
+    index.close()
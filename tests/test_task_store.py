@@ -0,0 +1,137 @@
+"""Magasins de tâches (MemoryTaskStore, SQLiteTaskStore) : même comportement."""
+import time
+
+import pytest
+
+import dump
+
+PAGES = [f"https://www.erome.com/a/page{i}" for i in range(4)]
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        task_store = dump.MemoryTaskStore()
+    else:
+        task_store = dump.SQLiteTaskStore(str(tmp_path / "tasks.sqlite"))
+    yield task_store
+    task_store.close()
+
+def test_add_ignores_known_tasks(store):
+    assert store.add("tag", PAGES) == len(PAGES)
+    assert store.add("autre", PAGES[:2]) == 0
+    assert store.counts() == {"pending": len(PAGES)}
+
+def test_claim_is_exclusive(store):
+    store.add("tag", PAGES)
+    first = store.claim("a", "tag", 3)
+    second = store.claim("b", "tag", 3)
+    assert first == PAGES[:3]
+    assert second == PAGES[3:]
+    assert store.claim("c", "tag", 3) == []
+
+def test_claim_filters_by_tag(store):
+    store.add("tag", PAGES[:2])
+    store.add("autre", PAGES[2:])
+    assert store.claim("a", "autre", 10) == PAGES[2:]
+
+def test_media_task_round_trip(store):
+    task = dump.MediaTask("https://www.erome.com/a/x#1.mp4", "https://www.erome.com/a/x",
+                          "https://v1.erome.com/1.mp4", ["t"])
+    store.add("tag", [task])
+    assert store.claim("a", "tag", 1) == [task]
+
+def test_expired_lease_is_reclaimed(store):
+    store.add("tag", PAGES[:1])
+    assert store.claim("a", "tag", 1, lease=0.05) == PAGES[:1]
+    assert store.claim("b", "tag", 1) == []
+    time.sleep(0.1)
+    assert store.claim("b", "tag", 1) == PAGES[:1]
+    # Le nœud arrêté a perdu son bail : il ne peut plus rendre la tâche
+    assert not store.release("a", PAGES[0])
+    assert store.release("b", PAGES[0])
+
+def test_renew_keeps_the_lease(store):
+    store.add("tag", PAGES[:1])
+    store.claim("a", "tag", 1, lease=0.05)
+    assert store.renew("a", lease=60) == 1
+    time.sleep(0.1)
+    assert store.claim("b", "tag", 1) == []
+
+def test_complete_once(store):
+    store.add("tag", PAGES[:1])
+    store.claim("a", "tag", 1)
+    assert store.complete(PAGES[0])
+    assert not store.complete(PAGES[0])
+    assert store.counts() == {"done": 1}
+    assert store.claim("b", "tag", 1) == []
+
+def test_release_delay(store):
+    store.add("tag", PAGES[:2])
+    store.claim("a", "tag", 2)
+    assert store.release("a", PAGES[0], delay=60)
+    assert store.release("a", PAGES[1])
+    assert store.claim("a", "tag", 2) == PAGES[1:2]
+
+def test_attempt_limit(store):
+    store.add("tag", PAGES[:1])
+    for _ in range(dump.TASK_MAX_ATTEMPTS):
+        assert store.claim("a", "tag", 1) == PAGES[:1]
+        store.release("a", PAGES[0])
+    assert store.counts() == {"failed": 1}
+    assert store.claim("a", "tag", 1) == []
+
+def test_release_without_attempt(store):
+    store.add("tag", PAGES[:1])
+    for _ in range(dump.TASK_MAX_ATTEMPTS + 2):
+        assert store.claim("a", "tag", 1) == PAGES[:1]
+        store.release("a", PAGES[0], attempt=False)
+    assert store.counts() == {"pending": 1}
+    # Les prises rendues sans essai ne comptent pas dans la limite
+    for _ in range(dump.TASK_MAX_ATTEMPTS - 1):
+        store.claim("a", "tag", 1)
+        store.release("a", PAGES[0])
+    assert store.counts() == {"pending": 1}
+
+def test_release_all(store):
+    store.add("tag", PAGES)
+    store.claim("a", "tag", 2)
+    store.claim("b", "tag", 2)
+    assert store.release_all("a") == 2
+    assert store.claim("c", "tag", 10) == PAGES[:2]
+    assert store.counts() == {"leased": 4}
+
+@pytest.fixture
+def index(tmp_path):
+    download_index = dump.DownloadIndex(str(tmp_path / "index.sqlite"))
+    yield download_index
+    download_index.close()
+
+def claimed(store, count: int = 1) -> list:
+    store.add("tag", PAGES[:count])
+    return store.claim(dump.NODE_ID, "tag", count)
+
+@pytest.mark.parametrize("result", [dump.RESULT_SKIPPED, dump.RESULT_BUSY])
+def test_settle_recheck_keeps_task(store, index, result, monkeypatch):
+    # Rien de terminé dans l'index : la tâche revient plus tard, sans consommer de prise
+    monkeypatch.setattr(dump, "TASK_RECHECK_DELAY", 0.05)
+    task, = claimed(store)
+    for _ in range(dump.TASK_MAX_ATTEMPTS + 1):
+        dump.settle_task(store, index, task, result)
+        assert store.counts() == {"pending": 1}
+        assert store.claim(dump.NODE_ID, "tag", 1) == []
+        time.sleep(0.06)
+        assert store.claim(dump.NODE_ID, "tag", 1) == [task]
+
+def test_settle_completes_when_index_done(store, index):
+    task, = claimed(store)
+    index.record(task, dump.RESULT_DONE)
+    dump.settle_task(store, index, task, dump.RESULT_SKIPPED)
+    assert store.counts() == {"done": 1}
+
+def test_settle_final_and_failed(store, index):
+    rejected, album, failed = claimed(store, 3)
+    dump.settle_task(store, index, rejected, dump.RESULT_REJECTED)
+    dump.settle_task(store, index, album, dump.RESULT_ALBUM)  # Vidéos suivies une à une
+    dump.settle_task(store, index, failed, dump.RESULT_FAILED)
+    assert store.counts() == {"done": 2, "pending": 1}
+    assert store.claim(dump.NODE_ID, "tag", 1) == [failed]
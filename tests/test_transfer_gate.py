@@ -0,0 +1,119 @@
+"""Porte des transferts (TransferGate) : politiques d'admission, budget, échéance."""
+import threading
+import time
+
+import pytest
+
+import dump
+
+def admission_order(gate: dump.TransferGate, sizes: list) -> list:
+    """Ordre d'admission de transferts de `sizes` arrivés pendant qu'un autre occupe la porte."""
+    assert gate.acquire(1000)
+    order = []
+
+    def transfer(size):
+        assert gate.acquire(size)
+        order.append(size)
+        gate.release(size)
+
+    threads = []
+    for size in sizes:
+        thread = threading.Thread(target=transfer, args=(size,))
+        thread.start()
+        threads.append(thread)
+        while len(gate._waiting) < len(threads):
+            time.sleep(0.001)
+    gate.release(1000)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+def test_shortest_first():
+    assert admission_order(dump.TransferGate("shortest", slots=1), [5, 1, 3]) == [1, 3, 5]
+
+def test_largest_first():
+    assert admission_order(dump.TransferGate("largest", slots=1), [5, 1, 3]) == [5, 3, 1]
+
+def test_fifo_never_waits():
+    gate = dump.TransferGate("fifo", slots=1)
+    assert gate.acquire(10)
+    assert gate.acquire(20, dump.Deadline(0))
+    assert gate.acquire(30, dump.Deadline(0))
+
+def test_budget_fills_gaps():
+    gate = dump.TransferGate("budget", slots=4, byte_budget=10)
+    assert gate.acquire(8)
+    assert not gate.acquire(6, dump.Deadline(0))
+    assert gate.acquire(2, dump.Deadline(0))
+    assert not gate.acquire(1, dump.Deadline(0))  # Budget atteint
+    gate.release(2)
+    assert gate.acquire(1, dump.Deadline(0))
+
+def test_deadline_gives_up():
+    gate = dump.TransferGate("shortest", slots=1)
+    assert gate.acquire(10)
+    start = time.monotonic()
+    assert not gate.acquire(5, dump.Deadline(0.05))
+    assert time.monotonic() - start < 1
+    assert not gate._waiting
+
+def test_overdue_transfer_gives_up(monkeypatch):
+    # Passé TRANSFER_MAX_WAIT, le transfert renonce au lieu de dépasser les limites
+    monkeypatch.setattr(dump, "TRANSFER_MAX_WAIT", 0.05)
+    gate = dump.TransferGate("shortest", slots=1)
+    assert gate.acquire(10)
+    start = time.monotonic()
+    assert not gate.acquire(5, dump.Deadline(5))
+    assert time.monotonic() - start < 2
+    assert not gate._waiting and gate._active == 1
+
+def test_limits_hold_under_long_waits(monkeypatch):
+    monkeypatch.setattr(dump, "TRANSFER_MAX_WAIT", 0.2)
+    gate = dump.TransferGate("budget", slots=2, byte_budget=100)
+    peak = {"active": 0, "inflight": 0}
+    admitted = []
+
+    def transfer(size):
+        if gate.acquire(size):
+            with gate._cond:
+                peak["active"] = max(peak["active"], gate._active)
+                peak["inflight"] = max(peak["inflight"], gate._inflight)
+            admitted.append(size)
+            time.sleep(0.5)  # Transfert plus long que TRANSFER_MAX_WAIT
+            gate.release(size)
+
+    threads = [threading.Thread(target=transfer, args=(size,)) for size in [60, 40] + [90] * 6]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert peak["active"] <= 2 and peak["inflight"] <= 100
+    assert sorted(admitted) == [40, 60]
+
+def test_oldest_gets_priority(monkeypatch):
+    # Après TRANSFER_MAX_WAIT / 2, le plus ancien passe devant les plus petits
+    monkeypatch.setattr(dump, "TRANSFER_MAX_WAIT", 0.4)
+    gate = dump.TransferGate("shortest", slots=1)
+    assert gate.acquire(1000)
+    order = []
+
+    def transfer(size):
+        if gate.acquire(size, dump.Deadline(5)):
+            order.append(size)
+            gate.release(size)
+
+    large = threading.Thread(target=transfer, args=(50,))
+    large.start()
+    time.sleep(0.25)
+    small = threading.Thread(target=transfer, args=(1,))
+    small.start()
+    while len(gate._waiting) < 2:
+        time.sleep(0.001)
+    gate.release(1000)
+    large.join(timeout=5)
+    small.join(timeout=5)
+    assert order == [50, 1]
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        dump.TransferGate("random")